@@ -2,10 +2,12 @@ from fastapi import APIRouter
 
 from app.api.concrete_note import router as concrete_note_router
 from app.api.materials_delivery import router as materials_delivery_router
+from app.api.jobs import router as jobs_router
+from app.api.extract import router as extract_router
 
 router = APIRouter()
-from dotenv import load_dotenv
-load_dotenv()
 
 router.include_router(concrete_note_router, tags=["concrete-note-router"])
-router.include_router(materials_delivery_router, tags=["material-delivery-router"])
\ No newline at end of file
+router.include_router(materials_delivery_router, tags=["material-delivery-router"])
+router.include_router(jobs_router, tags=["jobs-router"])
+router.include_router(extract_router, tags=["extract-router"])
\ No newline at end of file
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.api.pipeline import extract_from_url
+from app.core.concurrency import StageLimits
+from app.core.metrics import collect_timings
+from app.models.common import PipelineMode
+from app.services.base import BaseNoteService
+
+logger = logging.getLogger(__name__)
+
+
+async def _process_item(
+    service: BaseNoteService,
+    file_url: str,
+    limits: StageLimits,
+    bypass_cache: bool,
+    pipeline_mode: Optional[PipelineMode],
+    include_timings: bool,
+) -> Dict[str, Any]:
+    start_time = time.monotonic()
+    with collect_timings(include_timings) as timings:
+        try:
+            data = await extract_from_url(
+                service,
+                file_url,
+                bypass_cache=bypass_cache,
+                pipeline_mode=pipeline_mode,
+                limits=limits,
+            )
+            return {
+                "file_url": file_url,
+                "status": "success",
+                "data": data,
+                "processing_time": time.monotonic() - start_time,
+                "timings": timings,
+            }
+        except HTTPException as e:
+            error_message = str(e.detail)
+        except Exception as e:
+            logger.error(f"Failed to process {file_url} in batch: {e}", exc_info=True)
+            error_message = f"An unexpected error occurred: {str(e)}"
+    return {
+        "file_url": file_url,
+        "status": "error",
+        "data": None,
+        "processing_time": time.monotonic() - start_time,
+        "timings": timings,
+        "error_message": error_message,
+    }
+
+
+async def run_batch(
+    service: BaseNoteService,
+    file_urls: List[str],
+    bypass_cache: bool = False,
+    pipeline_mode: Optional[PipelineMode] = None,
+    include_timings: bool = False,
+) -> List[Dict[str, Any]]:
+    """Runs every URL through download -> OCR -> extract concurrently. Results keep the input order."""
+    limits = StageLimits.for_batch()
+    return await asyncio.gather(
+        *(_process_item(service, file_url, limits, bypass_cache, pipeline_mode, include_timings) for file_url in file_urls)
+    )
@@ -1,58 +1,31 @@
-import os
 import logging
 import time
-from typing import Tuple
-import httpx
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
-from app.core.config import settings
-from app.models.concrete_note import ConcreteExtractRequest, ConcreteExtractResponse, ConcreteExtractStatus
+from app.api.batch import run_batch
+from app.api.pipeline import extract_document_from_urls
+from app.api.streaming import stream_extraction
+from app.api.upload import UPLOAD_OPENAPI, extract_upload
+from app.core.metrics import collect_timings
+from app.core.registry import service_registry
+from app.models.concrete_note import (
+    ConcreteBatchRequest,
+    ConcreteBatchResponse,
+    ConcreteExtractRequest,
+    ConcreteExtractResponse,
+    ConcreteExtractStatus,
+)
+from app.models.common import PageMode, PipelineMode
 from app.services.concrete_note import ConcreteNoteService
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-async def download_image(file_url: str) -> Tuple[bytes, str]:
-    try:
-        async with httpx.AsyncClient() as client:
-            async with client.stream("GET", file_url, follow_redirects=True, timeout=30.0) as response:
-                response.raise_for_status()
-
-                # 1. Validate Content-Type is an image
-                content_type = response.headers.get("Content-Type", "")
-                if not content_type.startswith("image/"):
-                    logger.warning(f"File from {file_url} is not an image. Content-Type: {content_type}")
-                    raise HTTPException(
-                        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-                        detail=f"URL does not point to a valid image file. Content-Type received: {content_type}"
-                    )
-                
-                # 2. Validate Size
-                file_content = await response.aread()
-                if len(file_content) > settings.MAX_FILE_SIZE_BYTES:
-                    logger.warning(f"Image from {file_url} denied due to size. Size: {len(file_content)} bytes, Max: {settings.MAX_FILE_SIZE_BYTES} bytes.")
-                    raise HTTPException(
-                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                        detail=f"Image file size exceeds the maximum limit of {settings.MAX_FILE_SIZE_MB} MB."
-                    )
-
-                filename = os.path.basename(httpx.URL(file_url).path.split('?')[0]) or "downloaded_image"
-                logger.info(f"Successfully downloaded image '{filename}' from '{file_url}'. Size: {len(file_content)} bytes.")
-                return file_content, filename
-
-    except httpx.RequestError as e:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Could not retrieve image from URL: {e}")
-    except httpx.HTTPStatusError as e:
-        raise HTTPException(status_code=e.response.status_code, detail=f"Error fetching image from the provider: {e.response.status_code}")
-    except httpx.InvalidURL:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid image file URL provided.")
-    except Exception as e:
-        logger.error(f"Unexpected error during image download from {file_url}: {e}", exc_info=True)
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected server error occurred during file download.")
-
 def get_service(request: ConcreteExtractRequest) -> ConcreteNoteService:
-    return ConcreteNoteService(model_name=request.model_name)
+    return service_registry.get_service(ConcreteNoteService, request.model_name)
 
 @router.post("/concrete_note", response_model=ConcreteExtractResponse)
 async def concrete_extract(
@@ -61,27 +34,90 @@ async def concrete_extract(
 ):
     start_time = time.monotonic()
 
-    try:
-        file_content, _ = await download_image(request.file_url)
-        result_json = await service.process_file(file_content=file_content)
+    with collect_timings(request.include_timings) as timings:
+        try:
+            result = await extract_document_from_urls(
+                service,
+                [request.file_url, *request.page_urls],
+                bypass_cache=request.bypass_cache,
+                pipeline_mode=request.pipeline_mode,
+                page_mode=request.page_mode
+            )
 
-        elapsed_time = time.monotonic() - start_time
-        logger.info(f"Successfully processed concrete note from {request.file_url} in {elapsed_time:.2f}s")
-        return ConcreteExtractResponse(
-            status=ConcreteExtractStatus.SUCCESS,
-            data=result_json,
-            processing_time=elapsed_time
-        )
-    except HTTPException as e:
-        raise e
-    except Exception as e:
-        elapsed_time = time.monotonic() - start_time
-        error_message = f"An unexpected error occurred: {str(e)}"
-        logger.error(f"Failed to process {request.file_url}: {error_message}", exc_info=True)
+            elapsed_time = time.monotonic() - start_time
+            logger.info(f"Successfully processed concrete note from {request.file_url} in {elapsed_time:.2f}s")
+            return ConcreteExtractResponse(
+                status=ConcreteExtractStatus.SUCCESS,
+                data=result["data"],
+                pages=result["pages"],
+                processing_time=elapsed_time,
+                timings=timings
+            )
+        except HTTPException as e:
+            raise e
+        except Exception as e:
+            elapsed_time = time.monotonic() - start_time
+            error_message = f"An unexpected error occurred: {str(e)}"
+            logger.error(f"Failed to process {request.file_url}: {error_message}", exc_info=True)
+
+            return ConcreteExtractResponse(
+                status=ConcreteExtractStatus.ERROR,
+                data=None,
+                processing_time=elapsed_time,
+                error_message=error_message,
+                timings=timings
+            )
+
+@router.post("/concrete_note/upload", response_model=ConcreteExtractResponse, openapi_extra=UPLOAD_OPENAPI)
+async def concrete_extract_upload(
+    http_request: Request,
+    model_name: Optional[str] = Query("Qwen/Qwen3-8B"),
+    bypass_cache: bool = Query(False, description="Ignore cached OCR/extraction results for this request"),
+    pipeline_mode: Optional[PipelineMode] = Query(None, description="Overrides the deployment's PIPELINE_MODE"),
+    page_mode: PageMode = Query(PageMode.MERGED, description="For PDFs and multi-page notes: one merged extraction or one per page"),
+    include_timings: bool = Query(False, description="Return a per-stage timing breakdown in `timings`")
+):
+    """Same pipeline as /concrete_note for photos/PDFs sent in the request body (multipart 'file' parts or a raw image/* or PDF body)."""
+    return await extract_upload(
+        http_request,
+        ConcreteNoteService,
+        ConcreteExtractResponse,
+        "concrete note",
+        model_name=model_name,
+        bypass_cache=bypass_cache,
+        pipeline_mode=pipeline_mode,
+        page_mode=page_mode,
+        include_timings=include_timings
+    )
 
-        return ConcreteExtractResponse(
-            status=ConcreteExtractStatus.ERROR,
-            data=None,
-            processing_time=elapsed_time,
-            error_message=error_message
-        )
\ No newline at end of file
+@router.post("/concrete_note/batch", response_model=ConcreteBatchResponse)
+async def concrete_extract_batch(request: ConcreteBatchRequest):
+    """Processes several concrete notes concurrently; each item carries its own status."""
+    start_time = time.monotonic()
+    service = service_registry.get_service(ConcreteNoteService, request.model_name)
+    results = await run_batch(
+        service,
+        request.file_urls,
+        bypass_cache=request.bypass_cache,
+        pipeline_mode=request.pipeline_mode,
+        include_timings=request.include_timings
+    )
+
+    elapsed_time = time.monotonic() - start_time
+    logger.info(f"Processed batch of {len(results)} concrete notes in {elapsed_time:.2f}s")
+    return ConcreteBatchResponse(results=results, processing_time=elapsed_time)
+
+@router.post("/concrete_note/stream", response_class=StreamingResponse)
+async def concrete_extract_stream(
+    request: ConcreteExtractRequest,
+    http_request: Request,
+    service: ConcreteNoteService = Depends(get_service)
+):
+    """Same pipeline as /concrete_note, streamed as NDJSON (or SSE with `Accept: text/event-stream`)."""
+    return stream_extraction(
+        http_request,
+        service,
+        request.file_url,
+        bypass_cache=request.bypass_cache,
+        include_timings=request.include_timings
+    )
\ No newline at end of file
@@ -0,0 +1,92 @@
+import os
+import logging
+from typing import List, Tuple
+import httpx
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.http import get_http_client
+from app.core.metrics import download_bytes, stage
+from app.utils.pages import PDF_MIME_TYPE
+
+logger = logging.getLogger(__name__)
+
+def _too_large(file_url: str, size: int) -> HTTPException:
+    logger.warning(f"Image from {file_url} denied due to size. Size: {size} bytes, Max: {settings.MAX_FILE_SIZE_BYTES} bytes.")
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Image file size exceeds the maximum limit of {settings.MAX_FILE_SIZE_MB} MB."
+    )
+
+async def download_image(file_url: str) -> Tuple[bytes, str]:
+    with stage("download"):
+        file_content, filename = await _download_image(file_url)
+    download_bytes.observe(len(file_content))
+    return file_content, filename
+
+async def _read_declared(response: httpx.Response, length: int) -> bytearray:
+    """Reads a body of known length into one buffer allocated at its final size, without joining chunks."""
+    body = bytearray(length)
+    view = memoryview(body)
+    size = 0
+    async for chunk in response.aiter_bytes():
+        end = size + len(chunk)
+        if end > length:
+            raise httpx.RemoteProtocolError(f"Body is longer than its Content-Length of {length} bytes")
+        view[size:end] = chunk
+        size = end
+    if size != length:
+        raise httpx.RemoteProtocolError(f"Body ended after {size} of its {length} bytes")
+    return body
+
+async def _download_image(file_url: str) -> Tuple[bytes, str]:
+    max_bytes = settings.MAX_FILE_SIZE_BYTES
+    try:
+        client = get_http_client()
+        async with client.stream("GET", file_url) as response:
+            response.raise_for_status()
+
+            # 1. Validate Content-Type is an image or a (scanned) PDF
+            content_type = response.headers.get("Content-Type", "")
+            if not (content_type.startswith("image/") or content_type.startswith(PDF_MIME_TYPE)):
+                logger.warning(f"File from {file_url} is not an image or PDF. Content-Type: {content_type}")
+                raise HTTPException(
+                    status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                    detail=f"URL does not point to a valid image or PDF file. Content-Type received: {content_type}"
+                )
+
+            # 2. Validate Size: reject on the declared length, then stop reading as soon as the cap is crossed
+            content_length = response.headers.get("Content-Length")
+            declared = int(content_length) if content_length and content_length.isdigit() else None
+            if declared is not None and declared > max_bytes:
+                raise _too_large(file_url, declared)
+
+            if declared is not None and response.headers.get("Content-Encoding", "identity") == "identity":
+                file_content = await _read_declared(response, declared)
+                size = declared
+            else:
+                # Chunked (or compressed) body: the final size is only known at the end.
+                chunks: List[bytes] = []
+                size = 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise _too_large(file_url, size)
+                    chunks.append(chunk)
+                file_content = b"".join(chunks)
+
+            filename = os.path.basename(httpx.URL(file_url).path.split('?')[0]) or "downloaded_image"
+            logger.info(f"Successfully downloaded image '{filename}' from '{file_url}'. Size: {size} bytes.")
+            return file_content, filename
+
+    except HTTPException:
+        raise
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=f"Error fetching image from the provider: {e.response.status_code}")
+    except httpx.InvalidURL:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid image file URL provided.")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Could not retrieve image from URL: {e}")
+    except Exception as e:
+        logger.error(f"Unexpected error during image download from {file_url}: {e}", exc_info=True)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected server error occurred during file download.")
@@ -0,0 +1,86 @@
+import logging
+import time
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, status
+
+from app.api.pipeline import extract_any_from_bytes, extract_any_from_urls
+from app.api.upload import UPLOAD_OPENAPI, read_uploads
+from app.core.metrics import collect_timings
+from app.models.extract import ExtractRequest, ExtractResponse, ExtractStatus
+from app.services.note_types import note_types
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+def check_note_type(note_type: Optional[str]) -> None:
+    if note_type is not None and note_types.get(note_type) is None:
+        known = ", ".join(spec.name for spec in note_types.all())
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown note_type '{note_type}'. Known note types: {known}"
+        )
+
+def error_response(source: str, start_time: float, timings, e: Exception) -> ExtractResponse:
+    error_message = f"An unexpected error occurred: {str(e)}"
+    logger.error(f"Failed to process {source}: {error_message}", exc_info=True)
+    return ExtractResponse(
+        status=ExtractStatus.ERROR,
+        processing_time=time.monotonic() - start_time,
+        error_message=error_message,
+        timings=timings
+    )
+
+@router.post("/extract", response_model=ExtractResponse)
+async def extract(request: ExtractRequest):
+    """OCRs the note once, detects its type locally and runs the matching extraction."""
+    check_note_type(request.note_type)
+    start_time = time.monotonic()
+
+    with collect_timings(request.include_timings) as timings:
+        try:
+            result = await extract_any_from_urls(
+                [request.file_url, *request.page_urls],
+                note_type=request.note_type,
+                model_name=request.model_name,
+                bypass_cache=request.bypass_cache
+            )
+
+            elapsed_time = time.monotonic() - start_time
+            logger.info(f"Successfully processed {result['note_type']} note from {request.file_url} in {elapsed_time:.2f}s")
+            return ExtractResponse(status=ExtractStatus.SUCCESS, processing_time=elapsed_time, timings=timings, **result)
+        except HTTPException as e:
+            raise e
+        except Exception as e:
+            return error_response(request.file_url, start_time, timings, e)
+
+@router.post("/extract/upload", response_model=ExtractResponse, openapi_extra=UPLOAD_OPENAPI)
+async def extract_upload(
+    http_request: Request,
+    note_type: Optional[str] = Query(None, description="Skip classification and extract as this note type"),
+    model_name: Optional[str] = Query(None, description="Extraction model; defaults to each note type's default"),
+    bypass_cache: bool = Query(False, description="Ignore cached OCR/extraction results for this request"),
+    include_timings: bool = Query(False, description="Return a per-stage timing breakdown in `timings`")
+):
+    """Same as /extract for photos/PDFs sent in the request body (multipart 'file' parts or a raw image/* or PDF body)."""
+    check_note_type(note_type)
+    start_time = time.monotonic()
+
+    with collect_timings(include_timings) as timings:
+        files = await read_uploads(http_request)
+        filename = ", ".join(name for _, name in files)
+        try:
+            result = await extract_any_from_bytes(
+                [file_content for file_content, _ in files],
+                note_type=note_type,
+                model_name=model_name,
+                bypass_cache=bypass_cache
+            )
+
+            elapsed_time = time.monotonic() - start_time
+            logger.info(f"Successfully processed uploaded {result['note_type']} note '{filename}' in {elapsed_time:.2f}s")
+            return ExtractResponse(status=ExtractStatus.SUCCESS, processing_time=elapsed_time, timings=timings, **result)
+        except HTTPException as e:
+            raise e
+        except Exception as e:
+            return error_response(f"uploaded '{filename}'", start_time, timings, e)
@@ -0,0 +1,47 @@
+import logging
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, HTTPException, status
+
+from app.api.extract import check_note_type
+from app.api.pipeline import extract_from_url
+from app.core.jobs import QueueFullError, job_manager
+from app.core.registry import service_registry
+from app.models.jobs import JobCreateRequest, JobResponse
+from app.services.note_types import note_types
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+async def run_job(job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Job handler: the same download -> OCR -> extract path as the synchronous endpoints."""
+    spec = note_types.get(job["note_type"])
+    service = service_registry.get_service(spec.service_cls, job.get("model_name") or spec.default_model)
+    return await extract_from_url(
+        service,
+        job["file_url"],
+        bypass_cache=job.get("bypass_cache", False),
+        pipeline_mode=job.get("pipeline_mode"),
+    )
+
+@router.post("/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(request: JobCreateRequest):
+    """Queues an extraction and returns immediately; poll GET /jobs/{job_id} or use callback_url."""
+    check_note_type(request.note_type)
+    try:
+        job = await job_manager.submit(**request.model_dump(mode="json"))
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": "5"},
+        )
+    logger.info(f"Queued {job['note_type']} job {job['job_id']} for {job['file_url']}")
+    return JobResponse(**job)
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
+    return JobResponse(**job)
@@ -1,10 +1,24 @@
 import logging
 import time
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
-from app.models.materials_delivery import MaterialsDeliveryRequest, MaterialsDeliveryResponse, ExtractStatus
+from app.core.registry import service_registry
+from app.models.common import PageMode, PipelineMode
+from app.models.materials_delivery import (
+    ExtractStatus,
+    MaterialsDeliveryBatchRequest,
+    MaterialsDeliveryBatchResponse,
+    MaterialsDeliveryRequest,
+    MaterialsDeliveryResponse,
+)
 from app.services.materials_delivery import MaterialsDeliveryService
-from app.api.concrete_note import download_image
+from app.api.batch import run_batch
+from app.api.pipeline import extract_document_from_urls
+from app.api.streaming import stream_extraction
+from app.api.upload import UPLOAD_OPENAPI, extract_upload
+from app.core.metrics import collect_timings
 
 
 logger = logging.getLogger(__name__)
@@ -13,7 +27,7 @@ router = APIRouter()
 
 def get_service() -> MaterialsDeliveryService:
     """Dependency injector for the materials delivery service."""
-    return MaterialsDeliveryService()
+    return service_registry.get_service(MaterialsDeliveryService)
 
 @router.post("/materials_delivery", response_model=MaterialsDeliveryResponse)
 async def materials_delivery(
@@ -22,28 +36,91 @@ async def materials_delivery(
 ):
     start_time = time.monotonic()
 
-    try:
-        file_content, _ = await download_image(request.file_url)
-        result_json = await service.process_file(file_content=file_content)
+    with collect_timings(request.include_timings) as timings:
+        try:
+            result = await extract_document_from_urls(
+                service,
+                [request.file_url, *request.page_urls],
+                bypass_cache=request.bypass_cache,
+                pipeline_mode=request.pipeline_mode,
+                page_mode=request.page_mode
+            )
 
-        elapsed_time = time.monotonic() - start_time
-        logger.info(f"Successfully processed materials delivery note from {request.file_url} in {elapsed_time:.2f}s")
+            elapsed_time = time.monotonic() - start_time
+            logger.info(f"Successfully processed materials delivery note from {request.file_url} in {elapsed_time:.2f}s")
         
-        return MaterialsDeliveryResponse(
-            status=ExtractStatus.SUCCESS,
-            data=result_json,
-            processing_time=elapsed_time
-        )
-    except HTTPException as e:
-        raise e
-    except Exception as e:
-        elapsed_time = time.monotonic() - start_time
-        error_message = f"An unexpected error occurred: {str(e)}"
-        logger.error(f"Failed to process {request.file_url}: {error_message}", exc_info=True)
-
-        return MaterialsDeliveryResponse(
-            status=ExtractStatus.ERROR,
-            data=None,
-            processing_time=elapsed_time,
-            error_message=error_message
-        )
\ No newline at end of file
+            return MaterialsDeliveryResponse(
+                status=ExtractStatus.SUCCESS,
+                data=result["data"],
+                pages=result["pages"],
+                processing_time=elapsed_time,
+                timings=timings
+            )
+        except HTTPException as e:
+            raise e
+        except Exception as e:
+            elapsed_time = time.monotonic() - start_time
+            error_message = f"An unexpected error occurred: {str(e)}"
+            logger.error(f"Failed to process {request.file_url}: {error_message}", exc_info=True)
+
+            return MaterialsDeliveryResponse(
+                status=ExtractStatus.ERROR,
+                data=None,
+                processing_time=elapsed_time,
+                error_message=error_message,
+                timings=timings
+            )
+
+@router.post("/materials_delivery/upload", response_model=MaterialsDeliveryResponse, openapi_extra=UPLOAD_OPENAPI)
+async def materials_delivery_upload(
+    http_request: Request,
+    bypass_cache: bool = Query(False, description="Ignore cached OCR/extraction results for this request"),
+    pipeline_mode: Optional[PipelineMode] = Query(None, description="Overrides the deployment's PIPELINE_MODE"),
+    page_mode: PageMode = Query(PageMode.MERGED, description="For PDFs and multi-page notes: one merged extraction or one per page"),
+    include_timings: bool = Query(False, description="Return a per-stage timing breakdown in `timings`")
+):
+    """Same pipeline as /materials_delivery for photos/PDFs sent in the request body (multipart 'file' parts or a raw image/* or PDF body)."""
+    return await extract_upload(
+        http_request,
+        MaterialsDeliveryService,
+        MaterialsDeliveryResponse,
+        "materials delivery note",
+        bypass_cache=bypass_cache,
+        pipeline_mode=pipeline_mode,
+        page_mode=page_mode,
+        include_timings=include_timings
+    )
+
+@router.post("/materials_delivery/batch", response_model=MaterialsDeliveryBatchResponse)
+async def materials_delivery_batch(
+    request: MaterialsDeliveryBatchRequest,
+    service: MaterialsDeliveryService = Depends(get_service)
+):
+    """Processes several materials delivery notes concurrently; each item carries its own status."""
+    start_time = time.monotonic()
+    results = await run_batch(
+        service,
+        request.file_urls,
+        bypass_cache=request.bypass_cache,
+        pipeline_mode=request.pipeline_mode,
+        include_timings=request.include_timings
+    )
+
+    elapsed_time = time.monotonic() - start_time
+    logger.info(f"Processed batch of {len(results)} materials delivery notes in {elapsed_time:.2f}s")
+    return MaterialsDeliveryBatchResponse(results=results, processing_time=elapsed_time)
+
+@router.post("/materials_delivery/stream", response_class=StreamingResponse)
+async def materials_delivery_stream(
+    request: MaterialsDeliveryRequest,
+    http_request: Request,
+    service: MaterialsDeliveryService = Depends(get_service)
+):
+    """Same pipeline as /materials_delivery, streamed as NDJSON (or SSE with `Accept: text/event-stream`)."""
+    return stream_extraction(
+        http_request,
+        service,
+        request.file_url,
+        bypass_cache=request.bypass_cache,
+        include_timings=request.include_timings
+    )
\ No newline at end of file
@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, status
+
+from app.api.download import download_image
+from app.core.cache import make_cache_key
+from app.core.concurrency import StageLimits, limit
+from app.core.config import settings
+from app.core.metrics import note_type_routes
+from app.core.registry import service_registry
+from app.core.resilience import deadline_scope
+from app.core.singleflight import content_flight, url_flight
+from app.models.common import PageMode, PipelineMode
+from app.services.base import BaseNoteService
+from app.services.note_types import NoteTypeSpec, note_types
+from app.utils.pages import UnsupportedDocumentError
+
+logger = logging.getLogger(__name__)
+
+
+def _limits_scope(limits: Optional[StageLimits]) -> str:
+    # Only callers under the same stage caps share a flight: a batch item must not ride an
+    # unlimited interactive call, and an interactive request must not queue behind a batch.
+    return "" if limits is None else str(id(limits))
+
+
+def _flight_key(
+    service: BaseNoteService,
+    source: str,
+    bypass_cache: bool,
+    pipeline_mode: Optional[PipelineMode],
+    limits: Optional[StageLimits],
+) -> str:
+    mode = pipeline_mode.value if isinstance(pipeline_mode, PipelineMode) else pipeline_mode
+    return make_cache_key(service.result_namespace, source, str(bypass_cache), mode, _limits_scope(limits))
+
+
+def _content_key(files: List[bytes]) -> str:
+    return make_cache_key(*(hashlib.sha256(content).hexdigest() for content in files))
+
+
+async def _unsupported_as_http(coro) -> Any:
+    try:
+        return await coro
+    except UnsupportedDocumentError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+
+
+async def download_files(file_urls: List[str], limits: Optional[StageLimits] = None) -> List[bytes]:
+    """Downloads the files of one note concurrently, keeping their order."""
+    async def download(file_url: str) -> bytes:
+        async with limit(limits and limits.download):
+            file_content, _ = await download_image(file_url)
+        return file_content
+
+    return list(await asyncio.gather(*(download(file_url) for file_url in file_urls)))
+
+
+async def extract_from_bytes(
+    service: BaseNoteService,
+    file_content: bytes,
+    bypass_cache: bool = False,
+    pipeline_mode: Optional[PipelineMode] = None,
+    limits: Optional[StageLimits] = None,
+) -> Any:
+    """process_file, coalesced with concurrent requests for the same image content."""
+    key = _flight_key(service, hashlib.sha256(file_content).hexdigest(), bypass_cache, pipeline_mode, limits)
+    return await _unsupported_as_http(content_flight.do(key, lambda: service.process_file(
+        file_content=file_content,
+        bypass_cache=bypass_cache,
+        limits=limits,
+        pipeline_mode=pipeline_mode,
+    )))
+
+
+async def extract_from_url(
+    service: BaseNoteService,
+    file_url: str,
+    bypass_cache: bool = False,
+    pipeline_mode: Optional[PipelineMode] = None,
+    limits: Optional[StageLimits] = None,
+) -> Any:
+    """Download + process_file, coalesced first on the URL and then on the downloaded content."""
+    async def download_and_extract():
+        async with limit(limits and limits.download):
+            file_content, _ = await download_image(file_url)
+        return await extract_from_bytes(service, file_content, bypass_cache, pipeline_mode, limits)
+
+    key = _flight_key(service, file_url, bypass_cache, pipeline_mode, limits)
+    return await url_flight.do(key, download_and_extract)
+
+
+async def extract_document_from_bytes(
+    service: BaseNoteService,
+    files: List[bytes],
+    bypass_cache: bool = False,
+    pipeline_mode: Optional[PipelineMode] = None,
+    page_mode: PageMode = PageMode.MERGED,
+    limits: Optional[StageLimits] = None,
+) -> Dict[str, Any]:
+    """process_document for the photos/PDFs of one note, coalesced on their content."""
+    key = _flight_key(service, f"{PageMode(page_mode).value}:{_content_key(files)}", bypass_cache, pipeline_mode, limits)
+    return await _unsupported_as_http(content_flight.do(key, lambda: service.process_document(
+        files,
+        bypass_cache=bypass_cache,
+        limits=limits,
+        pipeline_mode=pipeline_mode,
+        page_mode=page_mode,
+    )))
+
+
+async def extract_document_from_urls(
+    service: BaseNoteService,
+    file_urls: List[str],
+    bypass_cache: bool = False,
+    pipeline_mode: Optional[PipelineMode] = None,
+    page_mode: PageMode = PageMode.MERGED,
+    limits: Optional[StageLimits] = None,
+) -> Dict[str, Any]:
+    """Download + extract_document_from_bytes, coalesced first on the URLs."""
+    async def download_and_extract():
+        files = await download_files(file_urls, limits)
+        return await extract_document_from_bytes(service, files, bypass_cache, pipeline_mode, page_mode, limits)
+
+    key = _flight_key(service, f"{PageMode(page_mode).value}:" + "\n".join(file_urls), bypass_cache, pipeline_mode, limits)
+    return await url_flight.do(key, download_and_extract)
+
+
+def _service_for(spec: NoteTypeSpec, model_name: Optional[str]) -> BaseNoteService:
+    return service_registry.get_service(spec.service_cls, model_name or spec.default_model)
+
+
+def _extract_namespace(note_type: Optional[str], model_name: Optional[str]) -> str:
+    specs = [note_types.get(note_type)] if note_type else note_types.all()
+    return make_cache_key(note_type, *(_service_for(spec, model_name).result_namespace for spec in specs if spec is not None))
+
+
+async def _extract_any(
+    files: List[bytes],
+    note_type: Optional[str],
+    model_name: Optional[str],
+    bypass_cache: bool,
+    limits: Optional[StageLimits],
+) -> Dict[str, Any]:
+    specs = note_types.all()
+    forced = note_types.get(note_type) if note_type else None
+    ocr_service = _service_for(forced or specs[0], model_name)
+    with deadline_scope(settings.LLM_REQUEST_DEADLINE_SECONDS):
+        # The OCR prompt, model and image preparation are shared by every note type.
+        ocr_text, pages = await ocr_service.ocr_document(files, bypass_cache=bypass_cache, limits=limits)
+        if forced is not None:
+            scores, candidates, route = [], [forced.name], "forced"
+        else:
+            scores = note_types.classify(ocr_text)
+            candidates = note_types.candidates(scores)
+            route = "routed" if len(candidates) == 1 else "ambiguous"
+        services = [_service_for(note_types.get(name), model_name) for name in candidates]
+        results = await asyncio.gather(
+            *(service.process_ocr_text(ocr_text, bypass_cache=bypass_cache, limits=limits) for service in services),
+            return_exceptions=True,
+        )
+
+    outcomes = dict(zip(candidates, results))
+    succeeded = [name for name in candidates if not isinstance(outcomes[name], BaseException)]
+    if not succeeded:
+        raise results[0]
+    valid = [name for name, service in zip(candidates, services) if name in succeeded and service.validate(outcomes[name])]
+    chosen = (valid or succeeded)[0]
+    for name in candidates:
+        if isinstance(outcomes[name], BaseException):
+            logger.warning(f"Extraction as '{name}' failed: {outcomes[name]}")
+    note_type_routes.inc(note_type=chosen, route=route)
+    return {
+        "note_type": chosen,
+        "route": route,
+        "scores": dict(scores),
+        "data": outcomes[chosen],
+        "alternatives": {name: outcomes[name] for name in succeeded if name != chosen} or None,
+        "pages": pages,
+    }
+
+
+async def extract_any_from_bytes(
+    files: List[bytes],
+    note_type: Optional[str] = None,
+    model_name: Optional[str] = None,
+    bypass_cache: bool = False,
+    limits: Optional[StageLimits] = None,
+) -> Dict[str, Any]:
+    """OCR once, pick the note type with the local classifier (unless `note_type` is given) and extract.
+
+    `files` are the photos/PDFs of one note; their pages are OCR'd and classified together.
+    When the classifier cannot separate the top note types, each of them is extracted concurrently
+    from the same OCR text; the best-scoring valid result is returned with the others as alternatives.
+    """
+    key = make_cache_key("extract", _extract_namespace(note_type, model_name), _content_key(files), str(bypass_cache), _limits_scope(limits))
+    return await _unsupported_as_http(
+        content_flight.do(key, lambda: _extract_any(files, note_type, model_name, bypass_cache, limits))
+    )
+
+
+async def extract_any_from_urls(
+    file_urls: List[str],
+    note_type: Optional[str] = None,
+    model_name: Optional[str] = None,
+    bypass_cache: bool = False,
+    limits: Optional[StageLimits] = None,
+) -> Dict[str, Any]:
+    """Download + extract_any_from_bytes, coalesced on the URLs."""
+    async def download_and_extract():
+        files = await download_files(file_urls, limits)
+        return await extract_any_from_bytes(files, note_type, model_name, bypass_cache, limits)
+
+    key = make_cache_key("extract", _extract_namespace(note_type, model_name), *file_urls, str(bypass_cache), _limits_scope(limits))
+    return await url_flight.do(key, download_and_extract)
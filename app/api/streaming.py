@@ -0,0 +1,72 @@
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from app.api.download import download_image
+from app.core.concurrency import StageLimits, limit
+from app.core.metrics import collect_timings
+from app.services.base import BaseNoteService
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+async def _events(
+    service: BaseNoteService,
+    file_url: str,
+    bypass_cache: bool,
+    limits: Optional[StageLimits],
+    include_timings: bool,
+) -> AsyncIterator[Dict[str, Any]]:
+    start_time = time.monotonic()
+    with collect_timings(include_timings) as timings:
+        try:
+            async with limit(limits and limits.download):
+                file_content, filename = await download_image(file_url)
+            yield {"event": "downloaded", "filename": filename, "size": len(file_content), "elapsed": time.monotonic() - start_time}
+            async for event in service.stream_file(file_content, bypass_cache=bypass_cache, limits=limits):
+                if event["event"] in ("ocr_done", "result"):
+                    event["elapsed"] = time.monotonic() - start_time
+                if event["event"] == "result" and timings is not None:
+                    event["timings"] = timings
+                yield event
+        except HTTPException as e:
+            yield {"event": "error", "status_code": e.status_code, "error_message": str(e.detail)}
+        except Exception as e:
+            logger.error(f"Failed to stream {file_url}: {e}", exc_info=True)
+            yield {"event": "error", "status_code": 500, "error_message": f"An unexpected error occurred: {str(e)}"}
+
+
+def stream_extraction(
+    request: Request,
+    service: BaseNoteService,
+    file_url: str,
+    bypass_cache: bool,
+    limits: Optional[StageLimits] = None,
+    include_timings: bool = False,
+) -> StreamingResponse:
+    """Streams pipeline events as NDJSON, or as Server-Sent Events when the client accepts them.
+
+    With `include_timings` the `result` event carries the per-stage timing breakdown.
+    """
+    use_sse = SSE_MEDIA_TYPE in request.headers.get("accept", "")
+
+    async def body() -> AsyncIterator[str]:
+        async for event in _events(service, file_url, bypass_cache, limits, include_timings):
+            payload = json.dumps(event, ensure_ascii=False)
+            if use_sse:
+                yield f"event: {event['event']}\ndata: {payload}\n\n"
+            else:
+                yield payload + "\n"
+
+    return StreamingResponse(
+        body(),
+        media_type=SSE_MEDIA_TYPE if use_sse else NDJSON_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
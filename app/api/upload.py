@@ -0,0 +1,201 @@
+import logging
+import time
+from tempfile import SpooledTemporaryFile
+from typing import List, Optional, Tuple, Type, TypeVar
+
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel
+from starlette.datastructures import UploadFile
+
+from app.api.pipeline import extract_document_from_bytes
+from app.core.config import settings
+from app.core.metrics import collect_timings, download_bytes, stage
+from app.core.registry import service_registry
+from app.models.common import PageMode, PipelineMode
+from app.services.base import BaseNoteService
+from app.utils.pages import PDF_MIME_TYPE
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R", bound=BaseModel)
+
+# Multipart framing (boundaries, part headers, small form fields) allowed on top of the image itself.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "file": {
+                            "type": "array",
+                            "items": {"type": "string", "format": "binary"},
+                            "description": "One part per photo or PDF of the note, in page order",
+                        }
+                    },
+                    "required": ["file"],
+                }
+            },
+            "image/*": {"schema": {"type": "string", "format": "binary"}},
+            PDF_MIME_TYPE: {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+
+def _too_large(size: int) -> HTTPException:
+    logger.warning(f"Upload denied due to size. Size: {size}+ bytes, Max: {settings.MAX_FILE_SIZE_BYTES} bytes.")
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Image file size exceeds the maximum limit of {settings.MAX_FILE_SIZE_MB} MB."
+    )
+
+
+def _accepted(content_type: str) -> bool:
+    return content_type.startswith("image/") or content_type.startswith(PDF_MIME_TYPE)
+
+
+def _not_an_image(content_type: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail=f"Upload must be images or PDFs (multipart 'file' parts or a raw image/* or application/pdf body). Content-Type received: {content_type}"
+    )
+
+
+def _check_declared_length(request: Request, limit: int) -> None:
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        raise _too_large(int(content_length))
+
+
+async def _read_raw(request: Request) -> bytes:
+    max_bytes = settings.MAX_FILE_SIZE_BYTES
+    _check_declared_length(request, max_bytes)
+    # While a (possibly slow) client is still sending, a large body sits in a temp file rather
+    # than in memory; it is read back once, in full, when it is handed to the pipeline.
+    size = 0
+    with SpooledTemporaryFile(max_size=settings.UPLOAD_SPOOL_MAX_BYTES) as spool:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > max_bytes:
+                raise _too_large(size)
+            spool.write(chunk)
+        spool.seek(0)
+        return spool.read()
+
+
+async def _read_multipart(request: Request) -> List[Tuple[bytes, str]]:
+    limit = settings.MAX_FILE_SIZE_BYTES + MULTIPART_OVERHEAD_BYTES
+    _check_declared_length(request, limit)
+    received = 0
+
+    async def capped_receive():
+        # Stop the multipart parser as soon as the body crosses the cap instead of after spooling it all.
+        nonlocal received
+        message = await request.receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > limit:
+                raise _too_large(received)
+        return message
+
+    # Starlette spools file parts into a SpooledTemporaryFile (in memory up to 1 MB, then on disk).
+    form = await Request(request.scope, capped_receive).form(max_files=settings.DOCUMENT_MAX_FILES, max_fields=16)
+    try:
+        uploads = [upload for upload in form.getlist("file") if isinstance(upload, UploadFile)]
+        if not uploads:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Multipart upload needs a 'file' part.")
+        files: List[Tuple[bytes, str]] = []
+        total = 0
+        for upload in uploads:
+            content_type = upload.content_type or ""
+            if not _accepted(content_type):
+                raise _not_an_image(content_type)
+            file_content = await upload.read()
+            total += len(file_content)
+            if total > settings.MAX_FILE_SIZE_BYTES:
+                raise _too_large(total)
+            files.append((file_content, upload.filename or "uploaded_image"))
+        return files
+    finally:
+        await form.close()
+
+
+async def read_uploads(request: Request) -> List[Tuple[bytes, str]]:
+    """Reads the photos/PDFs of one note, sent as multipart 'file' parts or as a raw image/* or PDF body.
+
+    MAX_FILE_SIZE_BYTES caps the whole upload; returns (content, filename) pairs in upload order.
+    """
+    content_type = request.headers.get("content-type", "")
+    with stage("upload"):
+        if content_type.startswith("multipart/form-data"):
+            files = await _read_multipart(request)
+        elif _accepted(content_type):
+            files = [(await _read_raw(request), "uploaded_image")]
+        else:
+            raise _not_an_image(content_type)
+    if not all(file_content for file_content, _ in files):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file is empty.")
+    for file_content, filename in files:
+        download_bytes.observe(len(file_content))
+        logger.info(f"Received uploaded file '{filename}'. Size: {len(file_content)} bytes.")
+    return files
+
+
+async def extract_upload(
+    http_request: Request,
+    service_cls: Type[BaseNoteService],
+    response_model: Type[R],
+    note_label: str,
+    model_name: Optional[str] = None,
+    bypass_cache: bool = False,
+    pipeline_mode: Optional[PipelineMode] = None,
+    page_mode: PageMode = PageMode.MERGED,
+    include_timings: bool = False,
+) -> R:
+    """Body of the /<note type>/upload endpoints: reads the uploaded files and runs the document pipeline.
+
+    Upload errors (size, type, empty body) are raised as HTTP errors; pipeline failures are returned
+    as an `error` response, like the URL endpoints do.
+    """
+    start_time = time.monotonic()
+    service = service_registry.get_service(service_cls, model_name)
+
+    with collect_timings(include_timings) as timings:
+        files = await read_uploads(http_request)
+        filename = ", ".join(name for _, name in files)
+        try:
+            result = await extract_document_from_bytes(
+                service,
+                [file_content for file_content, _ in files],
+                bypass_cache=bypass_cache,
+                pipeline_mode=pipeline_mode,
+                page_mode=page_mode
+            )
+
+            elapsed_time = time.monotonic() - start_time
+            logger.info(f"Successfully processed uploaded {note_label} '{filename}' in {elapsed_time:.2f}s")
+            return response_model(
+                status="success",
+                data=result["data"],
+                pages=result["pages"],
+                processing_time=elapsed_time,
+                timings=timings
+            )
+        except HTTPException as e:
+            raise e
+        except Exception as e:
+            elapsed_time = time.monotonic() - start_time
+            error_message = f"An unexpected error occurred: {str(e)}"
+            logger.error(f"Failed to process uploaded '{filename}': {error_message}", exc_info=True)
+
+            return response_model(
+                status="error",
+                data=None,
+                processing_time=elapsed_time,
+                error_message=error_message,
+                timings=timings
+            )
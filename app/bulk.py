@@ -0,0 +1,375 @@
+"""Offline bulk extraction for backfills: the service pipeline without the HTTP layer.
+
+Usage:
+    python -m app.bulk archive/2023/ --note-type concrete_note --output concrete.jsonl
+    python -m app.bulk "scans/**/*.pdf" --output results.parquet --concurrency 32
+    python -m app.bulk --manifest paths_and_urls.txt --note-type auto --output out.jsonl
+
+Sources are directories (searched recursively for images and PDFs), glob patterns, files, URLs
+and/or a manifest with one path or URL per line (`-` reads it from stdin). Each note runs through
+the same code as the HTTP endpoints: `process_document` of one shared service instance, or,
+with `--note-type auto`, the OCR-once classifier of /extract (two-stage and merged only, so it
+rejects `--pipeline-mode single_pass` and `--page-mode per_page`). `--concurrency` notes are in
+flight at once, and OCR and extraction calls are capped separately like batch requests.
+
+Results stream to JSONL (appended) or, for a `.parquet` output, to part files in a directory of
+that name (needs pyarrow). Every `--flush-every` notes the output is flushed and the finished
+sources are appended to the checkpoint file (`<output>.checkpoint`), so a run that is killed
+can be started again with the same arguments and only processes what is left. Notes that
+failed are retried with `--retry-errors`; the output is append-only, so a retried note gets a
+new row after its earlier error row: read the output keeping the last row per `source`.
+Ctrl-C (or SIGTERM) stops scheduling new notes, lets the ones in flight finish and flushes.
+Progress, throughput and ETA are printed to stderr.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.api.download import download_image
+from app.api.pipeline import extract_any_from_bytes
+from app.core.cache import extraction_cache, ocr_cache
+from app.core.concurrency import StageLimits, limit
+from app.core.config import settings
+from app.core.executor import shutdown_cpu_executor
+from app.core.http import close_http_client
+from app.core.prompts import prompt_store
+from app.core.registry import service_registry
+from app.models.common import PageMode, PipelineMode
+from app.services.base import OCR_PROMPT
+from app.services.note_types import note_types
+
+logger = logging.getLogger("app.bulk")
+
+FILE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff", ".gif", ".pdf")
+PARQUET_COLUMNS = ("source", "status", "note_type", "route", "data", "pages", "error_message", "processing_time")
+
+
+def is_url(source: str) -> bool:
+    return source.startswith(("http://", "https://"))
+
+
+def expand_sources(arguments: Iterable[str], manifest: Optional[str]) -> List[str]:
+    """Every source to process, in order and without duplicates.
+
+    Manifest lines are expanded like positional arguments, so they may be directories or globs too.
+    """
+    entries: List[str] = []
+    if manifest:
+        stream = sys.stdin if manifest == "-" else open(manifest, "r", encoding="utf-8")
+        with stream:
+            entries.extend(line.strip() for line in stream if line.strip() and not line.startswith("#"))
+    entries.extend(arguments)
+    sources: List[str] = []
+    for entry in entries:
+        if is_url(entry):
+            sources.append(entry)
+        elif os.path.isdir(entry):
+            for root, dirs, files in os.walk(entry):
+                dirs.sort()
+                sources.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(FILE_EXTENSIONS))
+        elif glob.has_magic(entry):
+            sources.extend(path for path in sorted(glob.glob(entry, recursive=True)) if os.path.isfile(path))
+        else:
+            sources.append(entry)
+    return list(dict.fromkeys(sources))
+
+
+class Checkpoint:
+    """Append-only log of finished sources: one JSON object per line with `source` and `status`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.finished: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short when the previous run was killed
+                    self.finished[entry["source"]] = entry["status"]
+        self._file = open(path, "a", encoding="utf-8")
+
+    def done(self, retry_errors: bool) -> Set[str]:
+        return {source for source, status in self.finished.items() if status == "success" or not retry_errors}
+
+    def commit(self, records: List[Dict[str, Any]]) -> None:
+        for record in records:
+            self._file.write(json.dumps({"source": record["source"], "status": record["status"]}, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class JsonlSink:
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def flush(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetSink:
+    """Writes each flushed block of records as the next `part-NNNNN.parquet` file of a directory.
+
+    `data` and `pages` are stored as JSON strings so every note type fits one schema.
+    """
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("Parquet output needs the 'pyarrow' package; install it or write JSONL instead")
+        self._pa, self._pq = pyarrow, pyarrow.parquet
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._part = len([name for name in os.listdir(path) if name.startswith("part-") and name.endswith(".parquet")])
+        self._rows: List[Dict[str, Any]] = []
+
+    def write(self, record: Dict[str, Any]) -> None:
+        row = {column: record.get(column) for column in PARQUET_COLUMNS}
+        for column in ("data", "pages"):
+            row[column] = json.dumps(row[column], ensure_ascii=False) if row[column] is not None else None
+        self._rows.append(row)
+
+    def flush(self) -> None:
+        if not self._rows:
+            return
+        table = self._pa.Table.from_pylist(self._rows, schema=self._pa.schema([
+            ("source", self._pa.string()), ("status", self._pa.string()), ("note_type", self._pa.string()),
+            ("route", self._pa.string()), ("data", self._pa.string()), ("pages", self._pa.string()),
+            ("error_message", self._pa.string()), ("processing_time", self._pa.float64()),
+        ]))
+        path = os.path.join(self.path, f"part-{self._part:05d}.parquet")
+        self._pq.write_table(table, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+        self._part += 1
+        self._rows = []
+
+    def close(self) -> None:
+        self.flush()
+
+
+class Progress:
+    """Live counts, throughput and ETA on stderr."""
+
+    def __init__(self, total: int, skipped: int, interval: float):
+        self.total = total
+        self.skipped = skipped
+        self.interval = interval
+        self.succeeded = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self._last_report = 0.0
+        self._reported = -1  # notes done at the last report
+        self._tty = sys.stderr.isatty()
+
+    def record(self, status: str) -> None:
+        if status == "success":
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        now = time.monotonic()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def line(self) -> str:
+        done = self.succeeded + self.failed
+        elapsed = time.monotonic() - self.started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.skipped - done
+        eta = time.strftime("%H:%M:%S", time.gmtime(remaining / rate)) if rate > 0 else "--:--:--"
+        return (
+            f"{self.skipped + done}/{self.total} ({self.skipped} from checkpoint, {self.succeeded} ok, "
+            f"{self.failed} failed)  {rate:.2f} notes/s  ETA {eta}"
+        )
+
+    def report(self, final: bool = False) -> None:
+        done = self.succeeded + self.failed
+        if final and not self._tty and done == self._reported:
+            return
+        self._reported = done
+        end = "\n" if final or not self._tty else ""
+        print(("\r" if self._tty else "") + self.line(), end=end, file=sys.stderr, flush=True)
+
+
+async def read_source(source: str, limits: StageLimits) -> bytes:
+    if is_url(source):
+        async with limit(limits.download):
+            file_content, _ = await download_image(source)
+        return file_content
+
+    def read() -> bytes:
+        size = os.path.getsize(source)
+        if size > settings.MAX_FILE_SIZE_BYTES:
+            raise ValueError(f"File is {size} bytes, above the {settings.MAX_FILE_SIZE_MB} MB limit")
+        with open(source, "rb") as f:
+            return f.read()
+
+    return await asyncio.to_thread(read)
+
+
+async def process_source(source: str, args: argparse.Namespace, limits: StageLimits) -> Dict[str, Any]:
+    start_time = time.monotonic()
+    record: Dict[str, Any] = {"source": source, "status": "success", "note_type": None, "route": None}
+    try:
+        file_content = await read_source(source, limits)
+        if args.note_type == "auto":
+            result = await extract_any_from_bytes(
+                [file_content], model_name=args.model_name, bypass_cache=args.bypass_cache, limits=limits
+            )
+            record.update(note_type=result["note_type"], route=result["route"], data=result["data"], pages=result["pages"])
+        else:
+            spec = note_types.get(args.note_type)
+            service = service_registry.get_service(spec.service_cls, args.model_name or spec.default_model)
+            result = await service.process_document(
+                [file_content],
+                bypass_cache=args.bypass_cache,
+                limits=limits,
+                pipeline_mode=args.pipeline_mode,
+                page_mode=args.page_mode,
+            )
+            record.update(note_type=spec.name, data=result["data"], pages=result["pages"])
+    except Exception as e:
+        logger.debug(f"Failed to process {source}", exc_info=True)
+        record.update(status="error", error_message=str(getattr(e, "detail", None) or e))
+    record["processing_time"] = time.monotonic() - start_time
+    return record
+
+
+async def run(args: argparse.Namespace, sources: List[str]) -> int:
+    checkpoint = Checkpoint(args.checkpoint or f"{args.output}.checkpoint")
+    done = checkpoint.done(args.retry_errors)
+    pending = [source for source in sources if source not in done]
+    sink = ParquetSink(args.output) if args.output.endswith(".parquet") else JsonlSink(args.output)
+    progress = Progress(len(sources), len(sources) - len(pending), args.progress_interval)
+    limits = StageLimits(
+        download=asyncio.Semaphore(args.concurrency),
+        ocr=asyncio.Semaphore(args.ocr_concurrency),
+        llm=asyncio.Semaphore(args.llm_concurrency),
+    )
+    prompt_store.preload([OCR_PROMPT, *(spec.service_cls.DEFAULT_PROMPT for spec in note_types.all())])
+
+    window = asyncio.Semaphore(args.concurrency)
+    in_flight: Set[asyncio.Task] = set()
+    stopping = asyncio.Event()
+
+    def stop() -> None:
+        # First signal: drain. Second: cancel the notes in flight too (they are redone on resume).
+        if stopping.is_set():
+            for task in list(in_flight):
+                task.cancel()
+        stopping.set()
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop)
+
+    unflushed: List[Dict[str, Any]] = []
+    last_flush = time.monotonic()
+
+    def flush() -> None:
+        nonlocal last_flush
+        # Results first, then the checkpoint: a note is only skipped next time once its result is on disk.
+        sink.flush()
+        checkpoint.commit(unflushed)
+        unflushed.clear()
+        last_flush = time.monotonic()
+
+    def finished(task: asyncio.Task) -> None:
+        in_flight.discard(task)
+        window.release()
+        if task.cancelled():
+            return
+        record = task.result()
+        sink.write(record)
+        unflushed.append(record)
+        progress.record(record["status"])
+        if len(unflushed) >= args.flush_every or time.monotonic() - last_flush >= args.flush_seconds:
+            flush()
+
+    try:
+        for source in pending:
+            await window.acquire()
+            if stopping.is_set():
+                window.release()
+                break
+            task = asyncio.create_task(process_source(source, args, limits))
+            in_flight.add(task)
+            task.add_done_callback(finished)
+        if in_flight:
+            if stopping.is_set():
+                print(f"\nStopping: waiting for {len(in_flight)} notes in flight", file=sys.stderr, flush=True)
+            await asyncio.gather(*in_flight, return_exceptions=True)
+    finally:
+        flush()
+        sink.close()
+        checkpoint.close()
+        progress.report(final=True)
+        await service_registry.aclose()
+        await close_http_client()
+        shutdown_cpu_executor()
+        ocr_cache.close()
+        extraction_cache.close()
+        if settings.DEDUP_ENABLED:
+            from app.core.dedup import close_note_index
+            await close_note_index()
+    return 1 if progress.failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="*", help="Files, directories, glob patterns or URLs")
+    parser.add_argument("--manifest", help="File with one path or URL per line, '-' for stdin")
+    parser.add_argument("--output", required=True, help="JSONL file, or a directory of part files when it ends in .parquet")
+    parser.add_argument("--checkpoint", help="Defaults to <output>.checkpoint")
+    parser.add_argument("--note-type", default="auto", help="A registered note type, or 'auto' to classify each note")
+    parser.add_argument("--model-name", default=None, help="Extraction model; defaults to the note type's default")
+    parser.add_argument("--pipeline-mode", type=PipelineMode, choices=list(PipelineMode), default=None)
+    parser.add_argument("--page-mode", type=PageMode, choices=list(PageMode), default=PageMode.MERGED)
+    parser.add_argument("--bypass-cache", action="store_true", help="Ignore cached OCR/extraction results")
+    parser.add_argument("--concurrency", type=int, default=settings.BATCH_DOWNLOAD_CONCURRENCY, help="Notes in flight")
+    parser.add_argument("--ocr-concurrency", type=int, default=settings.BATCH_OCR_CONCURRENCY)
+    parser.add_argument("--llm-concurrency", type=int, default=settings.BATCH_LLM_CONCURRENCY)
+    parser.add_argument("--retry-errors", action="store_true", help="Process notes that failed in a previous run again")
+    parser.add_argument("--flush-every", type=int, default=100, help="Notes between output/checkpoint flushes")
+    parser.add_argument("--flush-seconds", type=float, default=10.0, help="Longest time between flushes")
+    parser.add_argument("--progress-interval", type=float, default=2.0, help="Seconds between progress lines")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.note_type != "auto" and note_types.get(args.note_type) is None:
+        parser.error(f"unknown note type '{args.note_type}' (known: {', '.join(spec.name for spec in note_types.all())}, auto)")
+    if args.note_type == "auto" and (args.pipeline_mode == PipelineMode.SINGLE_PASS or args.page_mode == PageMode.PER_PAGE):
+        # The classifier needs the OCR text of the whole note, so auto is always two-stage and merged.
+        parser.error("--note-type auto runs the two-stage, merged pipeline; pass a note type for single_pass or per_page")
+    sources = expand_sources(args.sources, args.manifest)
+    if not sources:
+        parser.error("no sources to process")
+    sys.exit(asyncio.run(run(args, sources)))
+
+
+if __name__ == "__main__":
+    main()
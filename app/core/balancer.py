@@ -0,0 +1,232 @@
+"""Client-side load balancing across replicas of one OpenAI-compatible model server.
+
+`BalancedChatModel` is a LangChain Runnable that holds one chat model (and therefore one HTTP
+connection pool) per replica URL and routes every call to the best healthy replica, either by
+fewest outstanding requests or by EWMA latency weighted by load. Replicas that keep failing are
+ejected for a while; a background health check re-admits them once `/models` answers again.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from app.core.config import settings
+from app.core.http import close_model, get_http_client
+from app.core.resilience import is_retryable
+
+logger = logging.getLogger(__name__)
+
+
+def is_replica_fault(error: BaseException) -> bool:
+    """Errors that count towards ejecting a replica: retryable ones and any other 5xx."""
+    if is_retryable(error):
+        return True
+    status_code = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return isinstance(status_code, int) and status_code >= 500
+
+
+class Replica:
+    def __init__(self, base_url: str, model: Any):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.outstanding = 0
+        self.ewma_latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+
+    @property
+    def healthy(self) -> bool:
+        return self.ejected_until <= time.monotonic()
+
+    def record(self, latency: Optional[float], failed: bool) -> None:
+        """Records a finished call: a success (with its latency), a replica fault, or neither.
+
+        Only a success resets the failure streak; errors that say nothing about the replica
+        (bad requests, cancelled calls) leave it as it is.
+        """
+        if failed:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= settings.LB_EJECT_AFTER_FAILURES:
+                self.eject()
+            return
+        if latency is None:
+            return
+        self.consecutive_failures = 0
+        alpha = settings.LB_EWMA_ALPHA
+        self.ewma_latency = latency if self.ewma_latency is None else alpha * latency + (1 - alpha) * self.ewma_latency
+
+    def eject(self) -> None:
+        if self.healthy:
+            self.ejections += 1
+            logger.warning(f"Ejecting replica {self.base_url} after {self.consecutive_failures} failures")
+        self.ejected_until = time.monotonic() + settings.LB_EJECT_SECONDS
+
+    def readmit(self) -> None:
+        """Called when a health check passes. `/models` answering does not prove completions work,
+        so the failure streak of a replica that is still admitted is kept."""
+        if not self.healthy:
+            logger.info(f"Re-admitting replica {self.base_url}")
+            self.ejected_until = 0.0
+            self.consecutive_failures = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "ewma_latency_seconds": self.ewma_latency,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+        }
+
+
+class BalancedChatModel(Runnable):
+    """Routes chat model calls across `replicas` (see module docstring)."""
+
+    def __init__(self, name: str, replicas: List[Replica], strategy: str = "least_outstanding", api_key: Optional[str] = None):
+        self.name = name
+        self.replicas = replicas
+        self.strategy = strategy
+        self.api_key = api_key
+        self._health_task: Optional[asyncio.Task] = None
+
+    @property
+    def temperature(self) -> Optional[float]:
+        return getattr(self.replicas[0].model, "temperature", None)
+
+    def _score(self, replica: Replica) -> float:
+        if self.strategy == "ewma":
+            # Unmeasured replicas get tried first; otherwise expected wait = latency x queue depth.
+            return 0.0 if replica.ewma_latency is None else replica.ewma_latency * (replica.outstanding + 1)
+        return replica.outstanding
+
+    def pick(self) -> Replica:
+        candidates = [r for r in self.replicas if r.healthy] or self.replicas  # fail open if all are ejected
+        best = min(self._score(r) for r in candidates)
+        return random.choice([r for r in candidates if self._score(r) == best])
+
+    def _ensure_health_checks(self) -> None:
+        if self._health_task is None and settings.LB_HEALTH_CHECK_INTERVAL_SECONDS > 0:
+            try:
+                self._health_task = asyncio.get_running_loop().create_task(self._health_loop())
+            except RuntimeError:
+                pass  # no running loop (sync caller); passive ejection still applies
+
+    async def _health_loop(self) -> None:
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        while True:
+            await asyncio.sleep(settings.LB_HEALTH_CHECK_INTERVAL_SECONDS)
+            for replica in self.replicas:
+                try:
+                    response = await get_http_client().get(
+                        f"{replica.base_url}/models", headers=headers, timeout=settings.LB_HEALTH_CHECK_TIMEOUT_SECONDS
+                    )
+                    response.raise_for_status()
+                    replica.readmit()
+                except Exception as e:
+                    logger.debug(f"Health check failed for {replica.base_url}: {e}")
+                    replica.consecutive_failures += 1
+                    if replica.consecutive_failures >= settings.LB_EJECT_AFTER_FAILURES:
+                        replica.eject()
+
+    def _begin(self) -> Replica:
+        replica = self.pick()
+        replica.outstanding += 1
+        replica.requests += 1
+        return replica
+
+    def _end(self, replica: Replica, start: float, error: Optional[BaseException]) -> None:
+        replica.outstanding -= 1
+        failed = error is not None and is_replica_fault(error)
+        replica.record(None if error is not None else time.monotonic() - start, failed)
+
+    def _call(self, method: Callable[[Replica], Any]) -> Any:
+        replica = self._begin()
+        start = time.monotonic()
+        try:
+            result = method(replica)
+        except BaseException as e:
+            self._end(replica, start, e)
+            raise
+        self._end(replica, start, None)
+        return result
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return self._call(lambda replica: replica.model.invoke(input, config, **kwargs))
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        self._ensure_health_checks()
+        replica = self._begin()
+        start = time.monotonic()
+        try:
+            result = await replica.model.ainvoke(input, config, **kwargs)
+        except BaseException as e:
+            self._end(replica, start, e)
+            raise
+        self._end(replica, start, None)
+        return result
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[Any]:
+        replica = self._begin()
+        start = time.monotonic()
+        try:
+            yield from replica.model.stream(input, config, **kwargs)
+        except BaseException as e:
+            self._end(replica, start, e)
+            raise
+        self._end(replica, start, None)
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        self._ensure_health_checks()
+        replica = self._begin()
+        start = time.monotonic()
+        try:
+            async for chunk in replica.model.astream(input, config, **kwargs):
+                yield chunk
+        except BaseException as e:
+            self._end(replica, start, e)
+            raise
+        self._end(replica, start, None)
+
+    def get_num_tokens(self, text: str) -> int:
+        return self.replicas[0].model.get_num_tokens(text)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {replica.base_url: replica.stats() for replica in self.replicas}
+
+    async def aclose(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        for replica in self.replicas:
+            await close_model(replica.model)
+        if self in _balanced_models:
+            _balanced_models.remove(self)
+
+
+_balanced_models: List[BalancedChatModel] = []
+
+
+def balanced(name: str, urls: List[str], build: Callable[[str], Any], api_key: Optional[str] = None) -> Any:
+    """One plain model for a single URL, a BalancedChatModel over per-replica models otherwise."""
+    if len(urls) <= 1:
+        return build(urls[0] if urls else None)
+    model = BalancedChatModel(
+        name=name,
+        replicas=[Replica(url, build(url)) for url in urls],
+        strategy=settings.LB_STRATEGY,
+        api_key=api_key,
+    )
+    _balanced_models.append(model)
+    return model
+
+
+def balancer_stats() -> Dict[str, Dict[str, Any]]:
+    return {model.name: model.stats() for model in _balanced_models}
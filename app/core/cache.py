@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(*parts) -> str:
+    """Builds a content-addressed key from bytes/str parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            part = b""
+        elif isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class CacheBackend:
+    """Persistent second tier for `TieredCache`. Implementations are blocking; they run in a thread."""
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Cache tier stored in a single SQLite file, survives process restarts."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per process: a handle opened before app.serve forks its workers must not be shared.
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+            )
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at < time.time():
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+class DirectoryCacheBackend(CacheBackend):
+    """Cache tier stored as one file per key under a directory, survives process restarts."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._file(key)
+        try:
+            with open(path, "rb") as f:
+                expires_at = float(f.readline() or 0)
+                if expires_at and expires_at < time.time():
+                    os.remove(path)
+                    return None
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        path = self._file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        expires_at = time.time() + ttl if ttl else 0
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(f"{expires_at}\n".encode("ascii"))
+            f.write(value)
+        os.replace(tmp_path, path)
+
+
+def build_backend(path: Optional[str]) -> Optional[CacheBackend]:
+    """SQLite for `*.sqlite3`/`*.db` paths, a directory store for anything else, None when unset."""
+    if not path:
+        return None
+    if path.endswith((".sqlite3", ".sqlite", ".db")):
+        return SQLiteCacheBackend(path)
+    return DirectoryCacheBackend(path)
+
+
+class LRUCache:
+    """In-memory LRU bounded by the total size of the stored values, with per-entry TTL."""
+
+    def __init__(self, max_bytes: int, ttl: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.current_bytes = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self.current_bytes -= len(value)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TieredCache:
+    """Memory LRU in front of an optional persistent backend. Values must be JSON-serializable."""
+
+    def __init__(
+        self,
+        name: str,
+        max_bytes: int,
+        ttl: Optional[float] = None,
+        backend: Optional[CacheBackend] = None,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.memory = LRUCache(max_bytes=max_bytes, ttl=ttl)
+        self.backend = backend
+        self.memory_hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = self.memory.get(key)
+        if raw is not None:
+            self.memory_hits += 1
+            return json.loads(raw)
+        if self.backend is not None:
+            try:
+                raw = await asyncio.to_thread(self.backend.get, key)
+            except Exception as e:
+                logger.warning(f"Cache '{self.name}' backend read failed: {e}")
+                raw = None
+            if raw is not None:
+                self.backend_hits += 1
+                self.memory.set(key, raw)
+                return json.loads(raw)
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        raw = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        self.memory.set(key, raw)
+        if self.backend is not None:
+            try:
+                await asyncio.to_thread(self.backend.set, key, raw, self.ttl)
+            except Exception as e:
+                logger.warning(f"Cache '{self.name}' backend write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory_hits": self.memory_hits,
+            "backend_hits": self.backend_hits,
+            "misses": self.misses,
+            "evictions": self.memory.evictions,
+            "entries": len(self.memory),
+            "bytes": self.memory.current_bytes,
+            "max_bytes": self.memory.max_bytes,
+        }
+
+    def close(self) -> None:
+        if self.backend is not None:
+            self.backend.close()
+
+
+ocr_cache = TieredCache(
+    name="ocr",
+    max_bytes=settings.OCR_CACHE_MAX_MB * 1024 * 1024,
+    ttl=settings.OCR_CACHE_TTL_SECONDS,
+    backend=build_backend(settings.OCR_CACHE_PATH),
+)
+
+extraction_cache = TieredCache(
+    name="extraction",
+    max_bytes=settings.EXTRACTION_CACHE_MAX_MB * 1024 * 1024,
+    ttl=settings.EXTRACTION_CACHE_TTL_SECONDS,
+    backend=build_backend(settings.EXTRACTION_CACHE_PATH),
+)
@@ -0,0 +1,32 @@
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import settings
+
+
+@asynccontextmanager
+async def limit(semaphore: Optional[asyncio.Semaphore]):
+    """`async with semaphore`, or a no-op when no limit is configured."""
+    if semaphore is None:
+        yield
+        return
+    async with semaphore:
+        yield
+
+
+@dataclass
+class StageLimits:
+    """Per-stage concurrency caps for the download -> OCR -> extract pipeline."""
+    download: Optional[asyncio.Semaphore] = None
+    ocr: Optional[asyncio.Semaphore] = None
+    llm: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    def for_batch(cls) -> "StageLimits":
+        return cls(
+            download=asyncio.Semaphore(settings.BATCH_DOWNLOAD_CONCURRENCY),
+            ocr=asyncio.Semaphore(settings.BATCH_OCR_CONCURRENCY),
+            llm=asyncio.Semaphore(settings.BATCH_LLM_CONCURRENCY),
+        )
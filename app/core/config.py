@@ -10,9 +10,11 @@ class Settings(BaseSettings):
     MODEL_EMBEDDINGS: Optional[str] = os.getenv("MODEL_EMBEDDINGS") or "text-embedding-004"
 
     QWEN_LLM_URL: Optional[str] = os.getenv("QWEN_LLM_URL") 
+    QWEN_LLM_URLS: Optional[str] = os.getenv("QWEN_LLM_URLS")  # comma-separated replicas, overrides QWEN_LLM_URL
     QWEN_EMBEDDING_URL: Optional[str] = os.getenv("QWEN_EMBEDDING_URL")
 
     VINTERN_LLM_URL: Optional[str] = os.getenv("VINTERN_LLM_URL")
+    VINTERN_LLM_URLS: Optional[str] = os.getenv("VINTERN_LLM_URLS")  # comma-separated replicas, overrides VINTERN_LLM_URL
     VINTERN_MODEL: str = "5CD-AI/Vintern-3B-R-beta"
 
     # API Settings
@@ -37,11 +39,134 @@ class Settings(BaseSettings):
     def MAX_FILE_SIZE_BYTES(self) -> int:
         return self.MAX_FILE_SIZE_MB * 1024 * 1024
 
+    UPLOAD_SPOOL_MAX_BYTES: int = 1024 * 1024  # raw image bodies above this spill to a temp file while streaming in
+
+    # Shared outbound HTTP client (image downloads, job callbacks)
+    HTTP2_ENABLED: bool = True
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP_TIMEOUT_SECONDS: float = 30.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+
+    # Pipeline settings
+    PIPELINE_MODE: str = "two_stage"  # "two_stage" or "single_pass"; requests may override
+    VISION_MODEL_PROVIDERS: str = "gemini"  # providers whose chat models accept images
+
+    # Unified /extract endpoint: local note type classification of the OCR text
+    NOTE_TYPE_AMBIGUITY_RATIO: float = 0.6  # runner-up scoring at least this fraction of the best is also extracted
+    NOTE_TYPE_MAX_CANDIDATES: int = 2
+
+    # Structured extraction output (OpenAI-compatible servers such as vLLM)
+    STRUCTURED_OUTPUT_MODE: str = "json_schema"  # "json_schema" (response_format), "guided_json" (vLLM extra_body) or "off"
+    STRUCTURED_OUTPUT_PROVIDERS: str = "qwen"  # providers whose servers accept a JSON schema
+    DISABLE_THINKING: bool = True  # sends enable_thinking=false to Qwen3 chat templates
+    EXTRACTION_REASK_ATTEMPTS: int = 1  # new model calls when the output cannot be parsed or repaired
+
+    # Resilient model call layer (per upstream = per model name)
+    OCR_MAX_CONCURRENCY: int = 8
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_CALL_TIMEOUT_SECONDS: float = 120.0
+    LLM_REQUEST_DEADLINE_SECONDS: Optional[float] = 300.0
+    LLM_MAX_ATTEMPTS: int = 3
+    LLM_RETRY_BASE_SECONDS: float = 0.5
+    LLM_RETRY_MAX_SECONDS: float = 8.0
+    LLM_CLIENT_MAX_RETRIES: int = 0  # retries inside the SDK clients; the call layer retries instead
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+    LLM_HEDGING_ENABLED: bool = False
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_LATENCY_WINDOW: int = 200
+
+    # Replica load balancing for QWEN_LLM_URLS / VINTERN_LLM_URLS
+    LB_STRATEGY: str = "least_outstanding"  # or "ewma"
+    LB_EWMA_ALPHA: float = 0.3
+    LB_EJECT_AFTER_FAILURES: int = 3
+    LB_EJECT_SECONDS: float = 30.0
+    LB_HEALTH_CHECK_INTERVAL_SECONDS: float = 10.0  # 0 disables active health checks
+    LB_HEALTH_CHECK_TIMEOUT_SECONDS: float = 2.0
+
+    # Image preprocessing (runs off the event loop)
+    IMAGE_POOL_KIND: str = "thread"  # "thread", "process" or "inline"
+    IMAGE_POOL_WORKERS: int = 0  # 0 = executor default
+    IMAGE_PREP_MODE: str = "fixed"  # "fixed" (IMAGE_MAX_DIMENSION cap) or opt-in "adaptive" (content-aware)
+    IMAGE_MAX_DIMENSION: int = 1024
+    IMAGE_MIN_DIMENSION: int = 768  # adaptive: sparse notes
+    IMAGE_DENSE_DIMENSION: int = 1600  # adaptive: dense tables
+    IMAGE_JPEG_QUALITY: int = 85
+    IMAGE_PASSTHROUGH_MAX_KB: int = 512  # fixed mode: smaller images within IMAGE_MAX_DIMENSION are sent as-is
+    IMAGE_GRAYSCALE: bool = True
+    IMAGE_AUTO_CROP: bool = True
+    IMAGE_TILING: bool = False
+    IMAGE_TILE_MIN_ASPECT: float = 2.0
+
+    # Multi-page notes: PDFs and several photos of one note
+    DOCUMENT_MAX_FILES: int = 20  # file_url + page_urls, or multipart 'file' parts, per request
+    DOCUMENT_MAX_PAGES: int = 50
+    DOCUMENT_PAGE_WINDOW: int = 4  # pages rendered and OCR'd at once per note, so memory does not grow with page count
+    PDF_RENDER_DPI: int = 150
+
+    # OCR cache settings (shared by all note services)
+    OCR_CACHE_ENABLED: bool = True
+    OCR_CACHE_MAX_MB: int = 64
+    OCR_CACHE_TTL_SECONDS: Optional[float] = 7 * 24 * 3600
+    OCR_CACHE_PATH: Optional[str] = os.getenv("OCR_CACHE_PATH")  # e.g. ".cache/ocr.sqlite3" or a directory
+
+    # Extraction (OCR text -> JSON) cache settings, only used for temperature 0 models
+    EXTRACTION_CACHE_ENABLED: bool = True
+    EXTRACTION_CACHE_MAX_MB: int = 32
+    EXTRACTION_CACHE_TTL_SECONDS: Optional[float] = 30 * 24 * 3600
+    EXTRACTION_CACHE_PATH: Optional[str] = os.getenv("EXTRACTION_CACHE_PATH")
+
+    # Embeddings client (HugEmbeddings): concurrent queries are micro-batched into one request
+    EMBEDDING_BATCH_WINDOW_MS: float = 5.0
+    EMBEDDING_MAX_BATCH_SIZE: int = 32
+
+    # Near-duplicate note index (perceptual image hash + OCR text embedding)
+    DEDUP_ENABLED: bool = False
+    DEDUP_IMAGE_MAX_DISTANCE: int = 40  # Hamming distance between 1024-bit image hashes
+    DEDUP_TEXT_MIN_SIMILARITY: float = 0.98  # cosine similarity between OCR text embeddings
+    DEDUP_EMBEDDING_MODEL: Optional[str] = os.getenv("DEDUP_EMBEDDING_MODEL")  # e.g. "Qwen/Qwen3-Embedding-0.6B"; unset = image hash only
+    DEDUP_MAX_ENTRIES: int = 50000
+    DEDUP_INDEX_PATH: Optional[str] = os.getenv("DEDUP_INDEX_PATH")  # e.g. ".cache/notes.npz", saved on shutdown
+
+    # Batch endpoint settings
+    BATCH_MAX_ITEMS: int = 500
+    BATCH_DOWNLOAD_CONCURRENCY: int = 16
+    BATCH_OCR_CONCURRENCY: int = 4
+    BATCH_LLM_CONCURRENCY: int = 8
+
+    # Background job settings
+    JOBS_WORKERS: int = 4
+    JOBS_QUEUE_MAX_SIZE: int = 1000
+    JOBS_BULK_QUEUE_FRACTION: float = 0.8
+    JOBS_STORE: str = "memory"  # "memory" or "sqlite"
+    JOBS_DB_PATH: str = ".cache/jobs.sqlite3"
+    JOBS_MAX_RETAINED: int = 10000
+    JOBS_WEBHOOK_TIMEOUT_SECONDS: float = 10.0
+    JOBS_WEBHOOK_ATTEMPTS: int = 3
+
+    # Production server (python -m app.serve)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0  # 0 = one per CPU available to the process (affinity / cgroup quota)
+    SERVER_MAX_WORKERS: int = 8  # cap for the automatic worker count
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS: float = 30.0  # on SIGTERM, in-flight requests and running jobs get this long to finish
+    ORJSON_RESPONSES: bool = True  # serialize JSON responses with orjson when it is installed
+
     # Template settings
-    TEMPLATES_DIR: str = "app/templates"
+    TEMPLATES_DIR: str = "app/templates"  # one <note_type>/<note_type>.txt (+ keywords.txt) per note type
+    PROMPT_HOT_RELOAD: bool = True  # re-read a prompt file when its mtime/size changes
+    PROMPT_RELOAD_CHECK_SECONDS: float = 2.0
 
     API_KEY: Optional[str] = os.getenv("API_KEY")
-    API_KEY_NAME: Optional[str] = os.getenv("API_KEY_NAME")
+    API_KEY_NAME: Optional[str] = os.getenv("API_KEY_NAME")  # request header carrying the key, "X-API-Key" if unset
+    API_KEYS: Optional[str] = os.getenv("API_KEYS")  # comma-separated "key" or "key:requests_per_minute", in addition to API_KEY
+    API_RATE_LIMIT_PER_MINUTE: float = 0  # default per-key limit, 0 = unlimited
+    API_RATE_LIMIT_BURST: Optional[int] = None  # bucket size, defaults to one minute's allowance
+    METRICS_PUBLIC: bool = False  # serve /metrics without a key (e.g. for a scraper inside the cluster)
 
     class Config:
         case_sensitive = True
@@ -0,0 +1,289 @@
+"""Near-duplicate detection for resubmitted or re-photographed notes.
+
+`NoteIndex` keeps, per service/model namespace, the 1024-bit perceptual hash of every processed
+image and (when DEDUP_EMBEDDING_MODEL is set) the normalized embedding of its OCR text in
+NumPy arrays, next to the extraction result. A new image within DEDUP_IMAGE_MAX_DISTANCE bits
+of a known one, or whose OCR text embedding has cosine similarity of at least
+DEDUP_TEXT_MIN_SIMILARITY, is answered from the stored result without OCR or extraction.
+Embeddings barely move when only a quantity, date or note number changes, so a text match also
+needs every number in the OCR text to be identical (see numeric_fingerprint).
+The exact-match caches still come first; this catches the same note in a different photo.
+"""
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.executor import run_cpu_bound
+from app.core.llm_config import get_embedding_model
+from app.core.metrics import stage
+from app.utils.image_prep import perceptual_hash
+
+logger = logging.getLogger(__name__)
+
+INITIAL_CAPACITY = 1024
+HASH_BYTES = 128
+
+_DIGITS = re.compile(r"\d+")
+
+
+def hamming_distances(hashes: np.ndarray, value: bytes) -> np.ndarray:
+    xor = np.bitwise_xor(hashes, np.frombuffer(value, dtype=np.uint8))
+    return np.unpackbits(xor, axis=1).sum(axis=1)
+
+
+def numeric_fingerprint(text: str) -> int:
+    """64-bit digest of the digit runs of a text, in order: quantities, dates, note numbers, plates."""
+    digits = "\x00".join(_DIGITS.findall(text)).encode()
+    return int.from_bytes(hashlib.blake2b(digits, digest_size=8).digest(), "little", signed=True)
+
+
+class NoteIndex:
+    """Ring buffer of the last `max_entries` notes (see module docstring)."""
+
+    def __init__(self, max_entries: int, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self._lock = threading.Lock()
+        self._capacity = 0
+        self._hashes = np.zeros((0, HASH_BYTES), dtype=np.uint8)
+        self._namespace_ids = np.zeros(0, dtype=np.int32)
+        self._hashed = np.zeros(0, dtype=bool)
+        self._vectors: Optional[np.ndarray] = None  # (capacity, dim) float32, rows L2-normalized
+        self._fingerprints = np.zeros(0, dtype=np.int64)  # numeric_fingerprint of each row's OCR text
+        self._results: List[Any] = []
+        self._namespaces: Dict[str, int] = {}
+        self._size = 0
+        self._next = 0
+        self.image_hits = 0
+        self.image_misses = 0
+        self.text_hits = 0
+        self.text_misses = 0
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def _reserve(self, size: int) -> None:
+        if size <= self._capacity:
+            return
+        capacity = min(self.max_entries, max(INITIAL_CAPACITY, self._capacity * 2, size))
+        grow = capacity - self._capacity
+        self._hashes = np.concatenate([self._hashes, np.zeros((grow, HASH_BYTES), dtype=np.uint8)])
+        self._namespace_ids = np.concatenate([self._namespace_ids, np.full(grow, -1, dtype=np.int32)])
+        self._hashed = np.concatenate([self._hashed, np.zeros(grow, dtype=bool)])
+        self._fingerprints = np.concatenate([self._fingerprints, np.zeros(grow, dtype=np.int64)])
+        if self._vectors is not None:
+            self._vectors = np.concatenate([self._vectors, np.zeros((grow, self._vectors.shape[1]), dtype=np.float32)])
+        self._results.extend([None] * grow)
+        self._capacity = capacity
+
+    def _candidates(self, namespace: str) -> Optional[np.ndarray]:
+        namespace_id = self._namespaces.get(namespace)
+        if namespace_id is None or self._size == 0:
+            return None
+        return self._namespace_ids[:self._size] == namespace_id
+
+    def _hit(self, index: int) -> Any:
+        return copy.deepcopy(self._results[index])
+
+    def lookup_image(self, namespace: str, image_hash: bytes) -> Optional[Any]:
+        with self._lock:
+            mask = self._candidates(namespace)
+            if mask is not None:
+                mask &= self._hashed[:self._size]
+            if mask is not None and mask.any():
+                distances = np.where(mask, hamming_distances(self._hashes[:self._size], image_hash), HASH_BYTES * 8 + 1)
+                best = int(np.argmin(distances))
+                if distances[best] <= settings.DEDUP_IMAGE_MAX_DISTANCE:
+                    self.image_hits += 1
+                    return self._hit(best)
+            self.image_misses += 1
+            return None
+
+    def lookup_text(self, namespace: str, vector: np.ndarray, fingerprint: int) -> Optional[Any]:
+        with self._lock:
+            mask = self._candidates(namespace)
+            if mask is not None:
+                mask &= self._fingerprints[:self._size] == fingerprint
+            if mask is not None and mask.any() and self._vectors is not None and len(vector) == self._vectors.shape[1]:
+                similarities = np.where(mask, self._vectors[:self._size] @ vector, -1.0)
+                best = int(np.argmax(similarities))
+                if similarities[best] >= settings.DEDUP_TEXT_MIN_SIMILARITY:
+                    self.text_hits += 1
+                    return self._hit(best)
+            self.text_misses += 1
+            return None
+
+    def add(
+        self,
+        namespace: str,
+        image_hash: Optional[bytes],
+        vector: Optional[np.ndarray],
+        result: Any,
+        fingerprint: int = 0,
+    ) -> None:
+        with self._lock:
+            if self._size < self.max_entries:
+                self._reserve(self._size + 1)
+            index = self._next
+            self._namespace_ids[index] = self._namespaces.setdefault(namespace, len(self._namespaces))
+            self._hashed[index] = image_hash is not None and len(image_hash) == HASH_BYTES
+            self._hashes[index] = np.frombuffer(image_hash, dtype=np.uint8) if self._hashed[index] else 0
+            if vector is not None:
+                if self._vectors is None:
+                    self._vectors = np.zeros((self._capacity, len(vector)), dtype=np.float32)
+                if len(vector) == self._vectors.shape[1]:
+                    self._vectors[index] = vector
+            elif self._vectors is not None:
+                self._vectors[index] = 0.0
+            self._fingerprints[index] = fingerprint
+            self._results[index] = copy.deepcopy(result)
+            self._size = min(self._size + 1, self.max_entries)
+            self._next = (index + 1) % self.max_entries
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            size = self._size
+            arrays = {
+                "hashes": self._hashes[:size],
+                "namespace_ids": self._namespace_ids[:size],
+                "hashed": self._hashed[:size],
+                "vectors": self._vectors[:size] if self._vectors is not None else np.zeros((0, 0), dtype=np.float32),
+                "fingerprints": self._fingerprints[:size],
+                "results": np.array(json.dumps(self._results[:size], ensure_ascii=False)),
+                "namespaces": np.array(json.dumps(self._namespaces)),
+                "next": np.array(self._next),
+            }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+        logger.info(f"Saved {size} notes to the duplicate index at {path}")
+
+    def _load(self, path: str) -> None:
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                hashes = data["hashes"]
+                size = min(len(hashes), self.max_entries)
+                self._reserve(size)
+                self._hashes[:size] = hashes[:size]
+                self._namespace_ids[:size] = data["namespace_ids"][:size]
+                self._hashed[:size] = data["hashed"][:size]
+                vectors = data["vectors"]
+                # Indexes saved before fingerprints existed keep their image hashes only.
+                if vectors.size and "fingerprints" in data:
+                    self._vectors = np.zeros((self._capacity, vectors.shape[1]), dtype=np.float32)
+                    self._vectors[:size] = vectors[:size]
+                    self._fingerprints[:size] = data["fingerprints"][:size]
+                self._results[:size] = json.loads(str(data["results"]))[:size]
+                self._namespaces = json.loads(str(data["namespaces"]))
+                self._size = size
+                self._next = int(data["next"]) % self.max_entries if size == self.max_entries else size
+            logger.info(f"Loaded {size} notes into the duplicate index from {path}")
+        except Exception as e:
+            logger.warning(f"Could not load the duplicate index from {path}, starting empty: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": self._size,
+            "image_hits": self.image_hits,
+            "image_misses": self.image_misses,
+            "text_hits": self.text_hits,
+            "text_misses": self.text_misses,
+        }
+
+    def close(self) -> None:
+        if self.path:
+            self.save()
+
+
+_index: Optional[NoteIndex] = None
+_embeddings: Any = None
+
+
+def get_note_index() -> NoteIndex:
+    global _index
+    if _index is None:
+        _index = NoteIndex(settings.DEDUP_MAX_ENTRIES, settings.DEDUP_INDEX_PATH)
+    return _index
+
+
+async def close_note_index() -> None:
+    """Saves the index (DEDUP_INDEX_PATH) and releases the embedding client."""
+    global _index, _embeddings
+    if _index is not None:
+        _index.close()
+        _index = None
+    if _embeddings is not None:
+        if hasattr(_embeddings, "aclose"):
+            await _embeddings.aclose()
+        _embeddings = None
+
+
+def get_embeddings() -> Any:
+    """The embedding client for OCR texts, or None when DEDUP_EMBEDDING_MODEL is unset."""
+    global _embeddings
+    if _embeddings is None and settings.DEDUP_EMBEDDING_MODEL:
+        _embeddings = get_embedding_model(settings.DEDUP_EMBEDDING_MODEL)
+    return _embeddings
+
+
+class DuplicateLookup:
+    """One request's near-duplicate checks: by image before OCR, by OCR text before extraction.
+
+    With `bypass_cache` nothing is looked up, but the result is still remembered.
+    """
+
+    def __init__(self, namespace: str, bypass_cache: bool = False):
+        self.namespace = namespace
+        self.bypass_cache = bypass_cache
+        self.index = get_note_index()
+        self.image_hash: Optional[bytes] = None
+        self.vector: Optional[np.ndarray] = None
+        self.fingerprint = 0
+
+    async def by_image(self, file_content: bytes) -> Optional[Any]:
+        with stage("dedup_image"):
+            try:
+                self.image_hash = await run_cpu_bound(perceptual_hash, file_content)
+            except Exception as e:
+                logger.warning(f"Could not hash image for duplicate detection: {e}")
+                return None
+            if self.bypass_cache:
+                return None
+            return self.index.lookup_image(self.namespace, self.image_hash)
+
+    async def by_text(self, ocr_text: str) -> Optional[Any]:
+        embeddings = get_embeddings()
+        if embeddings is None:
+            return None
+        with stage("dedup_text", settings.DEDUP_EMBEDDING_MODEL):
+            try:
+                vector = np.asarray(await embeddings.aembed_query(ocr_text), dtype=np.float32)
+            except Exception as e:
+                logger.warning(f"Could not embed OCR text for duplicate detection: {e}")
+                return None
+            norm = float(np.linalg.norm(vector))
+            if norm == 0.0:
+                return None
+            self.vector = vector / norm
+            self.fingerprint = numeric_fingerprint(ocr_text)
+            if self.bypass_cache:
+                return None
+            return self.index.lookup_text(self.namespace, self.vector, self.fingerprint)
+
+    def remember(self, result: Any) -> None:
+        if self.image_hash is not None or self.vector is not None:
+            self.index.add(self.namespace, self.image_hash, self.vector, result, self.fingerprint)
@@ -0,0 +1,42 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_executor: Optional[Executor] = None
+
+
+def get_cpu_executor() -> Optional[Executor]:
+    """Pool for CPU-bound image work, chosen by IMAGE_POOL_KIND ("thread", "process" or "inline")."""
+    global _executor
+    if _executor is None and settings.IMAGE_POOL_KIND != "inline":
+        workers = settings.IMAGE_POOL_WORKERS or None
+        if settings.IMAGE_POOL_KIND == "process":
+            _executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-prep")
+        logger.info(f"Started {settings.IMAGE_POOL_KIND} pool for image preprocessing")
+    return _executor
+
+
+async def run_cpu_bound(func: Callable[..., T], *args, **kwargs) -> T:
+    """Runs `func` off the event loop. With a process pool, `func` and its arguments must be picklable."""
+    executor = get_cpu_executor()
+    if executor is None:
+        return func(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_cpu_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
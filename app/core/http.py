@@ -0,0 +1,69 @@
+import inspect
+import logging
+from typing import Any, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Returns the process-wide pooled client used for image downloads and callbacks.
+
+    The application lifespan closes it on shutdown; it is created lazily so scripts and
+    workers outside the web app can use it too.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        http2 = settings.HTTP2_ENABLED and _http2_available()
+        if settings.HTTP2_ENABLED and not http2:
+            logger.warning("HTTP2_ENABLED is set but the 'h2' package is missing; falling back to HTTP/1.1")
+        _client = httpx.AsyncClient(
+            http2=http2,
+            follow_redirects=True,
+            timeout=httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def close_model(model: Any):
+    """Best-effort release of the HTTP connection pools held by a chat model."""
+    try:
+        if hasattr(model, "aclose"):
+            await model.aclose()
+            return
+        for attr in ("root_async_client", "async_client"):
+            client = getattr(model, attr, None)
+            close = getattr(client, "close", None)
+            if close is not None and inspect.iscoroutinefunction(close):
+                await close()
+                break
+        root_client = getattr(model, "root_client", None)
+        if root_client is not None and hasattr(root_client, "close"):
+            root_client.close()
+    except Exception as e:
+        logger.warning(f"Failed to close model client {type(model).__name__}: {e}")
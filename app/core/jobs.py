@@ -0,0 +1,284 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import httpx
+
+from app.core.config import settings
+from app.core.http import get_http_client
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+
+PRIORITY_ORDER = {"interactive": 0, "bulk": 1}
+FINISHED_STATUSES = ("success", "error")
+
+
+class QueueFullError(Exception):
+    """Raised by `JobManager.submit` when the queue cannot take more work of that priority."""
+
+
+class JobStore:
+    """Persists job records (plain dicts). Subclass to plug in another backend."""
+
+    async def save(self, job: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def list_unfinished(self) -> List[Dict[str, Any]]:
+        """Jobs that were queued or running when the process stopped."""
+        return []
+
+    def close(self) -> None:
+        pass
+
+
+class InMemoryJobStore(JobStore):
+    """Keeps the most recent `max_jobs` records in process memory."""
+
+    def __init__(self, max_jobs: int):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    async def save(self, job: Dict[str, Any]) -> None:
+        self._jobs[job["job_id"]] = dict(job)
+        self._jobs.move_to_end(job["job_id"])
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+
+class SQLiteJobStore(JobStore):
+    """Stores job records in SQLite so results and pending work survive restarts."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per process, as in SQLiteCacheBackend: app.serve forks workers after import.
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, status TEXT NOT NULL, body TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._pid = os.getpid()
+        return self._conn
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO jobs (job_id, status, body, created_at) VALUES (?, ?, ?, ?)",
+                (job["job_id"], job["status"], json.dumps(job, ensure_ascii=False), job["created_at"]),
+            )
+
+    def _get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection().execute("SELECT body FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _list_unfinished(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT body FROM jobs WHERE status NOT IN (?, ?) ORDER BY created_at", FINISHED_STATUSES
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    async def save(self, job: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._save, job)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def list_unfinished(self) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._list_unfinished)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+def build_job_store() -> JobStore:
+    if settings.JOBS_STORE == "sqlite":
+        return SQLiteJobStore(settings.JOBS_DB_PATH)
+    return InMemoryJobStore(max_jobs=settings.JOBS_MAX_RETAINED)
+
+
+class JobManager:
+    """Bounded priority queue of extraction jobs drained by a pool of asyncio workers."""
+
+    def __init__(self, store: JobStore, max_queue_size: int, workers: int):
+        self.store = store
+        self.max_queue_size = max_queue_size
+        self.workers = workers
+        self.handler: Optional[JobHandler] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running: Set[asyncio.Task] = set()
+        self._sequence = itertools.count()
+        self.resume_unfinished = True  # app.serve leaves this on in one worker only
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def start(self, handler: JobHandler) -> None:
+        self.handler = handler
+        self._queue = asyncio.PriorityQueue()
+        if self.resume_unfinished:
+            for job in await self.store.list_unfinished():
+                job["status"] = "queued"
+                self._enqueue(job)
+        self._tasks = [asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.workers)]
+        logger.info(f"Started {self.workers} job workers")
+
+    async def stop(self, drain_timeout: float = 0.0) -> None:
+        """Stops taking queued jobs and gives running ones up to `drain_timeout` seconds to finish.
+
+        Jobs still running after that are cancelled; with the SQLite store they (and the queued
+        ones) are picked up again on the next start.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._running and drain_timeout > 0:
+            logger.info(f"Waiting up to {drain_timeout:.0f}s for {len(self._running)} running jobs")
+            await asyncio.wait(set(self._running), timeout=drain_timeout)
+        running = list(self._running)
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        self.store.close()
+
+    def _capacity(self, priority: str) -> int:
+        # Bulk work may only fill part of the queue so interactive jobs are never locked out.
+        if priority == "bulk":
+            return int(self.max_queue_size * settings.JOBS_BULK_QUEUE_FRACTION)
+        return self.max_queue_size
+
+    def _enqueue(self, job: Dict[str, Any]) -> None:
+        self._queue.put_nowait((PRIORITY_ORDER[job["priority"]], next(self._sequence), job))
+
+    async def submit(self, **fields: Any) -> Dict[str, Any]:
+        """Creates and enqueues a job. Raises QueueFullError instead of waiting for room."""
+        if self._queue is None:
+            raise RuntimeError("JobManager has not been started")
+        priority = fields.get("priority", "interactive")
+        if self._queue.qsize() >= self._capacity(priority):
+            self.rejected += 1
+            raise QueueFullError(f"Job queue is full for {priority} jobs")
+
+        job = {
+            **fields,
+            "job_id": uuid.uuid4().hex,
+            "status": "queued",
+            "priority": priority,
+            "data": None,
+            "error_message": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "processing_time": None,
+        }
+        await self.store.save(job)
+        self._enqueue(job)
+        self.submitted += 1
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.store.get(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            # Shielded so that stop() cancelling the worker does not cancel the job it is running.
+            task = asyncio.create_task(self._run_logged(job))
+            self._running.add(task)
+            task.add_done_callback(self._job_done)
+            await asyncio.shield(task)
+
+    def _job_done(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        self._queue.task_done()
+
+    async def _run_logged(self, job: Dict[str, Any]) -> None:
+        try:
+            await self._run(job)
+        except Exception as e:
+            logger.error(f"Job {job['job_id']} bookkeeping failed: {e}", exc_info=True)
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        job["status"] = "running"
+        job["started_at"] = time.time()
+        await self.store.save(job)
+        start_time = time.monotonic()
+        try:
+            job["data"] = await self.handler(job)
+            job["status"] = "success"
+            self.completed += 1
+        except Exception as e:
+            logger.error(f"Job {job['job_id']} failed: {e}", exc_info=True)
+            job["status"] = "error"
+            job["error_message"] = str(getattr(e, "detail", None) or e)
+            self.failed += 1
+        job["processing_time"] = time.monotonic() - start_time
+        job["finished_at"] = time.time()
+        await self.store.save(job)
+        if job.get("callback_url"):
+            await self._notify(job)
+
+    async def _notify(self, job: Dict[str, Any]) -> None:
+        body = {k: v for k, v in job.items() if k not in ("callback_url", "model_name", "bypass_cache", "pipeline_mode")}
+        for attempt in range(settings.JOBS_WEBHOOK_ATTEMPTS):
+            try:
+                response = await get_http_client().post(
+                    job["callback_url"], json=body, timeout=settings.JOBS_WEBHOOK_TIMEOUT_SECONDS
+                )
+                response.raise_for_status()
+                return
+            except httpx.HTTPError as e:
+                logger.warning(f"Callback for job {job['job_id']} failed (attempt {attempt + 1}): {e}")
+                if attempt + 1 < settings.JOBS_WEBHOOK_ATTEMPTS:
+                    await asyncio.sleep(2 ** attempt)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "workers": len(self._tasks),
+            "running": len(self._running),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+job_manager = JobManager(
+    store=build_job_store(),
+    max_queue_size=settings.JOBS_QUEUE_MAX_SIZE,
+    workers=settings.JOBS_WORKERS,
+)
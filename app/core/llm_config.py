@@ -1,133 +1,109 @@
+import importlib
 import logging
-from typing import Optional
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Type
 
-from dotenv import load_dotenv
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
-from langchain.embeddings.base import Embeddings
-import requests
-from langchain_openai import ChatOpenAI
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
-load_dotenv()
-class HugEmbeddings(Embeddings):
-    """Gọi API embedding qua endpoint HuggingFace."""
-    def __init__(self, endpoint: str, api_key: str):
-        self.endpoint = endpoint
-        self.api_key = api_key
-
-    def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        resp = requests.post(self.endpoint, headers=headers, json={"input": texts})
-        resp.raise_for_status()
-        data = resp.json()["data"]
-        return [d["embedding"] for d in data]
-
-    def embed_query(self, text: str) -> list[float]:
-        return self.embed_documents([text])[0]
-    
-class GeminiProvider:
-    """Provider for Google Gemini models."""
-    def __init__(self,  temperature: float = 0.4, model_llm: str = None, model_embeddings: str = None):
-        self.google_api_key = settings.GEMINI_API_KEY
-        self.temperature = temperature
-        self.model_llm = model_llm.split('/')[-1] if model_llm is not None else settings.MODEL_LLM.split('/')[-1]
-        self.model_embeddings = model_embeddings.split('/')[-1] if model_embeddings is not None else settings.MODEL_EMBEDDINGS.split('/')[-1]   
-
-    def get_chat_model(self):
-        logger.info("Using Google Gemini model:", self.model_llm)
-        chat_model = ChatGoogleGenerativeAI(
-            model=self.model_llm,  # Hoặc model tự host như "gemini-2.5-flash"
-            google_api_key=self.google_api_key,
-            temperature=self.temperature
-        )
-        return chat_model
-    def get_embedding_model(self):
-        return GoogleGenerativeAIEmbeddings(
-            model=self.model_embeddings,  # type: ignore
-            google_api_key=self.google_api_key  # type: ignore
-        )
-    def get_num_tokens(self, text):
-        """Trả về số token đã sử dụng."""
-        # Gemini API không cung cấp thông tin token usage trực tiếp
-        return self.get_chat_model().get_num_tokens(text)
-
-class QwenProvider:
-    """Provider for Qwen models."""
-    def __init__(self, temperature: float = 0.0, model_llm: str = None, model_embeddings: str = None):
-        self.api_key = settings.QWEN_TOKEN # Use environment variable or provided key
-        self.temperature = temperature
-        self.model_llm = model_llm if model_llm is not None else settings.MODEL_LLM
-        self.model_embeddings = model_embeddings if model_embeddings is not None else settings.MODEL_EMBEDDINGS
-
-    def get_chat_model(self):
-        return ChatOpenAI(
-                    model=self.model_llm,  # Hoặc model tự host như "qwen:7b", "mistral", v.v. # type: ignore
-                    base_url=settings.QWEN_LLM_URL,  # Self-hosted LLM API endpoint
-                    api_key=self.api_key,  # Có thể là dummy key # type: ignore
-                    temperature=0.0
-                )
-    
-    def get_embedding_model(self):
-        return HugEmbeddings(
-            endpoint=settings.QWEN_EMBEDDING_URL,  # type: ignore
-            api_key=self.api_key  # type: ignore
-        )
-
-class VinternProvider:
-    """Provider for Vintern models."""
-    def __init__(self, temperature: float = 0.0, model_llm: str = None, model_embeddings: str = None):
-        self.api_key = settings.QWEN_TOKEN # Use environment variable or provided key
-        self.temperature = temperature
-        self.model_llm = model_llm if model_llm is not None else "5CD-AI/Vintern-3B-R-beta"
-        self.model_embeddings = model_embeddings if model_embeddings is not None else settings.MODEL_EMBEDDINGS
-        self.vlm_base_url = settings.VINTERN_LLM_URL
-
-    def get_chat_model(self):
-        return ChatOpenAI(
-                    model=self.model_llm, 
-                    base_url=self.vlm_base_url,
-                    api_key=self.api_key,
-                    temperature=0.5,
-                    max_tokens=2048
-                )
-    
-    def get_embedding_model(self):
-        return HugEmbeddings(
-            endpoint=settings.QWEN_EMBEDDING_URL,  # type: ignore
-            api_key=self.api_key  # type: ignore
-        )
+# Model name prefix -> "module:class". Provider modules (and the SDKs they pull in) are imported
+# the first time a model of that provider is requested, so a Qwen-only deployment never loads Gemini.
+PROVIDERS: Dict[str, str] = {
+    "qwen": "app.core.providers.openai_compat:QwenProvider",
+    "5cd-ai": "app.core.providers.openai_compat:VinternProvider",
+    "gemini": "app.core.providers.gemini:GeminiProvider",
+}
+EMBEDDING_PROVIDERS = ("qwen", "gemini")
+
+_provider_classes: Dict[str, Type] = {}
+_provider_lock = threading.Lock()
+
+def endpoint_urls(urls: Optional[str], url: Optional[str]) -> List[str]:
+    """Comma-separated replica list if set, else the single URL setting."""
+    if urls:
+        return [u.strip() for u in urls.split(",") if u.strip()]
+    return [url] if url else []
+
+def provider_class(provider: str) -> Type:
+    """Imports and returns the provider class registered for a model name prefix."""
+    cls = _provider_classes.get(provider)
+    if cls is not None:
+        return cls
+    with _provider_lock:
+        cls = _provider_classes.get(provider)
+        if cls is None:
+            module_name, class_name = PROVIDERS[provider].split(":")
+            cls = getattr(importlib.import_module(module_name), class_name)
+            _provider_classes[provider] = cls
+            logger.info(f"Loaded model provider '{provider}' from {module_name}")
+    return cls
+
+def _provider_name(model: str, supported) -> str:
+    temp = model.split("/")
+    if len(temp) == 2 and temp[0].lower() in supported:
+        return temp[0].lower()
+    return ""
 
-from typing import Optional
+def preload_providers(models: Iterable[Optional[str]]) -> None:
+    """Imports the provider modules of `models` now rather than on the first request."""
+    for model in models:
+        provider = _provider_name(model or "", PROVIDERS)
+        if provider:
+            provider_class(provider)
 
 def get_chat_model(model: Optional[str] = None):
     if model is None:
         model = settings.MODEL_LLM or "Qwen/Qwen3-8B"
-    temp = model.split("/")
-    if len(temp) == 2 and temp[0].lower() == "qwen":
-        return QwenProvider(model_llm=model).get_chat_model()
-    elif len(temp) == 2 and temp[0].lower() == "gemini":
-        return GeminiProvider(model_llm=model).get_chat_model()
-    elif len(temp) == 2 and temp[0].lower() == "5cd-ai":
-        return VinternProvider(model_llm=model).get_chat_model()
-    else:
+    provider = _provider_name(model, PROVIDERS)
+    if not provider:
         raise ValueError("Unsupported model type or provider. Or you forget to provide the provider")
+    return provider_class(provider)(model_llm=model).get_chat_model()
+
+def supports_vision(model: Optional[str] = None) -> bool:
+    """Whether the extraction model can read the note image directly (single-pass mode)."""
+    if model is None:
+        model = settings.MODEL_LLM or "Qwen/Qwen3-8B"
+    provider = model.split("/")[0].lower()
+    return provider in {p.strip().lower() for p in settings.VISION_MODEL_PROVIDERS.split(",")}
+
+def _accepts_schema(model: str) -> bool:
+    provider = model.split("/")[0].lower()
+    return provider in {p.strip().lower() for p in settings.STRUCTURED_OUTPUT_PROVIDERS.split(",")}
+
+def structured_output_mode(model: Optional[str] = None) -> str:
+    """STRUCTURED_OUTPUT_MODE if the model's provider accepts a JSON schema, else "off"."""
+    if model is None:
+        model = settings.MODEL_LLM or "Qwen/Qwen3-8B"
+    return settings.STRUCTURED_OUTPUT_MODE if _accepts_schema(model) else "off"
+
+def structured_output_kwargs(model: Optional[str], name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Call kwargs that constrain an OpenAI-compatible chat model to `schema` (bind them to the model)."""
+    if model is None:
+        model = settings.MODEL_LLM or "Qwen/Qwen3-8B"
+    if not _accepts_schema(model):
+        return {}
+    mode = settings.STRUCTURED_OUTPUT_MODE
+    extra_body: Dict[str, Any] = {}
+    kwargs: Dict[str, Any] = {}
+    if mode == "json_schema":
+        kwargs["response_format"] = {"type": "json_schema", "json_schema": {"name": name, "schema": schema}}
+    elif mode == "guided_json":
+        extra_body["guided_json"] = schema
+    if settings.DISABLE_THINKING:
+        extra_body["chat_template_kwargs"] = {"enable_thinking": False}
+    if extra_body:
+        kwargs["extra_body"] = extra_body
+    return kwargs
 
 def get_embedding_model(model: Optional[str] = None):
     if model is None:
         model = settings.MODEL_LLM or "Qwen/Qwen3-8B"
-    temp = model.split("/")
-    logger.info(temp)
-    if len(temp) == 2 and temp[0].lower() == "qwen":
-        return QwenProvider(model_embeddings=model).get_embedding_model()
-    elif len(temp) == 2 and temp[0].lower() == "gemini":
-        return GeminiProvider(model_embeddings=model).get_embedding_model()
-    else:
+    logger.info(model.split("/"))
+    provider = _provider_name(model, EMBEDDING_PROVIDERS)
+    if not provider:
         raise ValueError("Unsupported embedding model type or provider. Or you forget to provide the provider")
+    return provider_class(provider)(model_embeddings=model).get_embedding_model()
 
 # class CrewModelConfig:
 #     """Singleton cho cấu hình LLM/Embeddings."""
@@ -0,0 +1,271 @@
+"""In-process metrics in the Prometheus text exposition format, plus per-stage tracing.
+
+`stage(name, model)` is the one instrumentation point used by the pipeline: it observes the
+stage latency histogram, tracks the in-flight gauge, opens an OpenTelemetry span when the
+`opentelemetry-api` package is installed (a no-op otherwise), and adds the duration to the
+per-request timing breakdown started by `collect_timings()`.
+"""
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry import trace as _otel_trace
+
+    _tracer = _otel_trace.get_tracer("field_note")
+except ImportError:
+    _tracer = None
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+BYTES_BUCKETS = (16e3, 64e3, 256e3, 512e3, 1e6, 2e6, 4e6, 8e6, 16e6)
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+LabelValues = Tuple[str, ...]
+
+_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("stage_timings", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name) or "") for name in self.label_names)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts..., +Inf count], sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}"
+
+
+class CallbackMetric(Metric):
+    """Values read at scrape time from `callback() -> {label values: value}` (e.g. existing stats() dicts)."""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str], callback: Callable[[], Dict[LabelValues, float]], type_name: str = "gauge"):
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+        self.type_name = type_name
+
+    def samples(self) -> Iterator[str]:
+        try:
+            values = self.callback()
+        except Exception as e:
+            logger.warning(f"Metric callback for {self.name} failed: {e}")
+            return
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+stage_seconds = metrics_registry.histogram(
+    "field_note_stage_duration_seconds", "Duration of one pipeline stage.", ("stage", "model")
+)
+stage_in_flight = metrics_registry.gauge(
+    "field_note_stage_in_flight", "Pipeline stages currently executing.", ("stage", "model")
+)
+stage_errors = metrics_registry.counter(
+    "field_note_stage_errors_total", "Pipeline stages that raised.", ("stage", "model")
+)
+download_bytes = metrics_registry.histogram(
+    "field_note_download_bytes", "Size of downloaded images.", buckets=BYTES_BUCKETS
+)
+model_tokens = metrics_registry.histogram(
+    "field_note_model_tokens", "Tokens per model call, from the provider's usage metadata.", ("stage", "model", "kind"), TOKEN_BUCKETS
+)
+parse_failures = metrics_registry.counter(
+    "field_note_parse_failures_total", "Model outputs that could not be parsed as JSON.", ("stage", "model")
+)
+parse_outcomes = metrics_registry.counter(
+    "field_note_parse_outcomes_total", "Model outputs by how they were parsed: parsed, repaired, invalid or reasked.", ("stage", "model", "outcome")
+)
+repair_tokens_saved = metrics_registry.counter(
+    "field_note_repair_tokens_saved_total", "Output tokens of responses rescued by local JSON repair instead of a re-ask.", ("stage", "model")
+)
+note_type_routes = metrics_registry.counter(
+    "field_note_note_type_routes_total", "Unified /extract routing decisions per note type.", ("note_type", "route")
+)
+output_tokens = metrics_registry.histogram(
+    "field_note_output_tokens", "Output tokens per extraction call by output mode (json_schema, guided_json, off).", ("stage", "model", "output_mode"), TOKEN_BUCKETS
+)
+
+
+@contextmanager
+def collect_timings(enabled: bool = True) -> Iterator[Optional[Dict[str, float]]]:
+    """Collects `stage()` durations for the current request into the yielded dict (None when disabled).
+
+    A nested collector (one per page of a multi-page note) also adds its totals to the enclosing one.
+    """
+    if not enabled:
+        yield None
+        return
+    timings: Dict[str, float] = {}
+    parent = _timings.get()
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+        if parent is not None:
+            for name, seconds in timings.items():
+                parent[name] = parent.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str, model: Optional[str] = None, **attributes: Any) -> Iterator[None]:
+    """Times one pipeline stage (see module docstring)."""
+    labels = {"stage": name, "model": model}
+    span_cm = _tracer.start_as_current_span(f"pipeline.{name}") if _tracer is not None else None
+    span = span_cm.__enter__() if span_cm is not None else None
+    if span is not None:
+        span.set_attribute("pipeline.model", model or "")
+        for key, value in attributes.items():
+            span.set_attribute(f"pipeline.{key}", value)
+    stage_in_flight.inc(**labels)
+    start = time.perf_counter()
+    error: Optional[BaseException] = None
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        stage_errors.inc(**labels)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_in_flight.dec(**labels)
+        stage_seconds.observe(elapsed, **labels)
+        timings = _timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+        if span_cm is not None:
+            if error is not None:
+                span_cm.__exit__(type(error), error, error.__traceback__)
+            else:
+                span_cm.__exit__(None, None, None)
+
+
+def record_usage(message: Any, stage_name: str, model: Optional[str]) -> None:
+    """Observes token counts from an AIMessage's `usage_metadata`, when the provider reports them."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    for kind in ("input_tokens", "output_tokens"):
+        if usage.get(kind) is not None:
+            model_tokens.observe(usage[kind], stage=stage_name, model=model, kind=kind.split("_")[0])
+
+
+def render_metrics() -> str:
+    return metrics_registry.render()
@@ -0,0 +1,82 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from app.core.cache import make_cache_key
+from app.core.config import settings
+from app.utils.helpers import load_prompt
+
+logger = logging.getLogger(__name__)
+
+
+class Prompt:
+    """A prompt file read once; the ChatPromptTemplate is compiled on first use."""
+
+    def __init__(self, path: str, text: str, version: Tuple[int, int]):
+        self.path = path
+        self.text = text
+        self.hash = make_cache_key(text)
+        self.version = version
+        self._template: Optional[ChatPromptTemplate] = None
+
+    @property
+    def template(self) -> ChatPromptTemplate:
+        if self._template is None:
+            self._template = ChatPromptTemplate.from_template(self.text)
+        return self._template
+
+
+class PromptStore:
+    """Process-wide cache of prompt templates, reloaded when the file on disk changes.
+
+    The file is stat'ed at most every PROMPT_RELOAD_CHECK_SECONDS; with PROMPT_HOT_RELOAD off
+    a prompt is read exactly once. Callers compare the returned object to spot a reload.
+    """
+
+    def __init__(self):
+        self._prompts: Dict[str, Prompt] = {}
+        self._checked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    @staticmethod
+    def _version(path: str) -> Tuple[int, int]:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, path: str) -> Prompt:
+        prompt = self._prompts.get(path)
+        if prompt is not None and not self._should_check(path):
+            return prompt
+        with self._lock:
+            prompt = self._prompts.get(path)
+            version = self._version(path)
+            self._checked[path] = time.monotonic()
+            if prompt is not None and prompt.version == version:
+                return prompt
+            if prompt is not None:
+                self.reloads += 1
+                logger.info(f"Prompt {path} changed on disk, reloading")
+            prompt = Prompt(path, load_prompt(path), version)
+            self._prompts[path] = prompt
+            return prompt
+
+    def _should_check(self, path: str) -> bool:
+        if not settings.PROMPT_HOT_RELOAD:
+            return False
+        return time.monotonic() - self._checked.get(path, 0.0) >= settings.PROMPT_RELOAD_CHECK_SECONDS
+
+    def preload(self, paths: Iterable[str]) -> None:
+        """Reads and compiles prompts up front (application startup) so first requests skip it."""
+        for path in paths:
+            self.get(path).template
+
+    def stats(self) -> Dict[str, int]:
+        return {"prompts": len(self._prompts), "reloads": self.reloads}
+
+
+prompt_store = PromptStore()
@@ -0,0 +1,35 @@
+import logging
+
+from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiProvider:
+    """Provider for Google Gemini models."""
+    def __init__(self,  temperature: float = 0.4, model_llm: str = None, model_embeddings: str = None):
+        self.google_api_key = settings.GEMINI_API_KEY
+        self.temperature = temperature
+        self.model_llm = model_llm.split('/')[-1] if model_llm is not None else settings.MODEL_LLM.split('/')[-1]
+        self.model_embeddings = model_embeddings.split('/')[-1] if model_embeddings is not None else settings.MODEL_EMBEDDINGS.split('/')[-1]   
+
+    def get_chat_model(self):
+        logger.info("Using Google Gemini model:", self.model_llm)
+        chat_model = ChatGoogleGenerativeAI(
+            model=self.model_llm,  # Hoặc model tự host như "gemini-2.5-flash"
+            google_api_key=self.google_api_key,
+            temperature=self.temperature,
+            max_retries=settings.LLM_CLIENT_MAX_RETRIES
+        )
+        return chat_model
+    def get_embedding_model(self):
+        return GoogleGenerativeAIEmbeddings(
+            model=self.model_embeddings,  # type: ignore
+            google_api_key=self.google_api_key  # type: ignore
+        )
+    def get_num_tokens(self, text):
+        """Trả về số token đã sử dụng."""
+        # Gemini API không cung cấp thông tin token usage trực tiếp
+        return self.get_chat_model().get_num_tokens(text)
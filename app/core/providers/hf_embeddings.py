@@ -0,0 +1,73 @@
+from typing import Any, Dict, List, Optional
+
+import httpx
+from langchain.embeddings.base import Embeddings
+
+from app.core.batching import MicroBatcher
+from app.core.config import settings
+from app.core.http import get_http_client
+
+
+class HugEmbeddings(Embeddings):
+    """Gọi API embedding qua endpoint HuggingFace.
+
+    Async calls go through the shared pooled HTTP client; concurrent `aembed_query` calls are
+    micro-batched into one request (EMBEDDING_BATCH_WINDOW_MS / EMBEDDING_MAX_BATCH_SIZE).
+    """
+    def __init__(self, endpoint: str, api_key: str):
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.max_batch_size = settings.EMBEDDING_MAX_BATCH_SIZE
+        self._batcher = MicroBatcher(
+            "embeddings", self._aembed_batch, settings.EMBEDDING_BATCH_WINDOW_MS / 1000, self.max_batch_size
+        )
+        self._sync_client: Optional[httpx.Client] = None
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    @staticmethod
+    def _vectors(response: httpx.Response) -> List[List[float]]:
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda d: d.get("index", 0))
+        return [d["embedding"] for d in data]
+
+    def _chunks(self, texts: List[str]) -> List[List[str]]:
+        return [texts[i:i + self.max_batch_size] for i in range(0, len(texts), self.max_batch_size)]
+
+    async def _aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        response = await get_http_client().post(self.endpoint, headers=self.headers, json={"input": texts})
+        return self._vectors(response)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for chunk in self._chunks(texts):
+            vectors.extend(await self._aembed_batch(chunk))
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self._batcher.submit(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self._sync_client is None:
+            self._sync_client = httpx.Client(timeout=settings.HTTP_TIMEOUT_SECONDS)
+        vectors: List[List[float]] = []
+        for chunk in self._chunks(texts):
+            vectors.extend(self._vectors(self._sync_client.post(self.endpoint, headers=self.headers, json={"input": chunk})))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return self._batcher.stats()
+
+    async def aclose(self) -> None:
+        await self._batcher.aclose(timeout=settings.HTTP_TIMEOUT_SECONDS)
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
@@ -0,0 +1,66 @@
+from typing import Optional
+
+from langchain_openai import ChatOpenAI
+
+from app.core.balancer import balanced
+from app.core.config import settings
+from app.core.llm_config import endpoint_urls
+from app.core.providers.hf_embeddings import HugEmbeddings
+
+
+class QwenProvider:
+    """Provider for Qwen models."""
+    def __init__(self, temperature: float = 0.0, model_llm: str = None, model_embeddings: str = None):
+        self.api_key = settings.QWEN_TOKEN # Use environment variable or provided key
+        self.temperature = temperature
+        self.model_llm = model_llm if model_llm is not None else settings.MODEL_LLM
+        self.model_embeddings = model_embeddings if model_embeddings is not None else settings.MODEL_EMBEDDINGS
+
+    def _build_chat_model(self, base_url: Optional[str]):
+        return ChatOpenAI(
+                    model=self.model_llm,  # Hoặc model tự host như "qwen:7b", "mistral", v.v. # type: ignore
+                    base_url=base_url,  # Self-hosted LLM API endpoint
+                    api_key=self.api_key,  # Có thể là dummy key # type: ignore
+                    temperature=0.0,
+                    max_retries=settings.LLM_CLIENT_MAX_RETRIES
+                )
+
+    def get_chat_model(self):
+        """One client per replica in QWEN_LLM_URLS, load balanced; a plain client for a single URL."""
+        urls = endpoint_urls(settings.QWEN_LLM_URLS, settings.QWEN_LLM_URL)
+        return balanced(self.model_llm, urls, self._build_chat_model, api_key=self.api_key)
+    
+    def get_embedding_model(self):
+        return HugEmbeddings(
+            endpoint=settings.QWEN_EMBEDDING_URL,  # type: ignore
+            api_key=self.api_key  # type: ignore
+        )
+
+class VinternProvider:
+    """Provider for Vintern models."""
+    def __init__(self, temperature: float = 0.0, model_llm: str = None, model_embeddings: str = None):
+        self.api_key = settings.QWEN_TOKEN # Use environment variable or provided key
+        self.temperature = temperature
+        self.model_llm = model_llm if model_llm is not None else "5CD-AI/Vintern-3B-R-beta"
+        self.model_embeddings = model_embeddings if model_embeddings is not None else settings.MODEL_EMBEDDINGS
+        self.vlm_base_urls = endpoint_urls(settings.VINTERN_LLM_URLS, settings.VINTERN_LLM_URL)
+
+    def _build_chat_model(self, base_url: Optional[str]):
+        return ChatOpenAI(
+                    model=self.model_llm, 
+                    base_url=base_url,
+                    api_key=self.api_key,
+                    temperature=0.5,
+                    max_tokens=2048,
+                    max_retries=settings.LLM_CLIENT_MAX_RETRIES
+                )
+
+    def get_chat_model(self):
+        """One client per replica in VINTERN_LLM_URLS, load balanced; a plain client for a single URL."""
+        return balanced(self.model_llm, self.vlm_base_urls, self._build_chat_model, api_key=self.api_key)
+    
+    def get_embedding_model(self):
+        return HugEmbeddings(
+            endpoint=settings.QWEN_EMBEDDING_URL,  # type: ignore
+            api_key=self.api_key  # type: ignore
+        )
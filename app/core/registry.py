@@ -0,0 +1,81 @@
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple, Type, TypeVar
+
+from app.core.http import close_model
+from app.core.llm_config import get_chat_model
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ServiceRegistry:
+    """Process-wide pool of extraction services and the chat model clients behind them.
+
+    Services are keyed by (service class, model_name) and chat models by model name,
+    so the Vintern OCR client is shared by every service instead of being rebuilt
+    (with a fresh HTTP connection pool) on each request.
+    """
+
+    def __init__(self):
+        self._services: Dict[Tuple[Type, Optional[str]], Any] = {}
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.service_hits = 0
+        self.service_misses = 0
+        self.model_hits = 0
+        self.model_misses = 0
+
+    def get_model(self, model_name: Optional[str] = None):
+        """Returns the shared chat model for `model_name`, building it on first use."""
+        key = model_name or ""
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self.model_hits += 1
+                return model
+            self.model_misses += 1
+            model = get_chat_model(model_name)
+            self._models[key] = model
+            logger.info(f"Created chat model client for '{model_name}'")
+            return model
+
+    def get_service(self, service_cls: Type[T], model_name: Optional[str] = None) -> T:
+        """Returns the shared `service_cls` instance for `model_name`, building it on first use."""
+        key = (service_cls, model_name)
+        with self._lock:
+            service = self._services.get(key)
+            if service is not None:
+                self.service_hits += 1
+                return service
+            self.service_misses += 1
+        # Built outside the lock: the constructor calls back into get_model().
+        service = service_cls(model_name=model_name, model_factory=self.get_model)
+        with self._lock:
+            service = self._services.setdefault(key, service)
+        logger.info(f"Created {service_cls.__name__} for model '{model_name}'")
+        return service
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "services": len(self._services),
+            "service_hits": self.service_hits,
+            "service_misses": self.service_misses,
+            "models": len(self._models),
+            "model_hits": self.model_hits,
+            "model_misses": self.model_misses,
+        }
+
+    async def aclose(self):
+        """Closes every pooled model client. Called from the application lifespan on shutdown."""
+        with self._lock:
+            models = list(self._models.values())
+            self._models.clear()
+            self._services.clear()
+        for model in models:
+            await close_model(model)
+        logger.info(f"Service registry closed. Stats: {self.stats()}")
+
+
+service_registry = ServiceRegistry()
@@ -0,0 +1,259 @@
+"""Resilient call layer for the self-hosted model endpoints.
+
+Every OCR / extraction call goes through `call_layer.call(upstream, fn)`, which applies, per
+upstream (one per model name):
+
+- a concurrency semaphore, so bursts queue here instead of overloading the GPU server;
+- a circuit breaker that sheds load immediately while the upstream is failing;
+- a per-attempt timeout bounded by the request deadline (`deadline_scope`);
+- jittered exponential retries (tenacity) for timeouts, connection errors, 429 and 5xx;
+- optional hedging: a second attempt fired once the first has run longer than the upstream's p95.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import httpx
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError", "ServiceUnavailable", "DeadlineExceeded"}
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("llm_deadline", default=None)
+
+
+class CircuitOpenError(Exception):
+    """The upstream's circuit breaker is open; the call was rejected without being attempted."""
+
+
+class DeadlineExceededError(asyncio.TimeoutError):
+    """No time left in the request deadline for another attempt."""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Sets an absolute deadline for model calls made inside the block. Nested scopes can only shorten it."""
+    if not seconds:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (CircuitOpenError, DeadlineExceededError)):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    status_code = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if isinstance(status_code, int) and status_code in RETRYABLE_STATUS_CODES:
+        return True
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+class CircuitBreaker:
+    """closed -> open after `failure_threshold` consecutive upstream failures;
+    open -> half_open after `reset_timeout`; a half-open probe closes or re-opens it."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> None:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError("Upstream circuit is open")
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probe_in_flight:
+                raise CircuitOpenError("Upstream circuit is half-open; probe in flight")
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+        self.state = "closed"
+
+    def record_failure(self) -> None:
+        self._probe_in_flight = False
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+                logger.warning(f"Circuit opened after {self.consecutive_failures} consecutive failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Called when an attempt ends without a verdict (e.g. a cancelled hedge)."""
+        self._probe_in_flight = False
+
+
+class Upstream:
+    """Concurrency, breaker and latency state for one model endpoint."""
+
+    def __init__(self, name: str, max_concurrency: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.breaker = CircuitBreaker(settings.LLM_BREAKER_FAILURE_THRESHOLD, settings.LLM_BREAKER_RESET_SECONDS)
+        self.latencies: Deque[float] = deque(maxlen=settings.LLM_LATENCY_WINDOW)
+        self.in_flight = 0
+        self.counters: Dict[str, int] = {
+            "calls": 0, "successes": 0, "failures": 0, "retries": 0, "timeouts": 0,
+            "rejected": 0, "hedges": 0, "hedge_wins": 0,
+        }
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "circuit_state": self.breaker.state,
+            "circuit_opened": self.breaker.times_opened,
+            "p95_seconds": self.p95(),
+        }
+
+
+class CallLayer:
+    def __init__(self):
+        self.upstreams: Dict[str, Upstream] = {}
+
+    def upstream(self, name: str) -> Upstream:
+        upstream = self.upstreams.get(name)
+        if upstream is None:
+            concurrency = settings.OCR_MAX_CONCURRENCY if name == settings.VINTERN_MODEL else settings.LLM_MAX_CONCURRENCY
+            upstream = self.upstreams[name] = Upstream(name, concurrency)
+        return upstream
+
+    @asynccontextmanager
+    async def guard(self, name: str):
+        """Breaker + semaphore + bookkeeping around one attempt, without timeout or retry (used for streaming)."""
+        upstream = self.upstream(name)
+        try:
+            upstream.breaker.allow()
+        except CircuitOpenError:
+            upstream.counters["rejected"] += 1
+            raise
+        async with upstream.semaphore:
+            upstream.in_flight += 1
+            start = time.monotonic()
+            try:
+                yield upstream
+            except asyncio.CancelledError:
+                upstream.breaker.release()
+                raise
+            except BaseException as e:
+                if is_retryable(e):
+                    upstream.breaker.record_failure()
+                else:
+                    upstream.breaker.release()
+                raise
+            else:
+                upstream.breaker.record_success()
+                upstream.latencies.append(time.monotonic() - start)
+            finally:
+                upstream.in_flight -= 1
+
+    async def _attempt(self, name: str, fn: Callable[[], Awaitable[T]]) -> T:
+        timeout = settings.LLM_CALL_TIMEOUT_SECONDS
+        remaining = remaining_time()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceededError("Request deadline exceeded before the model call")
+            timeout = min(timeout, remaining)
+        async with self.guard(name):
+            try:
+                return await asyncio.wait_for(fn(), timeout=timeout)
+            except asyncio.TimeoutError:
+                self.upstream(name).counters["timeouts"] += 1
+                raise
+
+    async def _hedged_attempt(self, name: str, fn: Callable[[], Awaitable[T]]) -> T:
+        upstream = self.upstream(name)
+        delay = upstream.p95() if settings.LLM_HEDGING_ENABLED else None
+        if delay is None:
+            return await self._attempt(name, fn)
+
+        primary = asyncio.ensure_future(self._attempt(name, fn))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or upstream.semaphore.locked():
+            # Finished in time, or no spare capacity to hedge with.
+            return await primary
+        upstream.counters["hedges"] += 1
+        hedge = asyncio.ensure_future(self._attempt(name, fn))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            upstream.counters["hedge_wins"] += 1
+                        return task.result()
+            # Both failed: surface the primary's error.
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, name: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Runs `fn` (a zero-argument coroutine factory) against upstream `name` with the full policy."""
+        upstream = self.upstream(name)
+        upstream.counters["calls"] += 1
+        attempt_number = 0
+        try:
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(settings.LLM_MAX_ATTEMPTS),
+                wait=wait_random_exponential(multiplier=settings.LLM_RETRY_BASE_SECONDS, max=settings.LLM_RETRY_MAX_SECONDS),
+                retry=retry_if_exception(is_retryable),
+                reraise=True,
+            ):
+                with attempt:
+                    attempt_number += 1
+                    if attempt_number > 1:
+                        upstream.counters["retries"] += 1
+                        logger.info(f"Retrying {name} (attempt {attempt_number})")
+                    result = await self._hedged_attempt(name, fn)
+        except Exception:
+            upstream.counters["failures"] += 1
+            raise
+        upstream.counters["successes"] += 1
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: upstream.stats() for name, upstream in self.upstreams.items()}
+
+
+call_layer = CallLayer()
@@ -1,21 +1,103 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 
 from app.api import router as api_router
+from app.api.jobs import run_job
 from app.middleware.api_key import APIKeyMiddleware
 
 from app.core.config import settings
-from dotenv import load_dotenv
-load_dotenv()
+from app.core.balancer import balancer_stats
+from app.core.cache import extraction_cache, ocr_cache
+from app.core.executor import shutdown_cpu_executor
+from app.core.http import close_http_client
+from app.core.jobs import job_manager
+from app.core.metrics import CallbackMetric, metrics_registry, render_metrics
+from app.core.prompts import prompt_store
+from app.core.registry import service_registry
+from app.core.resilience import call_layer
+from app.core.singleflight import content_flight, url_flight
+from app.services.base import OCR_PROMPT, pipeline_stats
+from app.services.note_types import note_types
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    prompt_store.preload([OCR_PROMPT, *(spec.service_cls.DEFAULT_PROMPT for spec in note_types.all())])
+    await job_manager.start(run_job)
+    yield
+    # The server has stopped accepting and drained in-flight requests by now; give running jobs the same grace.
+    await job_manager.stop(drain_timeout=settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS)
+    await service_registry.aclose()
+    await close_http_client()
+    shutdown_cpu_executor()
+    ocr_cache.close()
+    extraction_cache.close()
+    if settings.DEDUP_ENABLED:
+        from app.core.dedup import close_note_index
+        await close_note_index()
+
+# Existing stats() counters, exported alongside the pipeline histograms.
+metrics_registry.register(CallbackMetric(
+    "field_note_cache_events_total", "Result cache lookups and evictions.", ("cache", "event"),
+    lambda: {
+        (cache.name, event): cache.stats()[event]
+        for cache in (ocr_cache, extraction_cache)
+        for event in ("memory_hits", "backend_hits", "misses", "evictions")
+    },
+    type_name="counter",
+))
+metrics_registry.register(CallbackMetric(
+    "field_note_cache_bytes", "Bytes held by the in-memory result caches.", ("cache",),
+    lambda: {(cache.name,): cache.stats()["bytes"] for cache in (ocr_cache, extraction_cache)},
+))
+metrics_registry.register(CallbackMetric(
+    "field_note_upstream_in_flight", "Model calls in flight per upstream.", ("model",),
+    lambda: {(name,): stats["in_flight"] for name, stats in call_layer.stats().items()},
+))
+metrics_registry.register(CallbackMetric(
+    "field_note_upstream_events_total", "Call layer outcomes per upstream.", ("model", "event"),
+    lambda: {
+        (name, event): value
+        for name, stats in call_layer.stats().items()
+        for event, value in stats.items()
+        if event in ("calls", "successes", "failures", "retries", "timeouts", "rejected", "hedges", "hedge_wins")
+    },
+    type_name="counter",
+))
+metrics_registry.register(CallbackMetric(
+    "field_note_single_flight_in_flight", "Coalesced calls in flight.", ("key",),
+    lambda: {("url",): url_flight.stats()["in_flight"], ("content",): content_flight.stats()["in_flight"]},
+))
+metrics_registry.register(CallbackMetric(
+    "field_note_jobs_queued", "Jobs waiting in the queue.", (),
+    lambda: {(): job_manager.stats()["queued"]},
+))
+
+def default_response_class():
+    """ORJSONResponse when orjson is installed, else the stdlib-based JSONResponse."""
+    if settings.ORJSON_RESPONSES:
+        try:
+            import orjson  # noqa: F401
+        except ImportError:
+            return JSONResponse
+        return ORJSONResponse
+    return JSONResponse
 
 app = FastAPI(
     title=settings.APP_NAME,
     description=settings.DESCRIPTION,
     version=settings.APP_VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=default_response_class(),
+    lifespan=lifespan
 )
 
+app.add_middleware(APIKeyMiddleware)
+
+# Added last so it is the outermost layer: 401/429 answers from the key check carry CORS headers too.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -24,8 +106,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.add_middleware(APIKeyMiddleware)
-
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 @app.get("/", tags=["status"])
@@ -34,9 +114,23 @@ async def root():
     return {
         "message": f"{settings.APP_NAME} is running",
         "status": "OK",
-        "services": ["CV Scoring", "Job Description", "CV Parsing", "Interview Questions"]
+        "services": ["CV Scoring", "Job Description", "CV Parsing", "Interview Questions"],
+        "registry": service_registry.stats(),
+        "ocr_cache": ocr_cache.stats(),
+        "extraction_cache": extraction_cache.stats(),
+        "jobs": job_manager.stats(),
+        "pipeline": pipeline_stats.stats(),
+        "prompts": prompt_store.stats(),
+        "upstreams": call_layer.stats(),
+        "replicas": balancer_stats(),
+        "single_flight": {"url": url_flight.stats(), "content": content_flight.stats()}
     }
 
+@app.get("/metrics", tags=["status"], response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of pipeline, cache and upstream metrics"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 def custom_openapi():
     if app.openapi_schema:
         return app.openapi_schema
@@ -53,5 +147,6 @@ def custom_openapi():
 app.openapi = custom_openapi
 
 if __name__ == "__main__":
+    # Development server with auto-reload; production deployments run `python -m app.serve`.
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
@@ -1,26 +1,131 @@
+"""API key check as a plain ASGI middleware.
+
+BaseHTTPMiddleware wraps every request in an extra task and re-streams the response body,
+which costs latency and breaks the NDJSON/SSE endpoints. This version only looks at the
+scope headers and either forwards the call untouched or answers 401/429 itself.
+"""
+import hmac
+import json
 import logging
-from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
+import math
+import time
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
 from app.core.config import settings
+from app.core.metrics import metrics_registry
 
 logger = logging.getLogger(__name__)
 
-class APIKeyMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Bỏ qua route OpenAPI, docs và root
-        if request.url.path.startswith("/docs") or \
-           request.url.path.startswith("/redoc") or \
-           request.url.path.startswith("/api/v1/openapi.json") or \
-           request.url.path == "/":
-            return await call_next(request)
-
-        api_key = request.headers.get(settings.API_KEY_NAME)
-        logger.info("request ",  list(request.headers.keys()))
-
-        if api_key != settings.API_KEY:
-            logger.info("Invalid API Key")
-            # raise HTTPException(
-            #     status_code=status.HTTP_401_UNAUTHORIZED,
-            #     detail="Invalid or missing API Key"
-            # )
-        return await call_next(request)
+DEFAULT_HEADER = "X-API-Key"
+
+auth_rejections = metrics_registry.counter(
+    "field_note_auth_rejections_total", "Requests rejected by the API key middleware.", ("reason",)
+)
+
+
+class TokenBucket:
+    """`rate` tokens per second up to `capacity`; `take()` returns 0 or the seconds until a token is available."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class APIKey:
+    def __init__(self, value: str, per_minute: float):
+        self.value = value.encode()
+        self.bucket: Optional[TokenBucket] = None
+        if per_minute > 0:
+            burst = settings.API_RATE_LIMIT_BURST or max(1, int(per_minute))
+            self.bucket = TokenBucket(per_minute / 60.0, burst)
+
+
+def parse_api_keys(single: Optional[str], many: Optional[str], default_per_minute: float) -> List[APIKey]:
+    """API_KEY plus API_KEYS entries ("key" or "key:requests_per_minute")."""
+    keys: Dict[str, float] = {}
+    if single:
+        keys[single] = default_per_minute
+    for entry in (many or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        value, _, limit = entry.rpartition(":") if ":" in entry else (entry, "", "")
+        try:
+            keys[value] = float(limit) if limit else default_per_minute
+        except ValueError:
+            # Not a rate suffix; the colon is part of the key itself.
+            keys[entry] = default_per_minute
+    return [APIKey(value, per_minute) for value, per_minute in keys.items()]
+
+
+def public_paths() -> Tuple[FrozenSet[str], Tuple[str, ...]]:
+    """Exact paths and path prefixes that never need a key (/metrics only with METRICS_PUBLIC)."""
+    exact = {"/", f"{settings.API_V1_STR}/openapi.json"}
+    if settings.METRICS_PUBLIC:
+        exact.add("/metrics")
+    prefixes = ("/docs", "/redoc")
+    return frozenset(exact), prefixes
+
+
+class APIKeyMiddleware:
+    def __init__(self, app, keys: Optional[List[APIKey]] = None, header_name: Optional[str] = None):
+        self.app = app
+        self.keys = keys if keys is not None else parse_api_keys(
+            settings.API_KEY, settings.API_KEYS, settings.API_RATE_LIMIT_PER_MINUTE
+        )
+        self.header = (header_name or settings.API_KEY_NAME or DEFAULT_HEADER).lower().encode("latin-1")
+        self.public_exact, self.public_prefixes = public_paths()
+        if not self.keys:
+            logger.warning("No API_KEY / API_KEYS configured; API key checks are disabled")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.keys:
+            return await self.app(scope, receive, send)
+        path = scope["path"]
+        if path in self.public_exact or path.startswith(self.public_prefixes) or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+
+        presented = None
+        for name, value in scope["headers"]:
+            if name == self.header:
+                presented = value
+                break
+        key = self._match(presented) if presented is not None else None
+        if key is None:
+            auth_rejections.inc(reason="invalid_key" if presented is not None else "missing_key")
+            return await self._reject(send, 401, "Invalid or missing API Key")
+
+        if key.bucket is not None:
+            wait = key.bucket.take()
+            if wait:
+                auth_rejections.inc(reason="rate_limited")
+                return await self._reject(send, 429, "Rate limit exceeded for this API key", retry_after=wait)
+        return await self.app(scope, receive, send)
+
+    def _match(self, presented: bytes) -> Optional[APIKey]:
+        # Compare against every key so the time taken does not reveal which one (if any) matched.
+        match = None
+        for key in self.keys:
+            if hmac.compare_digest(presented, key.value):
+                match = key
+        return match
+
+    @staticmethod
+    async def _reject(send, status_code: int, detail: str, retry_after: Optional[float] = None) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        if retry_after is not None:
+            headers.append((b"retry-after", str(math.ceil(retry_after)).encode()))
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,106 @@
+import re
+from enum import Enum
+from typing import Annotated, Any, Dict, List, Optional
+
+from pydantic import BaseModel, BeforeValidator, Field
+
+class PipelineMode(str, Enum):
+    """How a note image is turned into JSON."""
+    TWO_STAGE = "two_stage"  # Vintern OCR to text, then text -> JSON with the extraction model
+    SINGLE_PASS = "single_pass"  # image + extraction prompt straight to a vision-capable model
+
+class PageMode(str, Enum):
+    """How a note with several pages (PDF or several photos) is extracted."""
+    MERGED = "merged"  # every page OCR'd, one extraction over the joined text
+    PER_PAGE = "per_page"  # one extraction per page, returned in `pages`
+
+class PageResult(BaseModel):
+    """One page of a PDF or multi-photo note."""
+    page: int = Field(..., description="1-based page number across all submitted files")
+    data: Optional[Dict[str, Any]] = Field(None, description="Extraction of this page alone (per_page mode)")
+    timings: Dict[str, float] = Field(default_factory=dict, description="Seconds per pipeline stage for this page")
+    error_message: Optional[str] = None
+
+# Models without constrained decoding write what they read off the note: "7,5", "7.5 m3", "có",
+# null for a missing list. The extraction schemas coerce those values before validation, and
+# anything that still cannot be read becomes None rather than failing the whole note.
+
+_NUMBER = re.compile(r"[-+]?\d[\d.,\s]*")
+_TRUE_WORDS = {"true", "yes", "y", "x", "có", "co", "đã ký", "da ky", "signed"}
+_FALSE_WORDS = {"false", "no", "n", "không", "khong", "chưa ký", "chua ky", "unsigned"}
+
+
+def parse_number(value: Any) -> Optional[float]:
+    """A float from a number or a written quantity: decimal commas, thousands separators, units."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = _NUMBER.search(value)
+    if match is None:
+        return None
+    number = re.sub(r"\s", "", match.group()).rstrip(".,")
+    if "," in number and "." in number:
+        # Whichever separator comes last is the decimal mark: "1.234,5" and "1,234.5".
+        thousands = "." if number.rfind(",") > number.rfind(".") else ","
+        number = number.replace(thousands, "").replace(",", ".")
+    elif number.count(",") == 1:
+        number = number.replace(",", ".")  # Vietnamese decimal comma
+    elif "," in number:
+        number = number.replace(",", "")
+    elif number.count(".") > 1:
+        number = number.replace(".", "")  # "1.250.000"
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def parse_text(value: Any) -> Optional[str]:
+    if isinstance(value, str):
+        return value.strip() or None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return None
+
+
+def parse_flag(value: Any) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        word = value.strip().lower()
+        if word in _TRUE_WORDS:
+            return True
+        if word in _FALSE_WORDS:
+            return False
+    return None
+
+
+def parse_object(value: Any) -> Optional[Dict[str, Any]]:
+    return value if isinstance(value, dict) else None
+
+
+def parse_items(value: Any) -> List[Dict[str, Any]]:
+    """A list of item objects; null becomes [] and a lone object a one-item list."""
+    if isinstance(value, dict):
+        return [value]
+    if isinstance(value, list):
+        return [item for item in value if isinstance(item, dict)]
+    return []
+
+
+Number = Annotated[Optional[float], BeforeValidator(parse_number)]
+Text = Annotated[Optional[str], BeforeValidator(parse_text)]
+Flag = Annotated[Optional[bool], BeforeValidator(parse_flag)]
+
+
+class PartyInfo(BaseModel):
+    """Seller or buyer block of a delivery note."""
+    company_name: Text = None
+    representative: Text = None
+    signature: Flag = Field(None, description="Whether the party signed the note")
+
+
+Party = Annotated[Optional[PartyInfo], BeforeValidator(parse_object)]
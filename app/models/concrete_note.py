@@ -1,19 +1,66 @@
-from pydantic import BaseModel, Field
-from typing import Dict, Optional, Any
+from pydantic import BaseModel, BeforeValidator, Field
+from typing import Annotated, Dict, List, Optional, Any
 from enum import Enum
 
+from app.core.config import settings
+from app.models.common import Number, PageMode, PageResult, Party, PipelineMode, Text, parse_items
+
 class ConcreteExtractStatus(str, Enum):
     """Status of the extraction task."""
     SUCCESS = "success"
     ERROR = "error"
 
+class ConcreteDeliveryItem(BaseModel):
+    concrete_type: Text = None
+    concrete_grade: Text = None
+    slump: Text = Field(None, description="Slump in centimeters, as written (e.g. '12±2')")
+    quantity: Number = Field(None, description="In cubic meters")
+
+class ConcreteNoteData(BaseModel):
+    """Extraction schema for concrete delivery notes, also sent to the model as its response format."""
+    note_number: Text = None
+    seller_info: Party = None
+    buyer_info: Party = None
+    delivery_date: Text = None
+    site_address: Text = None
+    vehicle_number: Text = Field(None, description="License plate or vehicle number")
+    work_item: Text = None
+    delivery_items: Annotated[List[ConcreteDeliveryItem], BeforeValidator(parse_items)] = Field(default_factory=list)
+    total_quantity_delivered: Number = Field(None, description="In cubic meters")
+
 class ConcreteExtractRequest(BaseModel):
     """LLM parameters for the extraction task."""
     file_url: str = Field(...)
+    page_urls: List[str] = Field(
+        default_factory=list,
+        max_length=settings.DOCUMENT_MAX_FILES - 1,
+        description="Further pages of the same note (photos or PDFs), in order after file_url"
+    )
     model_name: Optional[str] = Field("Qwen/Qwen3-8B")
+    bypass_cache: bool = Field(False, description="Ignore cached OCR/extraction results for this request")
+    pipeline_mode: Optional[PipelineMode] = Field(None, description="Overrides the deployment's PIPELINE_MODE")
+    page_mode: PageMode = Field(PageMode.MERGED, description="For PDFs and multi-page notes: one merged extraction or one per page")
+    include_timings: bool = Field(False, description="Return a per-stage timing breakdown in `timings`")
 
 class ConcreteExtractResponse(BaseModel):
     status: ConcreteExtractStatus = Field(..., description="The final status of the extraction task.")
-    data: Optional[Dict[str, Any]] = None
+    data: Optional[ConcreteNoteData] = None
+    pages: Optional[List[PageResult]] = Field(None, description="Per-page results and timings, for PDFs and multi-page notes")
     processing_time: Optional[float] = Field(None, description="Processing time in seconds")
-    error_message: Optional[str] = None
\ No newline at end of file
+    timings: Optional[Dict[str, float]] = Field(None, description="Seconds per pipeline stage, when include_timings is set")
+    error_message: Optional[str] = None
+
+class ConcreteBatchRequest(BaseModel):
+    """Several concrete notes processed with the same model."""
+    file_urls: List[str] = Field(..., min_length=1, max_length=settings.BATCH_MAX_ITEMS)
+    model_name: Optional[str] = Field("Qwen/Qwen3-8B")
+    bypass_cache: bool = Field(False, description="Ignore cached OCR/extraction results for this request")
+    pipeline_mode: Optional[PipelineMode] = Field(None, description="Overrides the deployment's PIPELINE_MODE")
+    include_timings: bool = Field(False, description="Return a per-stage timing breakdown in `timings`")
+
+class ConcreteBatchItem(ConcreteExtractResponse):
+    file_url: str
+
+class ConcreteBatchResponse(BaseModel):
+    results: List[ConcreteBatchItem] = Field(..., description="One entry per input URL, in input order.")
+    processing_time: Optional[float] = Field(None, description="Processing time of the whole batch in seconds")
\ No newline at end of file
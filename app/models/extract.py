@@ -0,0 +1,36 @@
+from enum import Enum
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.models.common import PageResult
+
+class ExtractStatus(str, Enum):
+    """Status of the extraction task."""
+    SUCCESS = "success"
+    ERROR = "error"
+
+class ExtractRequest(BaseModel):
+    """Any note type; the type is detected from the OCR text unless `note_type` is given."""
+    file_url: str = Field(...)
+    page_urls: List[str] = Field(
+        default_factory=list,
+        max_length=settings.DOCUMENT_MAX_FILES - 1,
+        description="Further pages of the same note (photos or PDFs), in order after file_url"
+    )
+    note_type: Optional[str] = Field(None, description="Skip classification and extract as this note type")
+    model_name: Optional[str] = Field(None, description="Extraction model; defaults to each note type's default")
+    bypass_cache: bool = Field(False, description="Ignore cached OCR/extraction results for this request")
+    include_timings: bool = Field(False, description="Return a per-stage timing breakdown in `timings`")
+
+class ExtractResponse(BaseModel):
+    status: ExtractStatus = Field(...)
+    note_type: Optional[str] = Field(None, description="Note type the returned data was extracted as")
+    route: Optional[str] = Field(None, description="'routed' (one clear match), 'ambiguous' (several extracted) or 'forced'")
+    scores: Dict[str, float] = Field(default_factory=dict, description="Classifier keyword score per note type")
+    data: Optional[Dict[str, Any]] = None
+    alternatives: Optional[Dict[str, Any]] = Field(None, description="Results for the other candidate note types when ambiguous")
+    pages: Optional[List[PageResult]] = Field(None, description="Per-page timings, for PDFs and multi-page notes")
+    processing_time: Optional[float] = Field(None, description="Processing time in seconds")
+    timings: Optional[Dict[str, float]] = Field(None, description="Seconds per pipeline stage, when include_timings is set")
+    error_message: Optional[str] = None
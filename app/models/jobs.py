@@ -0,0 +1,39 @@
+from enum import Enum
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional
+
+from app.models.common import PipelineMode
+
+class JobStatus(str, Enum):
+    """Lifecycle of a background extraction job."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCESS = "success"
+    ERROR = "error"
+
+class JobPriority(str, Enum):
+    """Interactive jobs are always dequeued before bulk ones."""
+    INTERACTIVE = "interactive"
+    BULK = "bulk"
+
+class JobCreateRequest(BaseModel):
+    note_type: str = Field(..., description="Which extraction pipeline to run: any registered note type, e.g. 'concrete_note'.")
+    file_url: str = Field(...)
+    model_name: Optional[str] = Field(None, description="Extraction model; defaults to the note type's default.")
+    bypass_cache: bool = Field(False, description="Ignore cached OCR/extraction results for this job")
+    pipeline_mode: Optional[PipelineMode] = Field(None, description="Overrides the deployment's PIPELINE_MODE")
+    priority: JobPriority = Field(JobPriority.INTERACTIVE)
+    callback_url: Optional[str] = Field(None, description="Receives a POST with the job body once it finishes.")
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: JobStatus
+    note_type: str
+    file_url: str
+    priority: JobPriority
+    data: Optional[Dict[str, Any]] = None
+    error_message: Optional[str] = None
+    created_at: float = Field(..., description="Unix timestamp")
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    processing_time: Optional[float] = Field(None, description="Processing time in seconds, excluding queue wait")
@@ -1,17 +1,62 @@
 from enum import Enum
-from pydantic import BaseModel, Field
-from typing import Dict, Optional, Any
+from pydantic import BaseModel, BeforeValidator, Field
+from typing import Annotated, Dict, List, Optional, Any
+
+from app.core.config import settings
+from app.models.common import Number, PageMode, PageResult, Party, PipelineMode, Text, parse_items
 
 class ExtractStatus(str, Enum):
     """Status of the extraction task."""
     SUCCESS = "success"
     ERROR = "error"
 
+class MaterialsDeliveryItem(BaseModel):
+    item_name: Text = None
+    description: Text = None
+    quantity: Number = None
+    unit: Text = None
+    price: Number = None
+    totalPrice: Number = None
+
+class MaterialsDeliveryData(BaseModel):
+    """Extraction schema for materials delivery notes, also sent to the model as its response format."""
+    note_number: Text = None
+    seller_info: Party = None
+    buyer_info: Party = None
+    delivery_date: Text = None
+    site_address: Text = None
+    vehicle_number: Text = Field(None, description="The truck's Vietnamese license plate, e.g. '50H 15425'")
+    delivery_items: Annotated[List[MaterialsDeliveryItem], BeforeValidator(parse_items)] = Field(default_factory=list)
+
 class MaterialsDeliveryRequest(BaseModel):
     file_url: str = Field(...,)
+    page_urls: List[str] = Field(
+        default_factory=list,
+        max_length=settings.DOCUMENT_MAX_FILES - 1,
+        description="Further pages of the same note (photos or PDFs), in order after file_url"
+    )
+    bypass_cache: bool = Field(False, description="Ignore cached OCR/extraction results for this request")
+    pipeline_mode: Optional[PipelineMode] = Field(None, description="Overrides the deployment's PIPELINE_MODE")
+    page_mode: PageMode = Field(PageMode.MERGED, description="For PDFs and multi-page notes: one merged extraction or one per page")
+    include_timings: bool = Field(False, description="Return a per-stage timing breakdown in `timings`")
 
 class MaterialsDeliveryResponse(BaseModel):
     status: ExtractStatus = Field(...)
-    data: Optional[Dict[str, Any]] = Field(None)
+    data: Optional[MaterialsDeliveryData] = Field(None)
+    pages: Optional[List[PageResult]] = Field(None, description="Per-page results and timings, for PDFs and multi-page notes")
     processing_time: Optional[float] = Field(None)
-    error_message: Optional[str] = Field(None)
\ No newline at end of file
+    timings: Optional[Dict[str, float]] = Field(None, description="Seconds per pipeline stage, when include_timings is set")
+    error_message: Optional[str] = Field(None)
+
+class MaterialsDeliveryBatchRequest(BaseModel):
+    file_urls: List[str] = Field(..., min_length=1, max_length=settings.BATCH_MAX_ITEMS)
+    bypass_cache: bool = Field(False, description="Ignore cached OCR/extraction results for this request")
+    pipeline_mode: Optional[PipelineMode] = Field(None, description="Overrides the deployment's PIPELINE_MODE")
+    include_timings: bool = Field(False, description="Return a per-stage timing breakdown in `timings`")
+
+class MaterialsDeliveryBatchItem(MaterialsDeliveryResponse):
+    file_url: str
+
+class MaterialsDeliveryBatchResponse(BaseModel):
+    results: List[MaterialsDeliveryBatchItem] = Field(...)
+    processing_time: Optional[float] = Field(None)
\ No newline at end of file
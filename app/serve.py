@@ -0,0 +1,190 @@
+"""Production entrypoint: a pre-forking supervisor running uvicorn workers on one shared socket.
+
+Usage:
+    python -m app.serve [--workers 4] [--host 0.0.0.0] [--port 8000]
+
+The parent imports the application and loads everything that is read-only and safe to share
+(modules and provider SDKs, the note type registry, compiled prompts, the OpenAPI schema),
+binds the socket, then forks SERVER_WORKERS children (0 = one per CPU available to the process)
+that share those pages copy-on-write. Anything holding connections, threads or an event loop
+(HTTP and model clients, the image pool, SQLite handles) is created lazily in each worker after
+the fork. Workers run on uvloop and httptools when they are installed.
+
+On SIGTERM/SIGINT every worker stops accepting connections, lets in-flight requests and running
+jobs finish for up to SERVER_GRACEFUL_SHUTDOWN_SECONDS, then runs the normal lifespan shutdown.
+Workers that exit unexpectedly are restarted. Caches' memory tier, rate limits and the duplicate
+index are per worker; use JOBS_STORE=sqlite so job status is visible from every worker.
+
+`python -m app.main` remains the auto-reloading development server.
+"""
+import argparse
+import gc
+import importlib.util
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Dict, Optional
+
+import uvicorn
+
+from app.core.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+RESTART_DELAY_SECONDS = 1.0
+KILL_GRACE_SECONDS = 10.0  # on top of SERVER_GRACEFUL_SHUTDOWN_SECONDS before workers are killed
+
+
+def available_cpus() -> int:
+    """CPUs this process may use: its affinity mask, further limited by a cgroup v2 CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def worker_count(requested: int) -> int:
+    if requested > 0:
+        return requested
+    return max(1, min(available_cpus(), settings.SERVER_MAX_WORKERS))
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def preload():
+    """Imports the app and warms shared read-only state in the parent, before forking."""
+    from app.core.llm_config import preload_providers
+    from app.core.prompts import prompt_store
+    from app.main import app
+    from app.services.base import OCR_PROMPT
+    from app.services.note_types import note_types
+
+    specs = note_types.all()
+    prompt_store.preload([OCR_PROMPT, *(spec.service_cls.DEFAULT_PROMPT for spec in specs)])
+    preload_providers([settings.VINTERN_MODEL, settings.MODEL_LLM, *(spec.default_model for spec in specs)])
+    if _installed("PIL"):
+        import PIL.Image  # noqa: F401
+    app.openapi()
+    # Keep the preloaded objects out of the collector so it does not touch (and copy) their pages.
+    gc.freeze()
+    return app
+
+
+class Supervisor:
+    """Forks the workers, restarts the ones that die and forwards shutdown signals to them."""
+
+    def __init__(self, config: uvicorn.Config, workers: int):
+        self.config = config
+        self.workers = workers
+        self.children: Dict[int, int] = {}  # pid -> worker index
+        self.stopping = False
+        self.kill_deadline: Optional[float] = None
+        self.sock: Optional[socket.socket] = None
+
+    def spawn(self, index: int, first_start: bool) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = index
+            return
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        code = 0
+        try:
+            from app.core.jobs import job_manager
+
+            # Only one worker re-queues jobs left unfinished by a previous run, and only once.
+            job_manager.resume_unfinished = index == 0 and first_start
+            uvicorn.Server(self.config).run(sockets=[self.sock])
+        except BaseException:
+            logger.exception(f"Worker {index} crashed")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def stop(self, signum, frame) -> None:
+        if self.stopping:
+            return
+        self.stopping = True
+        self.kill_deadline = time.monotonic() + settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS + KILL_GRACE_SECONDS
+        logger.info(f"Received {signal.Signals(signum).name}, draining {len(self.children)} workers")
+        for pid in self.children:
+            os.kill(pid, signal.SIGTERM)
+
+    def run(self) -> None:
+        self.sock = self.config.bind_socket()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for index in range(self.workers):
+            self.spawn(index, first_start=True)
+        logger.info(f"Started {self.workers} workers (parent pid {os.getpid()})")
+
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                if self.kill_deadline is not None and time.monotonic() > self.kill_deadline:
+                    logger.warning(f"Killing {len(self.children)} workers that did not drain in time")
+                    for child in self.children:
+                        os.kill(child, signal.SIGKILL)
+                    self.kill_deadline = None
+                time.sleep(0.2)
+                continue
+            index = self.children.pop(pid, None)
+            if index is None or self.stopping:
+                continue
+            logger.warning(f"Worker {index} (pid {pid}) exited with code {os.waitstatus_to_exitcode(status)}, restarting")
+            time.sleep(RESTART_DELAY_SECONDS)
+            if not self.stopping:
+                self.spawn(index, first_start=False)
+        self.sock.close()
+        logger.info("All workers stopped")
+
+
+def build_config(app, args: argparse.Namespace) -> uvicorn.Config:
+    return uvicorn.Config(
+        app,
+        host=args.host,
+        port=args.port,
+        loop="uvloop" if _installed("uvloop") else "asyncio",
+        http="httptools" if _installed("httptools") else "h11",
+        lifespan="on",
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        log_level=args.log_level,
+        access_log=args.access_log,
+        proxy_headers=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS, help="0 = one per available CPU")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--access-log", action="store_true", help="Log every request (off by default for throughput)")
+    args = parser.parse_args()
+
+    workers = worker_count(args.workers)
+    app = preload()
+    config = build_config(app, args)
+    logger.info(f"Serving on {args.host}:{args.port} with {workers} workers, loop={config.loop}, http={config.http}")
+    if workers > 1 and settings.JOBS_STORE == "memory":
+        logger.warning("JOBS_STORE=memory with several workers: a job's status is only visible from the worker that took it")
+    Supervisor(config, workers).run()
+
+
+if __name__ == "__main__":
+    main()
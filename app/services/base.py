@@ -0,0 +1,584 @@
+import asyncio
+import json
+import logging
+import re
+import time
+import unicodedata
+from dataclasses import replace
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Type
+
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
+from langchain_core.outputs import ChatGenerationChunk
+from pydantic import BaseModel, ValidationError
+
+from app.core.cache import extraction_cache, make_cache_key, ocr_cache
+from app.core.concurrency import StageLimits, limit
+from app.core.config import settings
+from app.core.executor import run_cpu_bound
+from app.core.llm_config import get_chat_model, structured_output_kwargs, structured_output_mode, supports_vision
+from app.core.metrics import collect_timings, output_tokens, parse_failures, parse_outcomes, record_usage, repair_tokens_saved, stage
+from app.core.prompts import Prompt, prompt_store
+from app.core.resilience import call_layer, deadline_scope
+from app.models.common import PageMode, PipelineMode
+from app.utils.helpers import PreparedImage, build_image_message
+from app.utils.image_prep import ImagePrepOptions, join_tiles, prepare_image_payloads
+from app.utils.json_repair import repair_json
+from app.utils.pages import Page, UnsupportedDocumentError, is_pdf, load_page, split_pages
+
+OCR_PROMPT = "app/templates/ocr.txt"
+# Stands in for {ocr_text} when the extraction prompt is sent together with the image.
+SINGLE_PASS_OCR_TEXT = "(No transcription is provided. Read the attached image of the note directly.)"
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"[ \t\u00a0]+")
+
+
+def normalize_ocr_text(text: str) -> str:
+    """Canonical form of OCR output used for cache keys: NFC, trimmed lines, collapsed spaces."""
+    text = unicodedata.normalize("NFC", text)
+    lines = (_WHITESPACE_RE.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def join_pages(texts: List[str]) -> str:
+    """OCR texts of a multi-page note as one extraction input, with page markers."""
+    if len(texts) == 1:
+        return texts[0]
+    return "\n\n".join(f"--- Page {number} ---\n{text}" for number, text in enumerate(texts, start=1))
+
+
+def message_text(message: Any) -> str:
+    content = getattr(message, "content", message)
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+
+def image_prep_options() -> ImagePrepOptions:
+    return ImagePrepOptions(
+        mode=settings.IMAGE_PREP_MODE,
+        max_dimension=settings.IMAGE_MAX_DIMENSION,
+        min_dimension=settings.IMAGE_MIN_DIMENSION,
+        dense_dimension=settings.IMAGE_DENSE_DIMENSION,
+        jpeg_quality=settings.IMAGE_JPEG_QUALITY,
+        passthrough_max_bytes=settings.IMAGE_PASSTHROUGH_MAX_KB * 1024,
+        grayscale=settings.IMAGE_GRAYSCALE,
+        auto_crop=settings.IMAGE_AUTO_CROP,
+        tiling=settings.IMAGE_TILING,
+        tile_min_aspect=settings.IMAGE_TILE_MIN_ASPECT,
+    )
+
+
+class PipelineStats:
+    """Outcome counters and latency totals per pipeline mode, for comparing the two modes."""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, mode: str, outcome: str, seconds: float) -> None:
+        stats = self._stats.setdefault(mode, {"seconds_total": 0.0, "count": 0})
+        stats[outcome] = stats.get(outcome, 0) + 1
+        stats["seconds_total"] += seconds
+        stats["count"] += 1
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            mode: {**stats, "seconds_avg": stats["seconds_total"] / stats["count"]}
+            for mode, stats in self._stats.items()
+        }
+
+
+pipeline_stats = PipelineStats()
+
+
+class BaseNoteService:
+    """OCR + extraction pipeline shared by the note services.
+
+    Subclasses set DEFAULT_PROMPT, REQUIRED_FIELDS (top-level keys a valid result must fill in) and
+    OUTPUT_SCHEMA, which every result is validated against and which is sent to servers that
+    support constrained decoding (see STRUCTURED_OUTPUT_MODE).
+    """
+
+    DEFAULT_PROMPT: str
+    REQUIRED_FIELDS: Tuple[str, ...] = ()
+    OUTPUT_SCHEMA: Optional[Type[BaseModel]] = None
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        model_factory: Callable = get_chat_model,
+    ):
+        self.model_name = model_name
+        self.upstream_name = model_name or settings.MODEL_LLM
+        self.ocr_model_name = settings.VINTERN_MODEL
+        self.image_options = image_prep_options()
+
+        self.model = model_factory(model_name)
+        self.supports_single_pass = supports_vision(model_name)
+        self.ocr_model = model_factory(self.ocr_model_name)
+
+        self.output_mode = "off"
+        self.schema_hash = ""
+        self.extract_model = self.model
+        if self.OUTPUT_SCHEMA is not None:
+            schema = self.OUTPUT_SCHEMA.model_json_schema()
+            self.schema_hash = make_cache_key(json.dumps(schema, sort_keys=True))
+            self.output_mode = structured_output_mode(model_name)
+            kwargs = structured_output_kwargs(model_name, self.OUTPUT_SCHEMA.__name__, schema)
+            if kwargs:
+                self.extract_model = self.model.bind(**kwargs)
+
+        self.parser = JsonOutputParser()
+        self.ocr_parser = StrOutputParser()
+
+        self._prompt_source: Optional[Prompt] = None
+        self.refresh_prompts()
+
+    def refresh_prompts(self) -> None:
+        """Rebuilds the chains when the prompt template was reloaded from disk."""
+        prompt = prompt_store.get(self.DEFAULT_PROMPT)
+        if prompt is self._prompt_source:
+            return
+        self._prompt_source = prompt
+        self.prompt = prompt.template
+        self.prompt_hash = prompt.hash
+
+        # The model step is kept separate from parsing so token usage and parse failures can be recorded.
+        self.extract_chain = self.prompt | self.extract_model
+        self.chain = self.extract_chain | self.parser
+        self.ocr_chain = self.prompt | self.ocr_model | self.ocr_parser
+
+    @property
+    def ocr_prompt(self) -> str:
+        return prompt_store.get(OCR_PROMPT).text
+
+    async def prepare_ocr_input(self, file_content: bytes) -> Tuple[List[PreparedImage], Optional[str]]:
+        """Prepares the OCR payload(s) off the event loop. Returns them with the OCR cache key."""
+        with stage("preprocess"):
+            images = await run_cpu_bound(prepare_image_payloads, file_content, self.image_options)
+        for image in images:
+            logger.debug(f"Prepared {image.mime_type} image ({image.size} bytes): {image.timings}")
+        cache_key = None
+        if settings.OCR_CACHE_ENABLED:
+            cache_key = make_cache_key(*(image.digest for image in images), self.ocr_prompt, self.ocr_model_name)
+        return images, cache_key
+
+    async def run_ocr(
+        self,
+        file_content: bytes,
+        bypass_cache: bool = False,
+        limits: Optional[StageLimits] = None,
+    ) -> str:
+        """Transcribes the image, reusing a cached transcription of the same prepared image.
+
+        Tall notes may be split into tiles; tiles are OCR'd concurrently and stitched in order
+        (see join_tiles).
+        """
+        images, cache_key = await self.prepare_ocr_input(file_content)
+        if cache_key is not None and not bypass_cache:
+            cached = await ocr_cache.get(cache_key)
+            if cached is not None:
+                logger.debug("OCR cache hit")
+                return cached
+
+        async def ocr_one(image) -> str:
+            async with limit(limits and limits.ocr):
+                message = build_image_message(image, self.ocr_prompt)
+                ocr_res = await call_layer.call(self.ocr_model_name, lambda: self.ocr_model.ainvoke(message))
+            record_usage(ocr_res, "ocr", self.ocr_model_name)
+            return ocr_res.content
+
+        with stage("ocr", self.ocr_model_name, tiles=len(images)):
+            texts = await asyncio.gather(*(ocr_one(image) for image in images))
+        ocr_text = join_tiles(texts)
+
+        if cache_key is not None:
+            await ocr_cache.set(cache_key, ocr_text)
+        return ocr_text
+
+    async def ocr_pages(
+        self,
+        pages: List[Page],
+        bypass_cache: bool = False,
+        limits: Optional[StageLimits] = None,
+        page_mode: PageMode = PageMode.MERGED,
+    ) -> List[Dict[str, Any]]:
+        """OCRs the pages of a note in order, at most DOCUMENT_PAGE_WINDOW at a time.
+
+        A PDF page is only rendered once it enters the window, and its image is dropped as soon as
+        it is transcribed, so memory does not grow with the page count. In per-page mode each page
+        is also extracted right after its OCR, while later pages are still being transcribed; a
+        failing page then only fails its own entry. Returns one dict per page with `page`,
+        `ocr_text`, `timings` and, per page, `data` / `error_message`.
+        """
+        window = asyncio.Semaphore(max(1, settings.DOCUMENT_PAGE_WINDOW))
+
+        async def run_page(page: Page) -> Dict[str, Any]:
+            result: Dict[str, Any] = {"page": page.number, "ocr_text": None}
+            with collect_timings() as timings:
+                try:
+                    try:
+                        if page.pdf_index is not None:
+                            with stage("render"):
+                                image = await run_cpu_bound(load_page, page, settings.PDF_RENDER_DPI)
+                        else:
+                            image = page.source
+                        result["ocr_text"] = await self.run_ocr(image, bypass_cache=bypass_cache, limits=limits)
+                    finally:
+                        window.release()
+                    if page_mode == PageMode.PER_PAGE:
+                        result["data"] = await self.extract(result["ocr_text"], bypass_cache=bypass_cache, limits=limits)
+                except Exception as e:
+                    if page_mode != PageMode.PER_PAGE:
+                        raise
+                    logger.warning(f"Page {page.number} failed: {e}")
+                    result["error_message"] = str(e)
+            result["timings"] = timings
+            return result
+
+        tasks: List[asyncio.Task] = []
+        try:
+            for page in pages:
+                await window.acquire()
+                failed = next(
+                    (task for task in tasks if task.done() and not task.cancelled() and task.exception() is not None), None
+                )
+                if failed is not None:
+                    window.release()
+                    raise failed.exception()
+                tasks.append(asyncio.create_task(run_page(page)))
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def ocr_document(
+        self,
+        files: List[bytes],
+        bypass_cache: bool = False,
+        limits: Optional[StageLimits] = None,
+    ) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
+        """OCR text of a note made of one or more photos and/or PDFs, with per-page info (None for one photo)."""
+        if len(files) == 1 and not is_pdf(files[0]):
+            return await self.run_ocr(files[0], bypass_cache=bypass_cache, limits=limits), None
+        pages = await run_cpu_bound(split_pages, files, settings.DOCUMENT_MAX_PAGES)
+        results = await self.ocr_pages(pages, bypass_cache=bypass_cache, limits=limits)
+        return join_pages([result.pop("ocr_text") for result in results]), results
+
+    @property
+    def is_deterministic(self) -> bool:
+        """Only temperature 0 extraction models are memoized."""
+        return getattr(self.model, "temperature", None) == 0
+
+    def extraction_cache_key(self, ocr_text: str) -> Optional[str]:
+        if settings.EXTRACTION_CACHE_ENABLED and self.is_deterministic:
+            return make_cache_key(self.prompt_hash, self.schema_hash, self.model_name, normalize_ocr_text(ocr_text))
+        return None
+
+    async def extract(
+        self,
+        ocr_text: str,
+        bypass_cache: bool = False,
+        limits: Optional[StageLimits] = None,
+    ):
+        """Turns OCR text into the parsed JSON output, memoized on the normalized text."""
+        cache_key = self.extraction_cache_key(ocr_text)
+        if cache_key is not None and not bypass_cache:
+            cached = await extraction_cache.get(cache_key)
+            if cached is not None:
+                logger.debug("Extraction cache hit")
+                return cached
+
+        res = await self._ask(ocr_text, limits, settings.EXTRACTION_REASK_ATTEMPTS + 1)
+        if cache_key is not None and res is not None:
+            await extraction_cache.set(cache_key, res)
+        return res
+
+    async def _ask(self, ocr_text: str, limits: Optional[StageLimits], attempts: int):
+        """Uncached extraction: up to `attempts` model calls, asking again while the output cannot be parsed or repaired."""
+        for attempt in range(attempts):
+            async with limit(limits and limits.llm):
+                with stage("extract", self.upstream_name):
+                    response = await call_layer.call(self.upstream_name, lambda: self.extract_chain.ainvoke({"ocr_text": ocr_text}))
+            record_usage(response, "extract", self.upstream_name)
+            try:
+                return self.parse(response, "extract")
+            except OutputParserException:
+                if attempt + 1 == attempts:
+                    raise
+                parse_outcomes.inc(stage="extract", model=self.upstream_name, outcome="reasked")
+                logger.warning("Extraction output could not be parsed or repaired; asking the model again")
+
+    async def process_ocr_text(
+        self,
+        ocr_text: str,
+        bypass_cache: bool = False,
+        limits: Optional[StageLimits] = None,
+    ):
+        """Extraction for a note that was already transcribed, e.g. once for several note types."""
+        self.refresh_prompts()
+        return await self.extract(ocr_text, bypass_cache=bypass_cache, limits=limits)
+
+    async def stream_file(
+        self,
+        file_content: bytes,
+        bypass_cache: bool = False,
+        limits: Optional[StageLimits] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Two-stage pipeline that yields progress events instead of a single result.
+
+        Events: `ocr_token` (text chunks as Vintern generates them; tiles stream in order),
+        `ocr_done` (full OCR text), `partial` (progressively parsed JSON) and `result`.
+        Cached stages are emitted as a single event. The `result` is parsed, repaired and
+        validated like extract()'s (asking the model again if needed); output that stays
+        invalid raises instead of being sent as a result.
+        """
+        self.refresh_prompts()
+        if is_pdf(file_content):
+            raise UnsupportedDocumentError("PDF notes cannot be streamed; use the non-streaming endpoint")
+        images, ocr_key = await self.prepare_ocr_input(file_content)
+        ocr_text = await ocr_cache.get(ocr_key) if ocr_key is not None and not bypass_cache else None
+        if ocr_text is None:
+            texts = []
+            with stage("ocr", self.ocr_model_name, tiles=len(images)):
+                for image in images:
+                    parts = []
+                    async with limit(limits and limits.ocr), call_layer.guard(self.ocr_model_name):
+                        async for chunk in self.ocr_model.astream(build_image_message(image, self.ocr_prompt)):
+                            if chunk.content:
+                                parts.append(chunk.content)
+                                yield {"event": "ocr_token", "text": chunk.content}
+                    texts.append("".join(parts))
+            ocr_text = join_tiles(texts)
+            if ocr_key is not None:
+                await ocr_cache.set(ocr_key, ocr_text)
+        yield {"event": "ocr_done", "text": ocr_text}
+
+        extraction_key = self.extraction_cache_key(ocr_text)
+        res = await extraction_cache.get(extraction_key) if extraction_key is not None and not bypass_cache else None
+        if res is None:
+            message = AIMessageChunk(content="")
+            partial = None
+            async with limit(limits and limits.llm), call_layer.guard(self.upstream_name):
+                with stage("extract", self.upstream_name):
+                    async for chunk in self.extract_chain.astream({"ocr_text": ocr_text}):
+                        message += chunk
+                        parsed = self.parser.parse_result([ChatGenerationChunk(message=message)], partial=True)
+                        if parsed is not None and parsed != partial:
+                            partial = parsed
+                            yield {"event": "partial", "data": parsed}
+            record_usage(message, "extract", self.upstream_name)
+            try:
+                res = self.parse(message, "extract")
+            except OutputParserException:
+                if not settings.EXTRACTION_REASK_ATTEMPTS:
+                    raise
+                parse_outcomes.inc(stage="extract", model=self.upstream_name, outcome="reasked")
+                logger.warning("Streamed extraction output could not be parsed or repaired; asking the model again")
+                res = await self._ask(ocr_text, limits, settings.EXTRACTION_REASK_ATTEMPTS)
+            if extraction_key is not None and res is not None:
+                await extraction_cache.set(extraction_key, res)
+        yield {"event": "result", "data": res}
+
+    def parse(self, response: Any, stage_name: str) -> Any:
+        """Parses a model response: the JSON output parser first, then a local repair pass."""
+        labels = {"stage": stage_name, "model": self.upstream_name}
+        usage = getattr(response, "usage_metadata", None) or {}
+        if usage.get("output_tokens") is not None:
+            output_tokens.observe(usage["output_tokens"], output_mode=self.output_mode, **labels)
+        try:
+            result, outcome = self.conform(self.parser.invoke(response)), "parsed"
+        except OutputParserException as e:
+            repaired = repair_json(message_text(response))
+            try:
+                if repaired is None:
+                    raise e
+                result, outcome = self.conform(repaired), "repaired"
+            except OutputParserException:
+                parse_failures.inc(**labels)
+                parse_outcomes.inc(outcome="invalid", **labels)
+                raise
+            logger.debug(f"Repaired unparseable {stage_name} output locally")
+            repair_tokens_saved.inc(usage.get("output_tokens") or 0, **labels)
+        parse_outcomes.inc(outcome=outcome, **labels)
+        return result
+
+    def conform(self, result: Any) -> Any:
+        """Validates a parsed result against OUTPUT_SCHEMA and returns it with every schema field present."""
+        if self.OUTPUT_SCHEMA is None:
+            return result
+        try:
+            return self.OUTPUT_SCHEMA.model_validate(result).model_dump(mode="json")
+        except ValidationError as e:
+            raise OutputParserException(f"Output does not match {self.OUTPUT_SCHEMA.__name__}: {e}")
+
+    def validate(self, result: Any) -> bool:
+        """Checks a parsed extraction: every REQUIRED_FIELDS value filled in, and not entirely empty.
+
+        conform() fills in every schema field, so a required field only counts when it has a value.
+        """
+        if not isinstance(result, dict):
+            return False
+        if any(result.get(field) in (None, "", [], {}) for field in self.REQUIRED_FIELDS):
+            return False
+        return any(value not in (None, "", [], {}) for value in result.values())
+
+    async def extract_single_pass(self, file_content: bytes, limits: Optional[StageLimits] = None):
+        """Sends the image and the extraction prompt to the (vision-capable) model in one call."""
+        options = replace(self.image_options, tiling=False)
+        with stage("preprocess"):
+            image = (await run_cpu_bound(prepare_image_payloads, file_content, options))[0]
+        prompt_text = self.prompt.format_messages(ocr_text=SINGLE_PASS_OCR_TEXT)[0].content
+        message = HumanMessage(content=[
+            {"type": "text", "text": prompt_text},
+            {"type": "image_url", "image_url": {"url": f"data:{image.mime_type};base64,{image.base64_data}"}},
+        ])
+        async with limit(limits and limits.llm):
+            with stage("single_pass", self.upstream_name):
+                response = await call_layer.call(self.upstream_name, lambda: self.extract_model.ainvoke([message]))
+        record_usage(response, "single_pass", self.upstream_name)
+        return self.parse(response, "single_pass")
+
+    @property
+    def result_namespace(self) -> str:
+        """Everything besides the input a result depends on: the same parts as the OCR and extraction cache keys."""
+        self.refresh_prompts()
+        return make_cache_key(
+            type(self).__name__,
+            self.model_name,
+            self.prompt_hash,
+            self.schema_hash,
+            self.ocr_model_name,
+            self.ocr_prompt,
+            repr(self.image_options),
+        )
+
+    @property
+    def dedup_namespace(self) -> str:
+        return make_cache_key(type(self).__name__, self.model_name, self.schema_hash)
+
+    def resolve_mode(self, pipeline_mode: Optional[PipelineMode]) -> PipelineMode:
+        mode = PipelineMode(pipeline_mode or settings.PIPELINE_MODE)
+        if mode == PipelineMode.SINGLE_PASS and not self.supports_single_pass:
+            logger.debug(f"Model '{self.model_name}' cannot read images; using the two-stage pipeline")
+            return PipelineMode.TWO_STAGE
+        return mode
+
+    async def process_file(
+        self,
+        file_content: bytes,
+        bypass_cache: bool = False,
+        limits: Optional[StageLimits] = None,
+        pipeline_mode: Optional[PipelineMode] = None,
+    ):
+        """
+        Processes an image file by performing OCR and then extracting structured data.
+        `bypass_cache` skips cache reads for both stages; fresh results are still stored.
+        `limits` caps how many OCR/LLM calls run at once across concurrent callers.
+        `pipeline_mode` overrides PIPELINE_MODE; a single-pass result that fails validation
+        falls back to the two-stage pipeline.
+        """
+        if is_pdf(file_content):
+            # Callers that only take a result (batches, jobs) get the merged extraction of every page.
+            return (await self.process_document([file_content], bypass_cache, limits, pipeline_mode))["data"]
+        self.refresh_prompts()
+        with deadline_scope(settings.LLM_REQUEST_DEADLINE_SECONDS):
+            return await self._process_file(file_content, bypass_cache, limits, pipeline_mode)
+
+    async def process_document(
+        self,
+        files: List[bytes],
+        bypass_cache: bool = False,
+        limits: Optional[StageLimits] = None,
+        pipeline_mode: Optional[PipelineMode] = None,
+        page_mode: PageMode = PageMode.MERGED,
+    ) -> Dict[str, Any]:
+        """
+        Processes a note made of one or more photos and/or PDFs. Returns {"data", "pages"}.
+        A single photo in merged mode goes through process_file (`pages` is None). Otherwise
+        every page is OCR'd (see ocr_pages) with the two-stage pipeline; merged mode extracts
+        the joined page texts in one call, per-page mode returns each page's data in `pages`.
+        """
+        self.refresh_prompts()
+        with deadline_scope(settings.LLM_REQUEST_DEADLINE_SECONDS):
+            if len(files) == 1 and not is_pdf(files[0]) and page_mode == PageMode.MERGED:
+                return {"data": await self._process_file(files[0], bypass_cache, limits, pipeline_mode), "pages": None}
+            return await self._process_document(files, bypass_cache, limits, page_mode)
+
+    async def _process_document(
+        self,
+        files: List[bytes],
+        bypass_cache: bool,
+        limits: Optional[StageLimits],
+        page_mode: PageMode,
+    ) -> Dict[str, Any]:
+        start_time = time.monotonic()
+        if page_mode == PageMode.PER_PAGE:
+            pages = await run_cpu_bound(split_pages, files, settings.DOCUMENT_MAX_PAGES)
+            results = await self.ocr_pages(pages, bypass_cache=bypass_cache, limits=limits, page_mode=page_mode)
+            for result in results:
+                result.pop("ocr_text")
+            valid = [result for result in results if self.validate(result.get("data"))]
+            outcome = "success" if len(valid) == len(results) else "invalid"
+            pipeline_stats.record(PipelineMode.TWO_STAGE.value, outcome, time.monotonic() - start_time)
+            errors = [result["error_message"] for result in results if result.get("error_message")]
+            if len(errors) == len(results):
+                # Some pages failing is reported per page; none succeeding is a failed note.
+                raise RuntimeError(f"All {len(results)} pages failed; page 1: {errors[0]}")
+            return {"data": None, "pages": results}
+
+        ocr_text, results = await self.ocr_document(files, bypass_cache=bypass_cache, limits=limits)
+        res = await self.extract(ocr_text, bypass_cache=bypass_cache, limits=limits)
+        outcome = "success" if self.validate(res) else "invalid"
+        pipeline_stats.record(PipelineMode.TWO_STAGE.value, outcome, time.monotonic() - start_time)
+        return {"data": res, "pages": results}
+
+    async def _process_file(
+        self,
+        file_content: bytes,
+        bypass_cache: bool,
+        limits: Optional[StageLimits],
+        pipeline_mode: Optional[PipelineMode],
+    ):
+        start_time = time.monotonic()
+        mode = self.resolve_mode(pipeline_mode)
+        duplicates = None
+        if settings.DEDUP_ENABLED:
+            from app.core.dedup import DuplicateLookup  # imports NumPy, so only when enabled
+
+            duplicates = DuplicateLookup(self.dedup_namespace, bypass_cache)
+            res = await duplicates.by_image(file_content)
+            if res is not None:
+                pipeline_stats.record(mode.value, "duplicate", time.monotonic() - start_time)
+                return res
+
+        if mode == PipelineMode.SINGLE_PASS:
+            try:
+                res = await self.extract_single_pass(file_content, limits=limits)
+                if self.validate(res):
+                    pipeline_stats.record(PipelineMode.SINGLE_PASS.value, "success", time.monotonic() - start_time)
+                    if duplicates is not None:
+                        duplicates.remember(res)
+                    return res
+                logger.warning("Single-pass extraction failed validation; falling back to two-stage")
+            except Exception as e:
+                logger.warning(f"Single-pass extraction failed ({e}); falling back to two-stage")
+            pipeline_stats.record(PipelineMode.SINGLE_PASS.value, "fallback", time.monotonic() - start_time)
+            start_time = time.monotonic()
+
+        ocr_text = await self.run_ocr(file_content, bypass_cache=bypass_cache, limits=limits)
+        if duplicates is not None:
+            res = await duplicates.by_text(ocr_text)
+            if res is not None:
+                pipeline_stats.record(PipelineMode.TWO_STAGE.value, "duplicate", time.monotonic() - start_time)
+                return res
+        res = await self.extract(ocr_text, bypass_cache=bypass_cache, limits=limits)
+        outcome = "success" if self.validate(res) else "invalid"
+        if duplicates is not None and outcome == "success":
+            duplicates.remember(res)
+        pipeline_stats.record(PipelineMode.TWO_STAGE.value, outcome, time.monotonic() - start_time)
+        return res
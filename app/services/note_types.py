@@ -0,0 +1,126 @@
+"""Registry of note types and the local classifier that routes OCR text to them.
+
+A note type is a prompt template directory, `<TEMPLATES_DIR>/<name>/<name>.txt`, with an
+optional `keywords.txt` ("phrase" or "phrase: weight" per line). Types with a dedicated service
+class (schema, required fields) are listed in BUILTIN_SERVICES; any other template directory
+gets a plain BaseNoteService subclass, so adding a note type only needs a new template.
+"""
+import logging
+import os
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Type
+
+from app.core.config import settings
+from app.services.base import BaseNoteService
+from app.services.concrete_note import ConcreteNoteService
+from app.services.materials_delivery import MaterialsDeliveryService
+
+logger = logging.getLogger(__name__)
+
+# name -> (service class, default extraction model)
+BUILTIN_SERVICES: Dict[str, Tuple[Type[BaseNoteService], Optional[str]]] = {
+    "concrete_note": (ConcreteNoteService, "Qwen/Qwen3-8B"),
+    "materials_delivery": (MaterialsDeliveryService, None),
+}
+KEYWORDS_FILE = "keywords.txt"
+
+
+@dataclass
+class NoteTypeSpec:
+    name: str
+    service_cls: Type[BaseNoteService]
+    default_model: Optional[str] = None
+    keywords: Dict[str, float] = field(default_factory=dict)  # folded phrase -> weight
+    _patterns: List[Tuple[re.Pattern, float]] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._patterns = [
+            (re.compile(r"(?<!\w)" + re.escape(phrase) + r"(?!\w)"), weight)
+            for phrase, weight in self.keywords.items()
+        ]
+
+    def score(self, folded_text: str) -> float:
+        return sum(weight * len(pattern.findall(folded_text)) for pattern, weight in self._patterns)
+
+
+def fold_text(text: str) -> str:
+    """Lowercase, accent-free form of Vietnamese text ("Bê tông" -> "be tong") for keyword matching."""
+    text = unicodedata.normalize("NFD", text.lower().replace("đ", "d"))
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def load_keywords(path: str) -> Dict[str, float]:
+    keywords: Dict[str, float] = {}
+    if not os.path.exists(path):
+        return keywords
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            phrase, sep, weight = line.rpartition(":")
+            if not sep:
+                phrase, weight = line, "1"
+            keywords[fold_text(phrase.strip())] = float(weight)
+    return keywords
+
+
+class NoteTypeRegistry:
+    """Note types by name, discovered from TEMPLATES_DIR on first use."""
+
+    def __init__(self, templates_dir: str):
+        self.templates_dir = templates_dir
+        self._types: Dict[str, NoteTypeSpec] = {}
+        self._lock = threading.Lock()
+        self._discovered = False
+
+    def register(self, spec: NoteTypeSpec) -> NoteTypeSpec:
+        self._types[spec.name] = spec
+        return spec
+
+    def _discover(self) -> None:
+        with self._lock:
+            if self._discovered:
+                return
+            for name in sorted(os.listdir(self.templates_dir)):
+                prompt_path = os.path.join(self.templates_dir, name, f"{name}.txt")
+                if name in self._types or not os.path.isfile(prompt_path):
+                    continue
+                service_cls, default_model = BUILTIN_SERVICES.get(name) or (self._generic_service(name, prompt_path), None)
+                keywords = load_keywords(os.path.join(self.templates_dir, name, KEYWORDS_FILE))
+                self.register(NoteTypeSpec(name, service_cls, default_model, keywords))
+                logger.info(f"Registered note type '{name}' ({service_cls.__name__}, {len(keywords)} keywords)")
+            self._discovered = True
+
+    @staticmethod
+    def _generic_service(name: str, prompt_path: str) -> Type[BaseNoteService]:
+        class_name = "".join(part.capitalize() for part in name.split("_")) + "Service"
+        return type(class_name, (BaseNoteService,), {"DEFAULT_PROMPT": prompt_path})
+
+    def get(self, name: str) -> Optional[NoteTypeSpec]:
+        self._discover()
+        return self._types.get(name)
+
+    def all(self) -> List[NoteTypeSpec]:
+        self._discover()
+        return list(self._types.values())
+
+    def classify(self, ocr_text: str) -> List[Tuple[str, float]]:
+        """Keyword scores for every note type, best first."""
+        folded = fold_text(ocr_text)
+        scores = [(spec.name, spec.score(folded)) for spec in self.all()]
+        return sorted(scores, key=lambda item: item[1], reverse=True)
+
+    def candidates(self, scores: List[Tuple[str, float]]) -> List[str]:
+        """The best note type, or the top NOTE_TYPE_MAX_CANDIDATES when the scores are too close to call."""
+        best = scores[0][1] if scores else 0.0
+        if best <= 0:
+            return [name for name, _ in scores[:settings.NOTE_TYPE_MAX_CANDIDATES]]
+        close = [name for name, score in scores if score >= best * settings.NOTE_TYPE_AMBIGUITY_RATIO]
+        return close[:settings.NOTE_TYPE_MAX_CANDIDATES]
+
+
+note_types = NoteTypeRegistry(settings.TEMPLATES_DIR)
@@ -1,10 +1,35 @@
+from __future__ import annotations
+
 import base64
-from PIL import Image
+import hashlib
+import logging
+import time
+from dataclasses import dataclass, field
 from io import BytesIO
-import json
-from langchain.prompts import ChatPromptTemplate
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
 from langchain_core.messages import HumanMessage
 
+from app.utils.pages import UnsupportedDocumentError
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+PASSTHROUGH_FORMATS = ("JPEG", "PNG", "WEBP")
+
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+)
+HEIF_BRANDS = {b"heic": "image/heic", b"heix": "image/heic", b"mif1": "image/heif", b"msf1": "image/heif", b"avif": "image/avif"}
+
 def load_prompt(path: str) -> str:
     try:
         with open(path, "r", encoding="utf-8") as f:
@@ -14,34 +39,134 @@ def load_prompt(path: str) -> str:
     except IOError as e:
         raise
 
+@dataclass
+class PreparedImage:
+    """Image ready to be sent to the OCR model, produced off the event loop."""
+    base64_data: str
+    mime_type: str
+    digest: str  # sha256 of the bytes that are sent, used for cache keys
+    size: int
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+def flatten_to_rgb(img: Image.Image) -> Image.Image:
+    from PIL import Image
+
+    if img.mode in ("RGB", "L"):
+        return img
+    if img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def preprocess_image(
+    image_bytes: bytes,
+    max_dimension: int = 1024,
+    jpeg_quality: int = 85,
+    passthrough_max_bytes: int = 512 * 1024,
+) -> Tuple[bytes, str, Dict[str, float]]:
+    """Downscales and re-encodes an image once. Returns (bytes, mime type, per-stage timings).
+
+    Small JPEG/PNG/WebP files are passed through untouched with their real MIME type;
+    everything else is re-encoded as JPEG. JPEGs are downscaled while decoding via `draft`.
+    """
+    # Pillow is imported on first use so importing the app does not pay for it.
+    from PIL import Image, ImageOps
+
+    timings: Dict[str, float] = {}
+    start = time.perf_counter()
+    img = Image.open(BytesIO(image_bytes))
+    image_format = img.format
+    needs_resize = max(img.width, img.height) > max_dimension
+    if not needs_resize and image_format in PASSTHROUGH_FORMATS and len(image_bytes) <= passthrough_max_bytes:
+        timings["decode"] = time.perf_counter() - start
+        return image_bytes, Image.MIME[image_format], timings
+
+    if image_format == "JPEG" and needs_resize:
+        # Lets libjpeg decode at 1/2, 1/4 or 1/8 scale instead of full resolution.
+        img.draft("RGB", (max_dimension, max_dimension))
+    ImageOps.exif_transpose(img, in_place=True)
+    img.load()
+    now = time.perf_counter()
+    timings["decode"] = now - start
+
+    if max(img.width, img.height) > max_dimension:
+        img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    img = flatten_to_rgb(img)
+    timings["resize"] = time.perf_counter() - now
+
+    now = time.perf_counter()
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", quality=jpeg_quality, optimize=True)
+    timings["encode"] = time.perf_counter() - now
+    return buffer.getvalue(), "image/jpeg", timings
+
+
+def build_payload(data: bytes, mime_type: str, timings: Dict[str, float]) -> PreparedImage:
+    """Hashes and base64-encodes already prepared image bytes."""
+    now = time.perf_counter()
+    digest = hashlib.sha256(data).hexdigest()
+    timings["hash"] = time.perf_counter() - now
+    now = time.perf_counter()
+    base64_data = base64.b64encode(data).decode("ascii")
+    timings["base64"] = time.perf_counter() - now
+    return PreparedImage(base64_data=base64_data, mime_type=mime_type, digest=digest, size=len(data), timings=timings)
+
+
+def sniff_image_mime(data: bytes) -> Optional[str]:
+    """MIME type from the file's magic bytes, or None when it is not a known image format."""
+    for signature, mime_type in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:8] == b"ftyp":
+        return HEIF_BRANDS.get(bytes(data[8:12]))
+    return None
+
+
+def prepare_image_payload(
+    image_bytes: bytes,
+    max_dimension: int = 1024,
+    jpeg_quality: int = 85,
+    passthrough_max_bytes: int = 512 * 1024,
+) -> PreparedImage:
+    """Full CPU-bound preparation step (resize, encode, hash, base64). Safe to run in a process pool."""
+    try:
+        data, mime_type, timings = preprocess_image(image_bytes, max_dimension, jpeg_quality, passthrough_max_bytes)
+    except Exception as e:
+        # Formats Pillow cannot decode here (e.g. HEIC without a plugin) go out as-is, labelled
+        # with their real type; anything that is not an image at all is rejected.
+        mime_type = sniff_image_mime(image_bytes)
+        if mime_type is None:
+            raise UnsupportedDocumentError("File is not a supported image (JPEG, PNG, WebP, GIF, BMP, TIFF, HEIC/AVIF) or PDF")
+        logger.warning(f"Could not resize {mime_type} image, using original. Error: {e}")
+        data, timings = image_bytes, {}
+    return build_payload(data, mime_type, timings)
+
+
 def resize_image(image_bytes: bytes, max_dimension: int = 1024) -> bytes:
-        try:
-            img = Image.open(BytesIO(image_bytes))
-            if max(img.width, img.height) <= max_dimension:
-                return image_bytes
-
-            img.thumbnail((max_dimension, max_dimension))
-            
-            buffer = BytesIO()
-            image_format = img.format if img.format in ["JPEG", "PNG"] else "JPEG"
-            img.save(buffer, format=image_format)
-            
-            return buffer.getvalue()
-        except Exception as e:
-            print(f"Warning: Could not resize image, using original. Error: {e}")
-            return image_bytes
+    try:
+        return preprocess_image(image_bytes, max_dimension)[0]
+    except Exception as e:
+        logger.warning(f"Could not resize image, using original. Error: {e}")
+        return image_bytes
 
-def prepare_image(file_content: bytes, prompt: str) -> list:
-    resized_content = resize_image(file_content)
-    base64_image = base64.b64encode(resized_content).decode('utf-8')
+def build_image_message(image: PreparedImage, prompt: str) -> list:
     return [
         HumanMessage(
             content=[
                 {"type": "text", "text": prompt},
                 {
                     "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}
+                    "image_url": {"url": f"data:{image.mime_type};base64,{image.base64_data}"}
                 }
             ]
         )
-    ]
\ No newline at end of file
+    ]
+
+def prepare_image(file_content: bytes, prompt: str) -> list:
+    return build_image_message(prepare_image_payload(file_content), prompt)
@@ -0,0 +1,220 @@
+"""Content-aware image preparation for OCR.
+
+The OCR payload size drives Vintern latency, so instead of a fixed 1024 px cap the opt-in
+adaptive mode (IMAGE_PREP_MODE=adaptive) crops to the paper, converts to contrast-normalized
+grayscale (smaller JPEGs), picks the resolution from how dense the text looks, and can split
+tall notes into overlapping tiles. Fixed mode stays the default: compare OCR accuracy on your
+own notes with benchmarks.image_prep before switching.
+Everything here is CPU-bound and picklable so it can run in the process pool. Pillow is
+imported inside the functions so it is only loaded by the workers that prepare images.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from typing import TYPE_CHECKING, List, Tuple
+
+from app.utils.helpers import PreparedImage, build_payload, flatten_to_rgb, prepare_image_payload
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_SIZE = 512
+
+
+@dataclass(frozen=True)
+class ImagePrepOptions:
+    mode: str = "fixed"  # "fixed" or "adaptive"
+    max_dimension: int = 1024  # fixed mode cap, adaptive mode default
+    min_dimension: int = 768  # sparse notes (few text edges)
+    dense_dimension: int = 1600  # dense multi-column tables
+    sparse_edge_density: float = 6.0
+    dense_edge_density: float = 14.0
+    jpeg_quality: int = 85
+    passthrough_max_bytes: int = 512 * 1024
+    grayscale: bool = True
+    auto_crop: bool = True
+    tiling: bool = False
+    tile_min_aspect: float = 2.0  # height / width above which a note is tiled
+    tile_overlap: float = 0.08
+
+
+def _otsu_threshold(gray: Image.Image) -> int:
+    histogram = gray.histogram()
+    total = sum(histogram)
+    sum_all = sum(i * h for i, h in enumerate(histogram))
+    sum_background = weight_background = 0
+    best_threshold, best_variance = 127, 0.0
+    for threshold, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += threshold * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = threshold, variance
+    return best_threshold
+
+
+def crop_to_paper(img: Image.Image, margin: float = 0.02) -> Image.Image:
+    """Crops to the bright paper region. Leaves the image alone if the detected box looks wrong."""
+    from PIL import ImageFilter
+
+    small = img.convert("L")
+    small.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+    small = small.filter(ImageFilter.MedianFilter(5))
+    threshold = _otsu_threshold(small)
+    bbox = small.point(lambda v: 255 if v > threshold else 0).getbbox()
+    if bbox is None:
+        return img
+    left, top, right, bottom = bbox
+    area_ratio = (right - left) * (bottom - top) / float(small.width * small.height)
+    if not 0.2 <= area_ratio <= 0.95:
+        return img
+    scale_x, scale_y = img.width / small.width, img.height / small.height
+    pad_x, pad_y = img.width * margin, img.height * margin
+    return img.crop((
+        max(0, int(left * scale_x - pad_x)),
+        max(0, int(top * scale_y - pad_y)),
+        min(img.width, int(right * scale_x + pad_x)),
+        min(img.height, int(bottom * scale_y + pad_y)),
+    ))
+
+
+def edge_density(img: Image.Image) -> float:
+    """Mean edge strength of a downscaled grayscale copy; a cheap proxy for how much text is on the page."""
+    from PIL import ImageFilter, ImageStat
+
+    small = img.convert("L")
+    small.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+    return ImageStat.Stat(small.filter(ImageFilter.FIND_EDGES)).mean[0]
+
+
+def choose_dimension(density: float, options: ImagePrepOptions) -> int:
+    if density <= options.sparse_edge_density:
+        return options.min_dimension
+    if density >= options.dense_edge_density:
+        return options.dense_dimension
+    return options.max_dimension
+
+
+def split_tiles(img: Image.Image, options: ImagePrepOptions) -> List[Image.Image]:
+    """Splits a tall note into vertically stacked, slightly overlapping tiles (top to bottom)."""
+    aspect = img.height / float(img.width)
+    if not options.tiling or aspect < options.tile_min_aspect:
+        return [img]
+    count = int(aspect // (options.tile_min_aspect / 2))
+    tile_height = img.height / count
+    overlap = int(tile_height * options.tile_overlap)
+    tiles = []
+    for i in range(count):
+        top = max(0, int(i * tile_height) - overlap)
+        bottom = min(img.height, int((i + 1) * tile_height) + overlap)
+        tiles.append(img.crop((0, top, img.width, bottom)))
+    return tiles
+
+
+def _line_key(line: str) -> str:
+    return " ".join(line.split()).casefold()
+
+
+def join_tiles(texts: List[str]) -> str:
+    """Stitches the OCR texts of split_tiles() tiles, keeping lines read in both halves of an overlap once.
+
+    Where the last lines of one tile equal the first lines of the next (ignoring spacing and
+    case), the longest such run is dropped from the next tile, so a table row that crosses a
+    tile boundary is not transcribed twice.
+    """
+    parts = texts[:1]
+    for previous, text in zip(texts, texts[1:]):
+        tail = [_line_key(line) for line in previous.splitlines() if line.strip()]
+        lines = text.splitlines()
+        filled = [i for i, line in enumerate(lines) if line.strip()]
+        head = [_line_key(lines[i]) for i in filled]
+        overlap = next((k for k in range(min(len(tail), len(head)), 0, -1) if tail[-k:] == head[:k]), 0)
+        parts.append("\n".join(lines[filled[overlap - 1] + 1:]).lstrip("\n") if overlap else text)
+    return "\n\n".join(part for part in parts if part.strip())
+
+
+def _encode(img: Image.Image, max_dimension: int, options: ImagePrepOptions) -> Tuple[bytes, float]:
+    from PIL import Image
+
+    start = time.perf_counter()
+    if max(img.width, img.height) > max_dimension:
+        img = img.copy()
+        img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", quality=options.jpeg_quality, optimize=True)
+    return buffer.getvalue(), time.perf_counter() - start
+
+
+def prepare_image_payloads(image_bytes: bytes, options: ImagePrepOptions) -> List[PreparedImage]:
+    """Prepares one payload per tile (a single payload unless tiling kicks in)."""
+    from PIL import Image, ImageOps
+
+    if options.mode != "adaptive":
+        return [prepare_image_payload(image_bytes, options.max_dimension, options.jpeg_quality, options.passthrough_max_bytes)]
+
+    try:
+        start = time.perf_counter()
+        img = Image.open(BytesIO(image_bytes))
+        if img.format == "JPEG":
+            # Never need more than 2x the densest target while analysing and cropping.
+            img.draft("RGB", (options.dense_dimension * 2, options.dense_dimension * 2))
+        ImageOps.exif_transpose(img, in_place=True)
+        img.load()
+        timings = {"decode": time.perf_counter() - start}
+
+        now = time.perf_counter()
+        img = flatten_to_rgb(img)
+        if options.auto_crop:
+            img = crop_to_paper(img)
+        if options.grayscale:
+            img = ImageOps.autocontrast(img.convert("L"), cutoff=1)
+        density = edge_density(img)
+        dimension = choose_dimension(density, options)
+        tiles = split_tiles(img, options)
+        timings["analyse"] = time.perf_counter() - now
+    except Exception as e:
+        logger.warning(f"Adaptive image preparation failed, falling back to fixed resize. Error: {e}")
+        return [prepare_image_payload(image_bytes, options.max_dimension, options.jpeg_quality, options.passthrough_max_bytes)]
+
+    logger.debug(f"Edge density {density:.1f} -> {dimension}px, {len(tiles)} tile(s)")
+    payloads = []
+    for tile in tiles:
+        data, encode_time = _encode(tile, dimension, options)
+        payloads.append(build_payload(data, "image/jpeg", {**timings, "encode": encode_time}))
+    return payloads
+
+
+
+def perceptual_hash(image_bytes: bytes, hash_size: int = 32) -> bytes:
+    """Difference hash (dHash, hash_size² bits) of the upright, contrast-normalized grayscale image.
+
+    Robust to re-encoding, rescaling and exposure changes; a small Hamming distance between two
+    hashes means visually similar images. 32x32 is needed for documents: at 8x8 or 16x16 two
+    different notes on the same form hash almost identically.
+    """
+    from PIL import Image, ImageOps
+
+    img = Image.open(BytesIO(image_bytes))
+    img.draft("L", (hash_size * 16, hash_size * 16))
+    img = ImageOps.autocontrast(ImageOps.exif_transpose(img).convert("L"), cutoff=1)
+    img = img.resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = list(img.getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value.to_bytes(hash_size * hash_size // 8, "big")
@@ -0,0 +1,78 @@
+"""Cheap local clean-up of almost-JSON model output, tried before asking the model again.
+
+Handles the failure modes seen in production: `<think>` preambles from Qwen3, prose or
+markdown fences around the object, trailing commas, Python literals and output that was
+cut off before the closing brackets.
+"""
+import json
+import re
+from typing import Any, List, Optional
+
+_THINK_RE = re.compile(r"<think>.*?(?:</think>|$)", re.S)
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.S)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_PYTHON_LITERALS = {"None": "null", "True": "true", "False": "false"}
+_PYTHON_LITERAL_RE = re.compile(r"\b(None|True|False)\b")
+_CLOSERS = {"{": "}", "[": "]"}
+# A key with no value at the end of a truncated object: `{"a": 1, "b":` or `{"b`.
+_DANGLING_KEY_RE = re.compile(r'(?:,|(?<=\{))\s*"(?:\\.|[^"\\])*"\s*$')
+
+
+def _object_text(text: str) -> Optional[str]:
+    text = _THINK_RE.sub("", text)
+    fence = _FENCE_RE.search(text)
+    if fence:
+        text = fence.group(1)
+    start = text.find("{")
+    return text[start:] if start >= 0 else None
+
+
+def _balance(text: str) -> str:
+    """Cuts after the first complete object, or closes strings/brackets of a truncated one."""
+    stack: List[str] = []
+    in_string = escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(_CLOSERS[char])
+        elif char in "}]" and stack:
+            stack.pop()
+            if not stack:
+                return text[:i + 1]
+    if in_string:
+        text += '"'
+    text = text.rstrip().rstrip(",:").rstrip()
+    if stack and stack[-1] == "}":
+        text = _DANGLING_KEY_RE.sub("", text)
+    return text + "".join(reversed(stack))
+
+
+def _outside_strings(text: str, pattern: "re.Pattern", replace) -> str:
+    parts = re.split(r'("(?:\\.|[^"\\])*")', text)
+    return "".join(part if i % 2 else pattern.sub(replace, part) for i, part in enumerate(parts))
+
+
+def repair_json(text: str) -> Optional[Any]:
+    """Best-effort parse of a model response into a JSON object. Returns None when it cannot."""
+    candidate = _object_text(text)
+    if candidate is None:
+        return None
+    candidate = _balance(candidate)
+    candidate = _outside_strings(candidate, _TRAILING_COMMA_RE, r"\1")
+    try:
+        return json.loads(candidate)
+    except ValueError:
+        pass
+    candidate = _outside_strings(candidate, _PYTHON_LITERAL_RE, lambda m: _PYTHON_LITERALS[m.group(1)])
+    try:
+        return json.loads(candidate)
+    except ValueError:
+        return None
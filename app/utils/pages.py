@@ -0,0 +1,96 @@
+"""Splitting a submitted note into pages: every image is one page, PDFs are rasterized page by page.
+
+PDF support needs the optional `pypdfium2` package. Pages are only rendered when they are about
+to be OCR'd (see BaseNoteService.ocr_pages), so a long PDF never sits in memory as images.
+Like image_prep, everything here is CPU-bound and picklable so it can run in the process pool.
+"""
+from __future__ import annotations
+
+import ctypes
+import threading
+from dataclasses import dataclass
+from io import BytesIO
+from typing import List, Optional
+
+PDF_MAGIC = b"%PDF-"
+PDF_MIME_TYPE = "application/pdf"
+
+# PDFium is not thread-safe; calls are serialized per process (a process pool renders in parallel).
+_pdfium_lock = threading.Lock()
+
+
+class UnsupportedDocumentError(ValueError):
+    """The file cannot be read as note pages: not an image, or an unreadable PDF (pypdfium2 missing, damaged or encrypted)."""
+
+
+def is_pdf(content: bytes) -> bool:
+    # The header may follow up to 1 KB of leading junk.
+    return PDF_MAGIC in content[:1024]
+
+
+def _pdfium():
+    try:
+        import pypdfium2
+    except ImportError:
+        raise UnsupportedDocumentError("PDF notes need the 'pypdfium2' package, which is not installed")
+    return pypdfium2
+
+
+def _open_pdf(content: bytes):
+    pdfium = _pdfium()
+    if isinstance(content, bytearray):
+        # Downloads arrive in a preallocated bytearray; PDFium reads it in place through a ctypes view.
+        content = (ctypes.c_char * len(content)).from_buffer(content)
+    try:
+        return pdfium.PdfDocument(content)
+    except pdfium.PdfiumError as e:
+        raise UnsupportedDocumentError(f"Could not read PDF: {e}")
+
+
+def pdf_page_count(content: bytes) -> int:
+    with _pdfium_lock:
+        pdf = _open_pdf(content)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+
+def render_pdf_page(content: bytes, index: int, dpi: int = 150, jpeg_quality: int = 90) -> bytes:
+    """Rasterizes one PDF page to JPEG; image_prep then resizes it like any photo."""
+    with _pdfium_lock:
+        pdf = _open_pdf(content)
+        try:
+            page = pdf[index]
+            image = page.render(scale=dpi / 72).to_pil()
+            page.close()
+        finally:
+            pdf.close()
+    buffer = BytesIO()
+    image.convert("RGB").save(buffer, format="JPEG", quality=jpeg_quality)
+    return buffer.getvalue()
+
+
+@dataclass(frozen=True)
+class Page:
+    number: int  # 1-based, across all files of the note
+    source: bytes  # the submitted file; shared by all pages of a PDF
+    pdf_index: Optional[int] = None  # page inside `source` when it is a PDF
+
+
+def split_pages(files: List[bytes], max_pages: int) -> List[Page]:
+    """Lists the pages of the submitted files in order, without rendering anything."""
+    pages: List[Page] = []
+    for content in files:
+        indexes = range(pdf_page_count(content)) if is_pdf(content) else [None]
+        pages.extend([Page(len(pages) + offset, content, index) for offset, index in enumerate(indexes, start=1)])
+        if len(pages) > max_pages:
+            raise UnsupportedDocumentError(f"Notes are limited to {max_pages} pages")
+    return pages
+
+
+def load_page(page: Page, dpi: int = 150) -> bytes:
+    """The page as image bytes, rendering it first if it comes from a PDF."""
+    if page.pdf_index is None:
+        return page.source
+    return render_pdf_page(page.source, page.pdf_index, dpi)
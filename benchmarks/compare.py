@@ -0,0 +1,140 @@
+"""Runs the same load against two commits of the service and prints the difference.
+
+Usage:
+    python -m benchmarks.compare main HEAD --concurrency 16 --duration 60
+    python -m benchmarks.compare v1.2 my-branch --rps 4 --mock-args="--error-rate 0.02"
+
+Each ref is checked out into a temporary `git worktree`, started with uvicorn against the
+mock model servers (started once and shared, so both runs see the same latency profile) and
+loaded with benchmarks.loadgen using the arguments given here. Needs only git, Python and the
+service's requirements, so results are reproducible on any Linux box.
+"""
+import argparse
+import asyncio
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+import httpx
+
+from benchmarks.loadgen import build_parser as build_loadgen_parser, format_summary, run as run_load
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+METRICS = ("throughput_rps", "p50", "p95", "p99", "mean")
+
+
+def wait_until_up(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=2.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+@contextmanager
+def process(command: List[str], cwd: str, env: Dict[str, str], ready_url: str) -> Iterator[subprocess.Popen]:
+    proc = subprocess.Popen(command, cwd=cwd, env=env)
+    try:
+        wait_until_up(ready_url)
+        yield proc
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+@contextmanager
+def worktree(ref: str) -> Iterator[str]:
+    path = tempfile.mkdtemp(prefix="field-note-bench-")
+    subprocess.run(["git", "worktree", "add", "--detach", path, ref], cwd=ROOT, check=True, capture_output=True)
+    try:
+        yield path
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", path], cwd=ROOT, check=False, capture_output=True)
+
+
+def service_env(args: argparse.Namespace, workdir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": workdir,
+        "VINTERN_LLM_URL": f"http://127.0.0.1:{args.vintern_port}/v1",
+        "QWEN_LLM_URL": f"http://127.0.0.1:{args.qwen_port}/v1",
+        "QWEN_TOKEN": "mock",
+        "MODEL_LLM": "Qwen/Qwen3-8B",
+        "API_KEY_NAME": env.get("API_KEY_NAME", "X-API-Key"),
+        # Keep each run independent of whatever the previous one cached on disk.
+        "OCR_CACHE_PATH": "",
+        "EXTRACTION_CACHE_PATH": "",
+    })
+    return env
+
+
+def run_ref(ref: str, args: argparse.Namespace, load_args: argparse.Namespace) -> Dict[str, Any]:
+    print(f"\n=== {ref} ===", flush=True)
+    with worktree(ref) as path:
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(args.port), "--log-level", "warning"]
+        with process(command, path, service_env(args, path), f"http://127.0.0.1:{args.port}/"):
+            summary = asyncio.run(run_load(load_args))
+    print(format_summary(summary))
+    return summary
+
+
+def _fmt(value: Any) -> str:
+    return f"{value:.3f}" if value is not None else "-"
+
+
+def print_comparison(base_ref: str, head_ref: str, base: Dict[str, Any], head: Dict[str, Any]) -> None:
+    print(f"\n{'metric':<16}{base_ref[:14]:>16}{head_ref[:14]:>16}{'change':>10}")
+    for metric in METRICS:
+        if metric not in base or metric not in head:
+            continue
+        change = (head[metric] - base[metric]) / base[metric] if base[metric] else 0.0
+        print(f"{metric:<16}{base[metric]:>16.3f}{head[metric]:>16.3f}{change:>+10.1%}")
+    print(f"{'errors':<16}{sum(base['errors'].values()):>16}{sum(head['errors'].values()):>16}")
+    for stage in sorted(set(base["stages"]) | set(head["stages"])):
+        before = base["stages"].get(stage, {}).get("mean")
+        after = head["stages"].get(stage, {}).get("mean")
+        print(f"{'stage ' + stage:<16}{_fmt(before):>16}{_fmt(after):>16}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base_ref")
+    parser.add_argument("head_ref")
+    parser.add_argument("--port", type=int, default=8765, help="Port the service under test listens on")
+    parser.add_argument("--image-port", type=int, default=9100)
+    parser.add_argument("--vintern-port", type=int, default=9101)
+    parser.add_argument("--qwen-port", type=int, default=9102)
+    parser.add_argument("--mock-args", default="", help="Extra arguments for benchmarks.mock_servers")
+    args, loadgen_argv = parser.parse_known_args()
+
+    load_args = build_loadgen_parser().parse_args(loadgen_argv + [
+        "--base-url", f"http://127.0.0.1:{args.port}",
+        "--image-base-url", f"http://127.0.0.1:{args.image_port}",
+    ])
+    load_args.endpoint = load_args.endpoint or ["concrete_note"]
+
+    mock_command = [
+        sys.executable, "-m", "benchmarks.mock_servers",
+        "--image-port", str(args.image_port), "--vintern-port", str(args.vintern_port), "--qwen-port", str(args.qwen_port),
+        *shlex.split(args.mock_args),
+    ]
+    with process(mock_command, ROOT, dict(os.environ), f"http://127.0.0.1:{args.qwen_port}/v1/models"):
+        base = run_ref(args.base_ref, args, load_args)
+        head = run_ref(args.head_ref, args, load_args)
+    print_comparison(args.base_ref, args.head_ref, base, head)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Image preparation benchmark: bytes sent and OCR latency vs. extraction accuracy.
+
+Usage:
+    python -m benchmarks.image_prep samples/ [--ocr] [--note-type concrete_note]
+
+`samples/` holds note images; an optional `<image stem>.json` next to an image is the expected
+extraction output used to score accuracy (leaf fields compared after whitespace/case folding).
+Without --ocr only the preparation step is measured, so it runs anywhere. With --ocr the
+configured VINTERN_LLM_URL / QWEN_LLM_URL endpoints are called for every config and image.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.services.base import image_prep_options
+from app.utils.image_prep import ImagePrepOptions, prepare_image_payloads
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def configs(base: ImagePrepOptions) -> Dict[str, ImagePrepOptions]:
+    return {
+        "fixed-1024": replace(base, mode="fixed", max_dimension=1024),
+        "adaptive": replace(base, mode="adaptive", tiling=False),
+        "adaptive-color": replace(base, mode="adaptive", grayscale=False, tiling=False),
+        "adaptive-tiled": replace(base, mode="adaptive", tiling=True),
+    }
+
+
+def flatten(value: Any, prefix: str = "") -> Dict[str, str]:
+    if isinstance(value, dict):
+        out = {}
+        for key, item in value.items():
+            out.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+        return out
+    if isinstance(value, list):
+        out = {}
+        for i, item in enumerate(value):
+            out.update(flatten(item, f"{prefix}[{i}]"))
+        return out
+    return {prefix: " ".join(str(value).split()).casefold()}
+
+
+def field_accuracy(expected: Dict[str, Any], actual: Optional[Dict[str, Any]]) -> float:
+    expected_fields = flatten(expected)
+    if not expected_fields:
+        return 1.0
+    actual_fields = flatten(actual or {})
+    matched = sum(1 for key, value in expected_fields.items() if actual_fields.get(key) == value)
+    return matched / len(expected_fields)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(args) -> None:
+    images = sorted(p for p in Path(args.samples).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    if not images:
+        raise SystemExit(f"No images found in {args.samples}")
+
+    service = None
+    if args.ocr:
+        from app.core.registry import service_registry
+        from app.services.concrete_note import ConcreteNoteService
+        from app.services.materials_delivery import MaterialsDeliveryService
+        service_cls = ConcreteNoteService if args.note_type == "concrete_note" else MaterialsDeliveryService
+        service = service_registry.get_service(service_cls, args.model_name)
+
+    print(f"{'config':<16}{'bytes/img':>12}{'tiles':>7}{'prep ms':>10}{'ocr p50 s':>11}{'ocr p95 s':>11}{'accuracy':>10}")
+    for name, options in configs(image_prep_options()).items():
+        sizes, tiles, prep_times, ocr_times, accuracies = [], [], [], [], []
+        for path in images:
+            data = path.read_bytes()
+            start = time.perf_counter()
+            payloads = prepare_image_payloads(data, options)
+            prep_times.append((time.perf_counter() - start) * 1000)
+            sizes.append(sum(p.size for p in payloads))
+            tiles.append(len(payloads))
+
+            if service is None:
+                continue
+            service.image_options = options
+            start = time.perf_counter()
+            ocr_text = await service.run_ocr(data, bypass_cache=True)
+            ocr_times.append(time.perf_counter() - start)
+            truth = path.with_suffix(".json")
+            if truth.exists():
+                result = await service.extract(ocr_text, bypass_cache=True)
+                accuracies.append(field_accuracy(json.loads(truth.read_text(encoding="utf-8")), result))
+
+        ocr_p50 = f"{statistics.median(ocr_times):.2f}" if ocr_times else "-"
+        ocr_p95 = f"{percentile(ocr_times, 95):.2f}" if ocr_times else "-"
+        accuracy = f"{statistics.mean(accuracies):.1%}" if accuracies else "-"
+        print(
+            f"{name:<16}{statistics.mean(sizes):>12.0f}{statistics.mean(tiles):>7.1f}"
+            f"{statistics.mean(prep_times):>10.1f}{ocr_p50:>11}{ocr_p95:>11}{accuracy:>10}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("samples", help="Directory of sample note images (+ optional expected .json)")
+    parser.add_argument("--ocr", action="store_true", help="Call the OCR/extraction endpoints, not just preprocessing")
+    parser.add_argument("--note-type", choices=["concrete_note", "materials_delivery"], default="concrete_note")
+    parser.add_argument("--model-name", default="Qwen/Qwen3-8B")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
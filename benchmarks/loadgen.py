@@ -0,0 +1,182 @@
+"""Load generator for the extraction endpoints.
+
+Usage:
+    python -m benchmarks.loadgen --base-url http://127.0.0.1:8000 --concurrency 16 --duration 60
+    python -m benchmarks.loadgen --rps 5 --duration 60 --endpoint materials_delivery --output run.json
+
+Closed loop (`--concurrency N`: N clients back to back) or open loop (`--rps R`: Poisson
+arrivals, so queueing shows up in the tail instead of slowing the generator down). Each
+request gets a distinct image URL on the mock image host (see benchmarks.mock_servers) and
+`bypass_cache`, so the whole pipeline runs every time; pass --repeat-urls to measure the
+cache / single-flight path instead. Reports p50/p95/p99, throughput, errors and the per-stage
+breakdown returned by `include_timings`.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.image_prep import percentile
+
+ENDPOINTS = {
+    "concrete_note": "/api/v1/concrete_note",
+    "materials_delivery": "/api/v1/materials_delivery",
+    "extract": "/api/v1/extract",
+}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors: Dict[str, int] = {}
+        self.stages: Dict[str, List[float]] = {}
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+
+    def record(self, latency: float, body: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+            return
+        self.latencies.append(latency)
+        for stage, seconds in ((body or {}).get("timings") or {}).items():
+            self.stages.setdefault(stage, []).append(seconds)
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = (self.finished or time.monotonic()) - self.started
+        latencies = self.latencies
+        result: Dict[str, Any] = {
+            "requests": len(latencies) + sum(self.errors.values()),
+            "successes": len(latencies),
+            "errors": self.errors,
+            "elapsed_seconds": elapsed,
+            "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        }
+        if latencies:
+            result.update({
+                "mean": statistics.mean(latencies),
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": max(latencies),
+            })
+        result["stages"] = {
+            stage: {"mean": statistics.mean(values), "p95": percentile(values, 95)}
+            for stage, values in sorted(self.stages.items())
+        }
+        return result
+
+
+async def send(client: httpx.AsyncClient, args: argparse.Namespace, sequence: int, recorder: Recorder) -> None:
+    endpoint = args.endpoint[sequence % len(args.endpoint)]
+    image_id = sequence % args.repeat_urls if args.repeat_urls else sequence
+    payload = {
+        "file_url": f"{args.image_base_url}/images/note-{image_id}.jpg?kb={args.image_kb}",
+        "bypass_cache": not args.repeat_urls,
+        "include_timings": True,
+    }
+    headers = {args.api_key_header: args.api_key} if args.api_key else {}
+    start = time.monotonic()
+    try:
+        response = await client.post(ENDPOINTS[endpoint], json=payload, headers=headers)
+        latency = time.monotonic() - start
+        if response.status_code != 200:
+            recorder.record(latency, None, f"http_{response.status_code}")
+            return
+        body = response.json()
+        recorder.record(latency, body, None if body.get("status") == "success" else "pipeline_error")
+    except httpx.HTTPError as e:
+        recorder.record(time.monotonic() - start, None, type(e).__name__)
+
+
+async def closed_loop(client: httpx.AsyncClient, args: argparse.Namespace, recorder: Recorder) -> None:
+    counter = itertools.count()
+    deadline = time.monotonic() + args.duration
+
+    async def worker() -> None:
+        while time.monotonic() < deadline:
+            sequence = next(counter)
+            if args.requests and sequence >= args.requests:
+                return
+            await send(client, args, sequence, recorder)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def open_loop(client: httpx.AsyncClient, args: argparse.Namespace, recorder: Recorder) -> None:
+    deadline = time.monotonic() + args.duration
+    tasks = []
+    for sequence in itertools.count():
+        if time.monotonic() >= deadline or (args.requests and sequence >= args.requests):
+            break
+        tasks.append(asyncio.create_task(send(client, args, sequence, recorder)))
+        await asyncio.sleep(random.expovariate(args.rps))
+    await asyncio.gather(*tasks)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        if args.warmup:
+            warmup = argparse.Namespace(**{**vars(args), "requests": args.warmup, "duration": float("inf")})
+            await closed_loop(client, warmup, Recorder())
+        recorder = Recorder()
+        if args.rps:
+            await open_loop(client, args, recorder)
+        else:
+            await closed_loop(client, args, recorder)
+        recorder.finished = time.monotonic()
+    return recorder.summary()
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    lines = [
+        f"requests {summary['requests']}  ok {summary['successes']}  errors {summary['errors'] or 0}",
+        f"throughput {summary['throughput_rps']:.2f} req/s over {summary['elapsed_seconds']:.1f}s",
+    ]
+    if "p50" in summary:
+        lines.append(
+            f"latency  mean {summary['mean']:.3f}s  p50 {summary['p50']:.3f}s  "
+            f"p95 {summary['p95']:.3f}s  p99 {summary['p99']:.3f}s  max {summary['max']:.3f}s"
+        )
+    for stage, values in summary["stages"].items():
+        lines.append(f"  {stage:<12} mean {values['mean']:.3f}s  p95 {values['p95']:.3f}s")
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--image-base-url", default="http://127.0.0.1:9100")
+    parser.add_argument("--endpoint", action="append", choices=sorted(ENDPOINTS), help="Repeat to mix endpoints round-robin")
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed-loop clients (ignored with --rps)")
+    parser.add_argument("--rps", type=float, default=None, help="Open-loop target arrival rate")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load for")
+    parser.add_argument("--requests", type=int, default=None, help="Stop after this many requests")
+    parser.add_argument("--warmup", type=int, default=4, help="Requests sent (and discarded) before measuring")
+    parser.add_argument("--image-kb", type=int, default=300)
+    parser.add_argument("--repeat-urls", type=int, default=0, help="Cycle through this many image URLs, with caching on")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--api-key-header", default="X-API-Key")
+    parser.add_argument("--output", default=None, help="Write the summary as JSON to this file")
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    args.endpoint = args.endpoint or ["concrete_note"]
+    summary = asyncio.run(run(args))
+    print(format_summary(summary))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
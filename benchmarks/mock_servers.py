@@ -0,0 +1,218 @@
+"""Local stand-ins for the Vintern / Qwen OpenAI-compatible endpoints and the image host.
+
+Usage:
+    python -m benchmarks.mock_servers [--vintern-latency 1.2] [--qwen-latency 0.8] [--error-rate 0.01]
+
+Starts three servers (defaults: image host :9100, Vintern :9101, Qwen :9102). Point the service
+at them with:
+    VINTERN_LLM_URL=http://127.0.0.1:9101/v1 QWEN_LLM_URL=http://127.0.0.1:9102/v1 MODEL_LLM=Qwen/Qwen3-8B
+
+Each model server draws a time-to-first-token from a lognormal distribution (median + sigma),
+then "generates" its canned completion at `tokens_per_second`, so streamed and non-streamed
+calls both take realistic time. `error_rate` of calls answer 503 and `slow_rate` of calls take
+10x longer, to exercise retries, breakers and hedging. Images are synthetic JPEG notes
+(`/images/<anything>.jpg?kb=300`), generated once per size and served from memory.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, AsyncIterator, Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from PIL import Image, ImageDraw
+
+OCR_TEXT = (
+    "PHIẾU GIAO HÀNG BÊ TÔNG\nSố phiếu: BT-2024-00123\nNgày giao: 12/03/2024\n"
+    "Khách hàng: Công ty Xây dựng ABC\nCông trình: Tòa nhà A1\n"
+    "Mác bê tông: B25  Độ sụt: 12±2\nKhối lượng: 8.5 m3\nBiển số xe: 29C-123.45\n"
+    "Giờ xuất trạm: 07:45  Giờ đến: 08:20\nNgười nhận: Nguyễn Văn A"
+)
+EXTRACTION_RESULT = {
+    "note_number": "BT-2024-00123",
+    "delivery_date": "2024-03-12",
+    "customer": "Công ty Xây dựng ABC",
+    "project": "Tòa nhà A1",
+    "delivery_items": [{"name": "Bê tông B25", "slump": "12±2", "quantity": 8.5, "unit": "m3"}],
+    "vehicle_plate": "29C-123.45",
+    "receiver": "Nguyễn Văn A",
+}
+
+
+@dataclass
+class MockProfile:
+    ttft_median: float = 0.5  # seconds before the first token
+    ttft_sigma: float = 0.3  # lognormal shape; 0 gives a fixed latency
+    tokens_per_second: float = 80.0
+    error_rate: float = 0.0
+    slow_rate: float = 0.0
+
+    def ttft(self) -> float:
+        delay = self.ttft_median * math.exp(random.gauss(0, self.ttft_sigma)) if self.ttft_sigma else self.ttft_median
+        if self.slow_rate and random.random() < self.slow_rate:
+            delay *= 10
+        return delay
+
+
+def _tokens(text: str) -> List[str]:
+    # Roughly one token per 4 characters, which is close enough for timing purposes.
+    return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+
+def _has_image(body: Dict[str, Any]) -> bool:
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, list) and any(part.get("type") == "image_url" for part in content):
+            return True
+    return False
+
+
+def build_model_app(name: str, profile: MockProfile) -> FastAPI:
+    app = FastAPI(title=f"mock-{name}")
+    app.state.calls = 0
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": name, "object": "model"}]}
+
+    @app.get("/stats")
+    async def stats():
+        return {"calls": app.state.calls}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        app.state.calls += 1
+        body = await request.json()
+        if profile.error_rate and random.random() < profile.error_rate:
+            await asyncio.sleep(profile.ttft() / 4)
+            return JSONResponse({"error": {"message": "mock overload", "type": "server_error"}}, status_code=503)
+
+        # The OCR call carries the image; extraction calls get the JSON answer.
+        text = OCR_TEXT if _has_image(body) else "```json\n" + json.dumps(EXTRACTION_RESULT, ensure_ascii=False) + "\n```"
+        tokens = _tokens(text)
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", name)
+
+        if body.get("stream"):
+            async def events() -> AsyncIterator[str]:
+                await asyncio.sleep(profile.ttft())
+                for token in tokens:
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                             "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                    yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                    await asyncio.sleep(1 / profile.tokens_per_second)
+                final = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                         "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+                yield f"data: {json.dumps(final)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(profile.ttft() + len(tokens) / profile.tokens_per_second)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    return app
+
+
+@lru_cache(maxsize=16)
+def synthetic_note(kb: int) -> bytes:
+    """A JPEG that looks roughly like a photographed note, padded with noise to about `kb` KB."""
+    width, height = 1800, 2400
+    img = Image.new("RGB", (width, height), (95, 90, 80))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((150, 150, width - 150, height - 150), fill=(235, 232, 225))
+    for row, line in enumerate((OCR_TEXT * 3).splitlines()):
+        draw.text((220, 220 + row * 60), line, fill=(20, 20, 20))
+    quality = 90
+    while True:
+        buffer = BytesIO()
+        noisy = img.copy()
+        pixels = noisy.load()
+        rng = random.Random(kb)
+        for _ in range(kb * 40):
+            x, y = rng.randrange(width), rng.randrange(height)
+            shade = rng.randrange(256)
+            pixels[x, y] = (shade, shade, shade)
+        noisy.save(buffer, format="JPEG", quality=quality)
+        if buffer.tell() >= kb * 1024 or quality >= 98:
+            return buffer.getvalue()
+        quality += 4
+
+
+def build_image_app(latency: float) -> FastAPI:
+    app = FastAPI(title="mock-image-host")
+
+    @app.get("/images/{name}")
+    async def image(name: str, kb: int = 300):
+        if latency:
+            await asyncio.sleep(latency)
+        return Response(synthetic_note(kb), media_type="image/jpeg")
+
+    return app
+
+
+async def serve(apps: Dict[int, FastAPI], host: str) -> None:
+    servers = [uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning")) for port, app in apps.items()]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser, prefix: str, latency: float, tokens_per_second: float) -> None:
+    parser.add_argument(f"--{prefix}-latency", type=float, default=latency, help="Median time to first token (s)")
+    parser.add_argument(f"--{prefix}-sigma", type=float, default=0.3, help="Lognormal sigma of the first-token latency")
+    parser.add_argument(f"--{prefix}-tps", type=float, default=tokens_per_second, help="Generated tokens per second")
+
+
+def profile_from_args(args: argparse.Namespace, prefix: str) -> MockProfile:
+    return MockProfile(
+        ttft_median=getattr(args, f"{prefix}_latency"),
+        ttft_sigma=getattr(args, f"{prefix}_sigma"),
+        tokens_per_second=getattr(args, f"{prefix}_tps"),
+        error_rate=args.error_rate,
+        slow_rate=args.slow_rate,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--image-port", type=int, default=9100)
+    parser.add_argument("--vintern-port", type=int, default=9101)
+    parser.add_argument("--qwen-port", type=int, default=9102)
+    parser.add_argument("--image-latency", type=float, default=0.05, help="Image host response delay (s)")
+    add_profile_arguments(parser, "vintern", latency=0.8, tokens_per_second=120.0)
+    add_profile_arguments(parser, "qwen", latency=0.4, tokens_per_second=60.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of model calls answered with 503")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of model calls that take 10x longer")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    apps = {
+        args.image_port: build_image_app(args.image_latency),
+        args.vintern_port: build_model_app("5CD-AI/Vintern-3B-R-beta", profile_from_args(args, "vintern")),
+        args.qwen_port: build_model_app("Qwen/Qwen3-8B", profile_from_args(args, "qwen")),
+    }
+    print(f"Mock image host :{args.image_port}, Vintern :{args.vintern_port}, Qwen :{args.qwen_port}", flush=True)
+    asyncio.run(serve(apps, args.host))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Compares requests/sec of the development launcher with the production serving profile.
+
+Usage:
+    python -m benchmarks.serving --concurrency 64 --duration 30
+    python -m benchmarks.serving --workers 4 --repeat-urls 16 --concurrency 128
+
+Both profiles run the current tree against the same mock model servers (benchmarks.mock_servers)
+and get the same load from benchmarks.loadgen:
+
+  baseline    `uvicorn app.main:app`: one process, asyncio loop, h11, stdlib JSON responses
+  production  `python -m app.serve`: pre-forked workers, uvloop, httptools, orjson responses
+
+The mock models default to a few milliseconds of latency so the serving stack, not the upstream,
+is what limits throughput; `--repeat-urls` additionally answers from the result caches.
+"""
+import argparse
+import asyncio
+import os
+import shlex
+import sys
+from typing import Any, Dict, List
+
+from benchmarks.compare import METRICS, ROOT, process, service_env
+from benchmarks.loadgen import build_parser as build_loadgen_parser, format_summary, run as run_load
+
+DEFAULT_MOCK_ARGS = "--vintern-latency 0.005 --vintern-sigma 0 --vintern-tps 100000 --qwen-latency 0.005 --qwen-sigma 0 --qwen-tps 100000 --image-latency 0"
+
+
+def profiles(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    address = ["--host", "127.0.0.1", "--port", str(args.port), "--log-level", "warning"]
+    return {
+        "baseline": {
+            "command": [sys.executable, "-m", "uvicorn", "app.main:app", "--loop", "asyncio", "--http", "h11", *address],
+            "env": {"ORJSON_RESPONSES": "false"},
+        },
+        "production": {
+            "command": [sys.executable, "-m", "app.serve", "--workers", str(args.workers), *address],
+            "env": {"ORJSON_RESPONSES": "true"},
+        },
+    }
+
+
+def run_profile(name: str, profile: Dict[str, Any], args: argparse.Namespace, load_args: argparse.Namespace) -> Dict[str, Any]:
+    print(f"\n=== {name} ===", flush=True)
+    env = {**service_env(args, ROOT), **profile["env"]}
+    with process(profile["command"], ROOT, env, f"http://127.0.0.1:{args.port}/"):
+        summary = asyncio.run(run_load(load_args))
+    print(format_summary(summary))
+    return summary
+
+
+def print_comparison(results: Dict[str, Dict[str, Any]]) -> None:
+    base, head = results["baseline"], results["production"]
+    print(f"\n{'metric':<16}{'baseline':>16}{'production':>16}{'change':>10}")
+    for metric in METRICS:
+        if metric not in base or metric not in head:
+            continue
+        change = (head[metric] - base[metric]) / base[metric] if base[metric] else 0.0
+        print(f"{metric:<16}{base[metric]:>16.3f}{head[metric]:>16.3f}{change:>+10.1%}")
+    print(f"{'errors':<16}{sum(base['errors'].values()):>16}{sum(head['errors'].values()):>16}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765, help="Port the service under test listens on")
+    parser.add_argument("--workers", type=int, default=0, help="Production workers, 0 = one per available CPU")
+    parser.add_argument("--image-port", type=int, default=9100)
+    parser.add_argument("--vintern-port", type=int, default=9101)
+    parser.add_argument("--qwen-port", type=int, default=9102)
+    parser.add_argument("--mock-args", default=DEFAULT_MOCK_ARGS, help="Arguments for benchmarks.mock_servers")
+    args, loadgen_argv = parser.parse_known_args()
+
+    load_args = build_loadgen_parser().parse_args(loadgen_argv + [
+        "--base-url", f"http://127.0.0.1:{args.port}",
+        "--image-base-url", f"http://127.0.0.1:{args.image_port}",
+    ])
+    load_args.endpoint = load_args.endpoint or ["concrete_note"]
+
+    mock_command: List[str] = [
+        sys.executable, "-m", "benchmarks.mock_servers",
+        "--image-port", str(args.image_port), "--vintern-port", str(args.vintern_port), "--qwen-port", str(args.qwen_port),
+        *shlex.split(args.mock_args),
+    ]
+    with process(mock_command, ROOT, dict(os.environ), f"http://127.0.0.1:{args.qwen_port}/v1/models"):
+        results = {name: run_profile(name, profile, args, load_args) for name, profile in profiles(args).items()}
+    print_comparison(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Import-time cost of the application (worker cold start).
+
+Usage:
+    python -m benchmarks.startup [--module app.main] [--runs 5] [--top 15]
+
+Imports `--module` in fresh interpreters with `python -X importtime`, reports the median wall
+time of the import and the modules with the largest cumulative import time, and lists which
+heavy dependencies were loaded. Provider SDKs and Pillow should stay out of this list; they
+are imported on first use.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+HEAVY_MODULES = ("langchain_google_genai", "langchain_openai", "langchain", "openai", "requests", "PIL")
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def run_once(module: str) -> Tuple[float, List[str], Dict[str, int]]:
+    """One cold import. Returns (seconds, heavy modules loaded, cumulative us per top-level package)."""
+    code = PROBE.format(module=module, heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.getcwd(),
+    )
+    seconds, heavy = result.stdout.splitlines()[-2:]
+    return float(seconds), [m for m in heavy.split(",") if m], parse_importtime(result.stderr)
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """Sums `-X importtime` cumulative times of the outermost imports, grouped by top-level package."""
+    totals: Dict[str, int] = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        if name.startswith("  "):
+            continue  # nested import, already counted in its parent's cumulative time
+        totals[name.strip().split(".")[0]] += int(fields[1])
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    timings, packages, heavy = [], defaultdict(list), set()
+    for _ in range(args.runs):
+        seconds, loaded, totals = run_once(args.module)
+        timings.append(seconds)
+        heavy.update(loaded)
+        for name, us in totals.items():
+            packages[name].append(us)
+
+    print(f"import {args.module}: median {statistics.median(timings) * 1000:.0f} ms "
+          f"(min {min(timings) * 1000:.0f}, max {max(timings) * 1000:.0f}) over {args.runs} runs")
+    print(f"heavy modules loaded: {', '.join(sorted(heavy)) or 'none'}")
+    print(f"\n{'package':<32}{'median ms':>10}")
+    ranked = sorted(packages.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for name, values in ranked[:args.top]:
+        print(f"{name:<32}{statistics.median(values) / 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.middleware import api_key as api_key_module
+from app.middleware.api_key import APIKeyMiddleware, parse_api_keys
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(api_key_module.time, "monotonic", clock)
+    return clock
+
+
+def make_client(keys: str, **cors) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/")
+    async def root():
+        return {"status": "OK"}
+
+    @app.get("/notes")
+    async def notes():
+        return {"notes": []}
+
+    @app.get("/metrics")
+    async def metrics():
+        return "up 1"
+
+    app.add_middleware(APIKeyMiddleware, keys=parse_api_keys(None, keys, 0))
+    if cors:
+        app.add_middleware(CORSMiddleware, **cors)
+    return TestClient(app)
+
+
+def test_parse_api_keys_reads_rates_and_keeps_colons_in_keys():
+    keys = parse_api_keys("main", "a:30, b, c:d", 60)
+    assert [(key.value, key.bucket and key.bucket.rate * 60) for key in keys] == [
+        (b"main", 60), (b"a", 30), (b"b", 60), (b"c:d", 60)
+    ]
+
+
+def test_missing_and_invalid_keys_are_rejected():
+    client = make_client("secret")
+    assert client.get("/notes").status_code == 401
+    response = client.get("/notes", headers={"X-API-Key": "wrong"})
+    assert (response.status_code, response.json()) == (401, {"detail": "Invalid or missing API Key"})
+    assert client.get("/notes", headers={"X-API-Key": "secret"}).json() == {"notes": []}
+
+
+def test_each_key_has_its_own_bucket(clock):
+    client = make_client("limited:2,other:2")
+    limited, other = {"X-API-Key": "limited"}, {"X-API-Key": "other"}
+    assert [client.get("/notes", headers=limited).status_code for _ in range(2)] == [200, 200]
+    response = client.get("/notes", headers=limited)
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "30"
+    assert client.get("/notes", headers=other).status_code == 200
+    clock.now += 30
+    assert client.get("/notes", headers=limited).status_code == 200
+
+
+def test_public_paths_and_preflight_need_no_key():
+    client = make_client("secret")
+    assert client.get("/").status_code == 200
+    assert client.options("/notes").status_code != 401
+
+
+def test_metrics_need_a_key_unless_made_public(monkeypatch):
+    assert make_client("secret").get("/metrics").status_code == 401
+    monkeypatch.setattr(settings, "METRICS_PUBLIC", True)
+    assert make_client("secret").get("/metrics").status_code == 200
+
+
+def test_rejections_carry_cors_headers_when_cors_wraps_the_key_check():
+    client = make_client("secret", allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+    response = client.get("/notes", headers={"Origin": "https://app.example"})
+    assert response.status_code == 401
+    assert response.headers["access-control-allow-origin"] == "*"
+    preflight = client.options("/notes", headers={
+        "Origin": "https://app.example", "Access-Control-Request-Method": "GET", "Access-Control-Request-Headers": "X-API-Key",
+    })
+    assert preflight.status_code == 200
+
+
+def test_app_registers_cors_outside_the_key_check():
+    from app.main import app
+
+    layers = [middleware.cls for middleware in app.user_middleware]  # outermost first
+    assert layers.index(CORSMiddleware) < layers.index(APIKeyMiddleware)
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from app.core.balancer import BalancedChatModel, Replica, is_replica_fault
+from app.core.config import settings
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FakeModel:
+    """Answers with the queued outcomes in order: a value is returned, an exception raised."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+
+    def invoke(self, input, config=None, **kwargs):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+def call(model: BalancedChatModel):
+    try:
+        return model.invoke("prompt")
+    except Exception as e:
+        return e
+
+
+@pytest.mark.parametrize("error, expected", [
+    (StatusError(503), True),
+    (StatusError(501), True),
+    (StatusError(429), True),
+    (asyncio.TimeoutError(), True),
+    (StatusError(400), False),
+    (StatusError(404), False),
+    (asyncio.CancelledError(), False),
+])
+def test_is_replica_fault(error, expected):
+    assert is_replica_fault(error) is expected
+
+
+def test_replica_is_ejected_after_consecutive_faults():
+    threshold = settings.LB_EJECT_AFTER_FAILURES
+    replica = Replica("http://a", FakeModel(*[StatusError(503)] * threshold))
+    model = BalancedChatModel("test", [replica])
+    for _ in range(threshold):
+        call(model)
+    assert not replica.healthy
+    assert replica.ejections == 1
+
+
+def test_errors_that_are_not_replica_faults_do_not_reset_the_streak():
+    threshold = settings.LB_EJECT_AFTER_FAILURES
+    outcomes = []
+    for _ in range(threshold):
+        outcomes += [StatusError(502), StatusError(400)]
+    replica = Replica("http://a", FakeModel(*outcomes))
+    model = BalancedChatModel("test", [replica])
+    for _ in outcomes:
+        call(model)
+    assert replica.ejections == 1
+
+
+def test_success_resets_the_streak_and_records_latency():
+    threshold = settings.LB_EJECT_AFTER_FAILURES
+    outcomes = [StatusError(503)] * (threshold - 1) + ["ok"] + [StatusError(503)] * (threshold - 1)
+    replica = Replica("http://a", FakeModel(*outcomes))
+    model = BalancedChatModel("test", [replica])
+    for _ in outcomes:
+        call(model)
+    assert replica.healthy
+    assert replica.ewma_latency is not None
+    assert replica.consecutive_failures == threshold - 1
+
+
+def test_passing_health_check_keeps_the_streak_of_an_admitted_replica():
+    replica = Replica("http://a", None)
+    replica.record(None, failed=True)
+    replica.readmit()
+    assert replica.consecutive_failures == 1
+
+
+def test_passing_health_check_readmits_an_ejected_replica():
+    replica = Replica("http://a", None)
+    for _ in range(settings.LB_EJECT_AFTER_FAILURES):
+        replica.record(None, failed=True)
+    assert not replica.healthy
+    replica.readmit()
+    assert replica.healthy
+    assert replica.consecutive_failures == 0
+
+
+def test_calls_avoid_ejected_replicas():
+    threshold = settings.LB_EJECT_AFTER_FAILURES
+    bad = Replica("http://bad", FakeModel(*[StatusError(503)] * threshold))
+    good = Replica("http://good", FakeModel(*["ok"] * 10))
+    for _ in range(threshold):
+        bad.record(None, failed=True)
+    model = BalancedChatModel("test", [bad, good])
+    assert [call(model) for _ in range(5)] == ["ok"] * 5
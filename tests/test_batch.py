@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import batch
+from app.core.config import settings
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Fakes extract_from_url: 'missing' is a 404 download, 'broken' fails in the pipeline."""
+    calls = []
+
+    async def extract_from_url(service, file_url, bypass_cache=False, pipeline_mode=None, limits=None):
+        calls.append((file_url, limits))
+        await asyncio.sleep(0.01 if file_url.endswith("slow") else 0)
+        if file_url.endswith("missing"):
+            raise HTTPException(status_code=404, detail="Error fetching image from the provider: 404")
+        if file_url.endswith("broken"):
+            raise ValueError("OCR failed")
+        return {"note_number": file_url.rsplit("/", 1)[-1]}
+
+    monkeypatch.setattr(batch, "extract_from_url", extract_from_url)
+    return calls
+
+
+def test_each_item_carries_its_own_status_in_input_order(calls):
+    urls = ["http://x/slow", "http://x/missing", "http://x/2", "http://x/broken"]
+    results = asyncio.run(batch.run_batch(None, urls))
+    assert [(result["file_url"], result["status"]) for result in results] == [
+        ("http://x/slow", "success"), ("http://x/missing", "error"), ("http://x/2", "success"), ("http://x/broken", "error"),
+    ]
+    assert results[0]["data"] == {"note_number": "slow"}
+    assert results[1]["error_message"] == "Error fetching image from the provider: 404"
+    assert results[3]["error_message"] == "An unexpected error occurred: OCR failed"
+    assert all(result["processing_time"] is not None for result in results)
+
+
+def test_items_of_one_batch_share_its_stage_limits(calls, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_LLM_CONCURRENCY", 3)
+    asyncio.run(batch.run_batch(None, ["http://x/1", "http://x/2"]))
+    asyncio.run(batch.run_batch(None, ["http://x/3"]))
+    limits = [limits for _, limits in calls]
+    assert limits[0] is limits[1] and limits[2] is not limits[0]
+    assert limits[0].llm._value == 3
+
+
+def test_batch_endpoint_returns_partial_failures_with_200(calls, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app.core.registry import service_registry
+    from app.main import app
+
+    monkeypatch.setattr(service_registry, "get_service", lambda service_cls, model_name=None: None)
+    with TestClient(app) as client:
+        response = client.post(
+            f"{settings.API_V1_STR}/concrete_note/batch", json={"file_urls": ["http://x/1", "http://x/missing"]}
+        )
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()["results"]] == ["success", "error"]
@@ -0,0 +1,98 @@
+import asyncio
+import gc
+
+import pytest
+
+from app.core.batching import MicroBatcher
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_items_are_sent_as_batches_in_order():
+    sizes = []
+
+    async def double(items):
+        sizes.append(len(items))
+        await asyncio.sleep(0.01)
+        return [item * 2 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher("test", double, window=0.01, max_size=4)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        return results, batcher.stats()
+
+    results, stats = run(scenario())
+    assert results == [i * 2 for i in range(10)]
+    assert sorted(sizes) == [2, 4, 4]
+    assert (stats["batches"], stats["items"], stats["pending"]) == (3, 10, 0)
+
+
+def test_batch_in_flight_survives_garbage_collection():
+    async def slow(items):
+        await asyncio.sleep(0.05)
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher("test", slow, window=0.001, max_size=8)
+        waiter = asyncio.ensure_future(batcher.submit("x"))
+        await asyncio.sleep(0.01)  # the batch task is running and only the batcher references it
+        gc.collect()
+        return await asyncio.wait_for(waiter, 1)
+
+    assert run(scenario()) == "x"
+
+
+def test_failed_batch_fails_every_caller():
+    async def broken(items):
+        raise RuntimeError("embedding server down")
+
+    async def scenario():
+        batcher = MicroBatcher("test", broken, window=0.001, max_size=8)
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in run(scenario()))
+
+
+def test_wrong_result_count_is_an_error():
+    async def short(items):
+        return items[:-1]
+
+    async def scenario():
+        batcher = MicroBatcher("test", short, window=0.001, max_size=8)
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in run(scenario()))
+
+
+def test_aclose_flushes_waiting_items_and_drains_batches():
+    async def echo(items):
+        await asyncio.sleep(0.01)
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher("test", echo, window=60, max_size=8)
+        waiters = [asyncio.ensure_future(batcher.submit(i)) for i in range(3)]
+        await asyncio.sleep(0)
+        await batcher.aclose(timeout=1)
+        return await asyncio.wait_for(asyncio.gather(*waiters), 0.1)
+
+    assert run(scenario()) == [0, 1, 2]
+
+
+def test_aclose_cancels_batches_past_the_timeout():
+    async def hang(items):
+        await asyncio.sleep(60)
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher("test", hang, window=0.001, max_size=8)
+        waiter = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0.01)
+        await batcher.aclose(timeout=0.01)
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return batcher.stats()["pending"]
+
+    assert run(scenario()) == 0
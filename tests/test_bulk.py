@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+
+import pytest
+from langchain_core.language_models import FakeListChatModel
+
+from app import bulk
+from app.core.config import settings
+from app.models.common import PageMode
+from app.services.concrete_note import ConcreteNoteService
+
+JPEG = b"\xff\xd8\xff\xe0 not really a photo "
+
+
+def make_args(tmp_path, **overrides) -> argparse.Namespace:
+    args = dict(
+        output=str(tmp_path / "out.jsonl"), checkpoint=None, note_type="concrete_note", model_name=None,
+        pipeline_mode=None, page_mode=PageMode.MERGED, bypass_cache=False, concurrency=1, ocr_concurrency=1,
+        llm_concurrency=1, retry_errors=False, flush_every=1, flush_seconds=60.0, progress_interval=60.0,
+    )
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+
+def write_notes(directory, names):
+    directory.mkdir(exist_ok=True)
+    for name in names:
+        (directory / f"{name}.jpg").write_bytes(JPEG + name.encode())
+    return [str(directory / f"{name}.jpg") for name in names]
+
+
+def read_rows(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def processed(monkeypatch):
+    """Runs bulk against a fake model and returns the notes it OCRs; the first run to reach note 'c' is killed there."""
+    monkeypatch.setattr(settings, "OCR_CACHE_ENABLED", False)
+    service = ConcreteNoteService(
+        "Qwen/Qwen3-8B", model_factory=lambda name: FakeListChatModel(responses=['{"note_number": "1"}'])
+    )
+    seen, killed = [], []
+
+    async def run_ocr(image, bypass_cache=False, limits=None):
+        name = image[len(JPEG):].decode()
+        seen.append(name)
+        if name == "c" and not killed:
+            killed.append(name)
+            # Ctrl-C twice: stop scheduling and cancel the note in flight.
+            os.kill(os.getpid(), signal.SIGINT)
+            os.kill(os.getpid(), signal.SIGINT)
+            await asyncio.sleep(10)
+        if name == "bad":
+            raise ValueError("unreadable")
+        return f"Phiếu số {name}"
+
+    monkeypatch.setattr(service, "run_ocr", run_ocr)
+    monkeypatch.setattr(bulk.service_registry, "get_service", lambda service_cls, model_name=None: service)
+    return seen
+
+
+def test_killed_run_resumes_with_the_sources_it_did_not_finish(tmp_path, processed):
+    args = make_args(tmp_path)
+    sources = write_notes(tmp_path / "notes", ["a", "b", "c", "d"])
+    asyncio.run(bulk.run(args, sources))
+    assert processed == ["a", "b", "c"]
+    assert [row["source"] for row in read_rows(args.output)] == sources[:2]
+
+    processed.clear()
+    assert asyncio.run(bulk.run(args, sources)) == 0
+    assert processed == ["c", "d"]
+    assert [row["source"] for row in read_rows(args.output)] == sources
+
+
+def test_retried_errors_get_a_new_row(tmp_path, processed):
+    args = make_args(tmp_path)
+    sources = write_notes(tmp_path / "notes", ["ok", "bad"])
+    assert asyncio.run(bulk.run(args, sources)) == 1
+    asyncio.run(bulk.run(args, sources))
+    assert processed == ["ok", "bad"]  # errors stay finished without --retry-errors
+
+    asyncio.run(bulk.run(make_args(tmp_path, retry_errors=True), sources))
+    assert processed == ["ok", "bad", "bad"]
+    rows = read_rows(args.output)
+    assert [(row["source"], row["status"]) for row in rows] == [
+        (sources[0], "success"), (sources[1], "error"), (sources[1], "error")
+    ]
+
+
+def test_manifest_entries_are_expanded_like_arguments(tmp_path):
+    sources = write_notes(tmp_path / "notes", ["a", "b"])
+    (tmp_path / "notes" / "readme.txt").write_text("not a note")
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text(f"# archive\n{tmp_path / 'notes'}\n{tmp_path / 'notes' / '*.jpg'}\nhttps://x/1.pdf\n")
+    assert bulk.expand_sources([sources[1]], str(manifest)) == [*sources, "https://x/1.pdf"]
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import LRUCache, TieredCache, build_backend, make_cache_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+def test_cache_key_is_stable_and_order_sensitive():
+    assert make_cache_key("a", "b") == make_cache_key("a", "b")
+    assert make_cache_key("a", "b") != make_cache_key("b", "a")
+
+
+def test_cache_key_parts_are_length_prefixed():
+    # Plain concatenation would make these collide.
+    assert make_cache_key("ab", "c") != make_cache_key("a", "bc")
+    assert make_cache_key("abc") != make_cache_key("ab", "c")
+
+
+def test_cache_key_treats_none_as_empty_and_str_as_utf8():
+    assert make_cache_key(None, "x") == make_cache_key("", "x")
+    assert make_cache_key("bê tông") == make_cache_key("bê tông".encode("utf-8"))
+
+
+def test_lru_evicts_least_recently_used_within_byte_budget():
+    lru = LRUCache(max_bytes=10)
+    lru.set("a", b"1234")
+    lru.set("b", b"1234")
+    assert lru.get("a") == b"1234"  # "b" is now the least recently used
+    lru.set("c", b"1234")
+    assert lru.get("b") is None
+    assert lru.get("a") == b"1234"
+    assert lru.get("c") == b"1234"
+    assert lru.current_bytes == 8
+    assert lru.evictions == 1
+
+
+def test_lru_evicts_several_entries_for_one_large_value():
+    lru = LRUCache(max_bytes=10)
+    for key in "abcde":
+        lru.set(key, b"12")
+    lru.set("big", b"123456789")
+    assert len(lru) == 1
+    assert lru.current_bytes == 9
+    assert lru.evictions == 5
+
+
+def test_lru_skips_values_larger_than_the_budget():
+    lru = LRUCache(max_bytes=4)
+    lru.set("a", b"12")
+    lru.set("huge", b"12345")
+    assert lru.get("huge") is None
+    assert lru.get("a") == b"12"
+
+
+def test_lru_overwrite_replaces_size_accounting():
+    lru = LRUCache(max_bytes=10)
+    lru.set("a", b"12345678")
+    lru.set("a", b"12")
+    assert lru.current_bytes == 2
+    assert len(lru) == 1
+
+
+def test_lru_entries_expire_after_ttl(clock):
+    lru = LRUCache(max_bytes=100, ttl=60)
+    lru.set("a", b"x")
+    clock.now += 59
+    assert lru.get("a") == b"x"
+    clock.now += 2
+    assert lru.get("a") is None
+    assert lru.current_bytes == 0
+
+
+def test_tiered_cache_round_trips_json_and_counts_hits():
+    tiered = TieredCache("test", max_bytes=1024)
+
+    async def scenario():
+        assert await tiered.get("k") is None
+        await tiered.set("k", {"note_number": "12", "items": [1.5]})
+        return await tiered.get("k")
+
+    assert asyncio.run(scenario()) == {"note_number": "12", "items": [1.5]}
+    stats = tiered.stats()
+    assert (stats["misses"], stats["memory_hits"]) == (1, 1)
+
+
+@pytest.mark.parametrize("name", ["cache.sqlite3", "cache_dir"])
+def test_tiered_cache_falls_back_to_backend(tmp_path, name):
+    backend = build_backend(str(tmp_path / name))
+    writer = TieredCache("writer", max_bytes=1024, backend=backend)
+    reader = TieredCache("reader", max_bytes=1024, backend=backend)
+
+    async def scenario():
+        await writer.set("k", "ocr text")
+        first = await reader.get("k")
+        second = await reader.get("k")
+        return first, second
+
+    try:
+        assert asyncio.run(scenario()) == ("ocr text", "ocr text")
+        assert (reader.backend_hits, reader.memory_hits) == (1, 1)
+    finally:
+        backend.close()
+
+
+@pytest.mark.parametrize("name", ["cache.sqlite3", "cache_dir"])
+def test_backend_entries_expire_after_ttl(tmp_path, clock, name):
+    backend = build_backend(str(tmp_path / name))
+    try:
+        backend.set("k", b"value", ttl=60)
+        assert backend.get("k") == b"value"
+        clock.now += 61
+        assert backend.get("k") is None
+    finally:
+        backend.close()
@@ -0,0 +1,31 @@
+import numpy as np
+
+from app.core.dedup import NoteIndex, numeric_fingerprint
+
+
+def test_numeric_fingerprint_ignores_wording_but_not_numbers():
+    note = "Phiếu số 0123, ngày 01/02/2024, bê tông M300: 7,5 m3"
+    assert numeric_fingerprint(note) == numeric_fingerprint("PHIEU SO 0123 NGAY 01 02 2024 BE TONG M300 7 5 M3")
+    assert numeric_fingerprint(note) != numeric_fingerprint(note.replace("7,5", "8,5"))
+    assert numeric_fingerprint(note) != numeric_fingerprint(note.replace("01/02", "02/02"))
+    assert numeric_fingerprint(note) != numeric_fingerprint(note.replace("0123", "0124"))
+
+
+def test_text_lookup_needs_the_same_numbers():
+    index = NoteIndex(max_entries=10)
+    vector = np.full(4, 0.5, dtype=np.float32)
+    index.add("ns", None, vector, {"total_quantity_delivered": 7.5}, numeric_fingerprint("khối lượng 7,5"))
+    assert index.lookup_text("ns", vector, numeric_fingerprint("khoi luong 7,5")) == {"total_quantity_delivered": 7.5}
+    assert index.lookup_text("ns", vector, numeric_fingerprint("khối lượng 8,5")) is None
+    assert index.lookup_text("other", vector, numeric_fingerprint("khối lượng 7,5")) is None
+
+
+def test_saved_index_keeps_fingerprints(tmp_path):
+    path = str(tmp_path / "notes.npz")
+    vector = np.full(4, 0.5, dtype=np.float32)
+    index = NoteIndex(max_entries=10, path=path)
+    index.add("ns", None, vector, {"note_number": "1"}, numeric_fingerprint("1"))
+    index.save()
+    loaded = NoteIndex(max_entries=10, path=path)
+    assert loaded.lookup_text("ns", vector, numeric_fingerprint("1")) == {"note_number": "1"}
+    assert loaded.lookup_text("ns", vector, numeric_fingerprint("2")) is None
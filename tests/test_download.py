@@ -0,0 +1,116 @@
+import asyncio
+import gzip
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.api import download as download_module
+from app.api.download import download_image
+from app.core.config import settings
+from app.utils.pages import load_page, split_pages
+
+JPEG = b"\xff\xd8\xff\xe0" + bytes(range(256)) * 40
+
+
+def serve(monkeypatch, handler):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(download_module, "get_http_client", lambda: client)
+
+
+def fetch(url: str = "http://notes/a.jpg?sig=1"):
+    return asyncio.run(download_image(url))
+
+
+def chunked(body: bytes, size: int = 1000):
+    async def stream():
+        for i in range(0, len(body), size):
+            yield body[i:i + size]
+
+    return stream()
+
+
+def test_body_of_declared_length_is_read_into_one_buffer(monkeypatch):
+    serve(monkeypatch, lambda request: httpx.Response(200, headers={"Content-Type": "image/jpeg"}, content=JPEG))
+    content, filename = fetch()
+    assert (content, filename) == (JPEG, "a.jpg")
+    assert isinstance(content, bytearray)
+
+
+def test_chunked_body_is_joined(monkeypatch):
+    serve(monkeypatch, lambda request: httpx.Response(200, headers={"Content-Type": "image/jpeg"}, content=chunked(JPEG)))
+    content, _ = fetch()
+    assert content == JPEG
+
+
+def test_compressed_body_is_decoded_past_its_declared_length(monkeypatch):
+    compressed = gzip.compress(JPEG)
+    serve(monkeypatch, lambda request: httpx.Response(
+        200, headers={"Content-Type": "image/jpeg", "Content-Encoding": "gzip"}, content=compressed
+    ))
+    content, _ = fetch()
+    assert content == JPEG
+
+
+def test_declared_length_over_the_cap_is_rejected_before_reading(monkeypatch):
+    read = []
+
+    async def body():
+        read.append(True)
+        yield JPEG
+
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE_MB", 0)
+    serve(monkeypatch, lambda request: httpx.Response(
+        200, headers={"Content-Type": "image/jpeg", "Content-Length": str(len(JPEG))}, content=body()
+    ))
+    with pytest.raises(HTTPException) as error:
+        fetch()
+    assert error.value.status_code == 413
+    assert read == []
+
+
+def test_chunked_body_over_the_cap_stops_at_the_cap(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE_MB", 0)
+    serve(monkeypatch, lambda request: httpx.Response(200, headers={"Content-Type": "image/jpeg"}, content=chunked(JPEG)))
+    with pytest.raises(HTTPException) as error:
+        fetch()
+    assert error.value.status_code == 413
+
+
+def test_body_shorter_than_its_declared_length_is_an_error(monkeypatch):
+    serve(monkeypatch, lambda request: httpx.Response(
+        200, headers={"Content-Type": "image/jpeg", "Content-Length": str(len(JPEG) + 10)}, content=chunked(JPEG)
+    ))
+    with pytest.raises(HTTPException) as error:
+        fetch()
+    assert error.value.status_code == 400
+
+
+def test_other_content_types_are_rejected(monkeypatch):
+    serve(monkeypatch, lambda request: httpx.Response(200, headers={"Content-Type": "text/html"}, content=b"<html>"))
+    with pytest.raises(HTTPException) as error:
+        fetch()
+    assert error.value.status_code == 415
+
+
+def test_downloaded_pdf_is_split_into_pages(monkeypatch):
+    pdfium = pytest.importorskip("pypdfium2")
+    from io import BytesIO
+
+    pdf = pdfium.PdfDocument.new()
+    pdf.new_page(200, 300)
+    pdf.new_page(200, 300)
+    buffer = BytesIO()
+    pdf.save(buffer)
+    serve(monkeypatch, lambda request: httpx.Response(200, headers={"Content-Type": "application/pdf"}, content=buffer.getvalue()))
+    content, _ = fetch("http://notes/a.pdf")
+    pages = split_pages([content], max_pages=10)
+    assert [page.pdf_index for page in pages] == [0, 1]
+    assert load_page(pages[1], dpi=36).startswith(b"\xff\xd8")
+
+
+def test_downloaded_buffer_goes_through_image_preparation():
+    from app.utils.helpers import prepare_image_payload
+
+    heic = bytearray(b"\x00\x00\x00\x18ftypheic" + b"\x00" * 64)
+    assert prepare_image_payload(heic).mime_type == "image/heic"
@@ -0,0 +1,56 @@
+import base64
+from io import BytesIO
+
+import pytest
+
+from app.utils.helpers import prepare_image_payload, sniff_image_mime
+from app.utils.pages import UnsupportedDocumentError
+
+
+def make_image(image_format: str, size=(64, 32)) -> bytes:
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new("RGB", size, (255, 255, 255)).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("data, expected", [
+    (b"\xff\xd8\xff\xe0rest", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\nrest", "image/png"),
+    (b"GIF89arest", "image/gif"),
+    (b"RIFF\x00\x00\x00\x00WEBPVP8 ", "image/webp"),
+    (b"II*\x00rest", "image/tiff"),
+    (b"\x00\x00\x00\x18ftypheic\x00\x00", "image/heic"),
+    (b"\x00\x00\x00\x18ftypavif\x00\x00", "image/avif"),
+    (b"%PDF-1.7", None),
+    (b"<html>", None),
+    (b"", None),
+])
+def test_sniff_image_mime(data, expected):
+    assert sniff_image_mime(data) == expected
+
+
+def test_small_png_passes_through_with_its_type():
+    png = make_image("PNG")
+    payload = prepare_image_payload(png)
+    assert payload.mime_type == "image/png"
+    assert base64.b64decode(payload.base64_data) == png
+
+
+def test_large_image_is_downscaled_to_jpeg():
+    payload = prepare_image_payload(make_image("PNG", size=(2048, 1024)), max_dimension=512)
+    assert payload.mime_type == "image/jpeg"
+    assert base64.b64decode(payload.base64_data).startswith(b"\xff\xd8")
+
+
+def test_undecodable_image_keeps_its_real_type():
+    heic = b"\x00\x00\x00\x18ftypheic" + b"\x00" * 64
+    payload = prepare_image_payload(heic)
+    assert payload.mime_type == "image/heic"
+    assert base64.b64decode(payload.base64_data) == heic
+
+
+def test_non_image_is_rejected():
+    with pytest.raises(UnsupportedDocumentError):
+        prepare_image_payload(b"<html>not an image</html>")
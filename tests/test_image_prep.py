@@ -0,0 +1,32 @@
+from app.utils.image_prep import ImagePrepOptions, join_tiles, split_tiles
+
+
+def test_rows_read_in_both_overlapping_tiles_are_kept_once():
+    top = "PHIẾU XUẤT BÊ TÔNG\nSố: 0042\n1 | M300 | 7,5\n2 | M300 | 6,0"
+    bottom = "2 |  M300 | 6,0\n\n3 | M250 | 4,5\nTổng: 18,0"
+    assert join_tiles([top, bottom]) == top + "\n\n3 | M250 | 4,5\nTổng: 18,0"
+
+
+def test_tiles_without_shared_lines_are_joined_unchanged():
+    assert join_tiles(["a\nb", "c\nd"]) == "a\nb\n\nc\nd"
+
+
+def test_longest_shared_run_wins():
+    assert join_tiles(["x\ny\nx", "y\nx\nz"]) == "x\ny\nx\n\nz"
+
+
+def test_tile_read_entirely_in_the_overlap_is_dropped():
+    assert join_tiles(["a\nb", "b", "c"]) == "a\nb\n\nc"
+
+
+def test_single_tile_is_returned_as_is():
+    assert join_tiles(["a\n\nb"]) == "a\n\nb"
+
+
+def test_tall_notes_are_split_into_overlapping_tiles():
+    from PIL import Image
+
+    img = Image.new("L", (100, 400))
+    tiles = split_tiles(img, ImagePrepOptions(tiling=True, tile_min_aspect=2.0))
+    assert len(tiles) == 4
+    assert sum(tile.height for tile in tiles) > img.height
@@ -0,0 +1,141 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core import jobs as jobs_module
+from app.core.config import settings
+from app.core.jobs import InMemoryJobStore, JobManager, QueueFullError, SQLiteJobStore
+from app.models.jobs import JobCreateRequest
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def wait_finished(manager: JobManager, job_id: str):
+    for _ in range(200):
+        job = await manager.get(job_id)
+        if job["status"] in ("success", "error"):
+            return job
+        await asyncio.sleep(0.005)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_jobs_run_and_record_their_outcome():
+    async def handler(job):
+        if job["file_url"] == "bad":
+            raise ValueError("could not read note")
+        return {"note_number": job["file_url"]}
+
+    async def scenario():
+        manager = JobManager(InMemoryJobStore(max_jobs=10), max_queue_size=10, workers=2)
+        await manager.start(handler)
+        good = await manager.submit(note_type="concrete_note", file_url="12")
+        bad = await manager.submit(note_type="concrete_note", file_url="bad")
+        results = await wait_finished(manager, good["job_id"]), await wait_finished(manager, bad["job_id"])
+        await manager.stop()
+        return results
+
+    good, bad = run(scenario())
+    assert (good["status"], good["data"]) == ("success", {"note_number": "12"})
+    assert (bad["status"], bad["error_message"]) == ("error", "could not read note")
+    assert good["processing_time"] is not None
+
+
+def test_interactive_jobs_are_taken_before_bulk_ones():
+    order = []
+
+    async def handler(job):
+        order.append(job["file_url"])
+
+    async def scenario():
+        manager = JobManager(InMemoryJobStore(max_jobs=10), max_queue_size=10, workers=1)
+        manager._queue = asyncio.PriorityQueue()  # queue before the worker starts
+        for name, priority in [("bulk-1", "bulk"), ("bulk-2", "bulk"), ("interactive", "interactive")]:
+            await manager.submit(note_type="concrete_note", file_url=name, priority=priority)
+        manager.handler = handler
+        manager._tasks = [asyncio.create_task(manager._worker())]
+        while len(order) < 3:
+            await asyncio.sleep(0.005)
+        await manager.stop()
+
+    run(scenario())
+    assert order == ["interactive", "bulk-1", "bulk-2"]
+
+
+def test_bulk_jobs_only_fill_part_of_the_queue(monkeypatch):
+    monkeypatch.setattr(settings, "JOBS_BULK_QUEUE_FRACTION", 0.5)
+
+    async def scenario():
+        manager = JobManager(InMemoryJobStore(max_jobs=10), max_queue_size=4, workers=0)
+        await manager.start(lambda job: None)
+        for _ in range(2):
+            await manager.submit(note_type="concrete_note", file_url="x", priority="bulk")
+        with pytest.raises(QueueFullError):
+            await manager.submit(note_type="concrete_note", file_url="x", priority="bulk")
+        for _ in range(2):
+            await manager.submit(note_type="concrete_note", file_url="x", priority="interactive")
+        with pytest.raises(QueueFullError):
+            await manager.submit(note_type="concrete_note", file_url="x", priority="interactive")
+        return manager.stats()
+
+    stats = run(scenario())
+    assert (stats["submitted"], stats["rejected"]) == (4, 2)
+
+
+def test_unfinished_sqlite_jobs_are_resumed(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+
+    async def handler(job):
+        return {"resumed": True}
+
+    async def scenario():
+        first = JobManager(SQLiteJobStore(path), max_queue_size=10, workers=0)
+        await first.start(handler)
+        job = await first.submit(note_type="concrete_note", file_url="x")
+        await first.stop()
+
+        second = JobManager(SQLiteJobStore(path), max_queue_size=10, workers=1)
+        await second.start(handler)
+        finished = await wait_finished(second, job["job_id"])
+        await second.stop()
+        return finished
+
+    assert run(scenario())["data"] == {"resumed": True}
+
+
+def test_webhook_retries_without_sleeping_after_the_last_attempt(monkeypatch):
+    attempts, sleeps = [], []
+
+    class FailingClient:
+        async def post(self, url, json, timeout):
+            attempts.append(url)
+            raise httpx.ConnectError("refused")
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(jobs_module, "get_http_client", lambda: FailingClient())
+    monkeypatch.setattr(jobs_module.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(settings, "JOBS_WEBHOOK_ATTEMPTS", 3)
+    manager = JobManager(InMemoryJobStore(max_jobs=10), max_queue_size=10, workers=0)
+    run(manager._notify({"job_id": "1", "callback_url": "http://hook"}))
+    assert len(attempts) == 3
+    assert sleeps == [1, 2]
+
+
+def test_job_requests_accept_any_note_type_name():
+    request = JobCreateRequest(note_type="invoice", file_url="http://x/1.jpg")
+    assert request.model_dump(mode="json")["note_type"] == "invoice"
+
+
+def test_unknown_note_types_are_rejected_by_the_endpoint():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        response = client.post(f"{settings.API_V1_STR}/jobs", json={"note_type": "invoice", "file_url": "http://x/1.jpg"})
+    assert response.status_code == 422
+    assert "concrete_note" in response.json()["detail"]
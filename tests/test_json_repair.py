@@ -0,0 +1,39 @@
+import pytest
+
+from app.utils.json_repair import repair_json
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1}', {"a": 1}),
+    ('<think>The note says {"a": 0}...</think>\n{"a": 1}', {"a": 1}),
+    ('<think>reasoning that never ends {"a": 0', None),
+    ('Here is the JSON:\n```json\n{"a": 1}\n```\nDone.', {"a": 1}),
+    ('```\n{"a": 1}\n```', {"a": 1}),
+    ('Result: {"a": 1} Hope this helps {"b": 2}', {"a": 1}),
+    ('{"a": [1, 2,], "b": {"c": 3,},}', {"a": [1, 2], "b": {"c": 3}}),
+    ('{"a": None, "b": True, "c": False}', {"a": None, "b": True, "c": False}),
+    ('{"a": [{"b": 1}, {"b": 2', {"a": [{"b": 1}, {"b": 2}]}),
+    ('{"a": "cut off mid-str', {"a": "cut off mid-str"}),
+    ('{"a": 1, "b":', {"a": 1}),
+    ('{"a": 1, "b', {"a": 1}),
+    ('{"b":', {}),
+    ('{"a": ["x", "y', {"a": ["x", "y"]}),
+    ('{"a": 1,', {"a": 1}),
+    ('no json here', None),
+    ('', None),
+])
+def test_repair_json(text, expected):
+    assert repair_json(text) == expected
+
+
+def test_brackets_and_quotes_inside_strings_are_left_alone():
+    text = '{"note": "Mác 300 {R28}, cột [A-B]", "q": "\\"7,5\\" m3,}"}'
+    assert repair_json(text) == {"note": "Mác 300 {R28}, cột [A-B]", "q": '"7,5" m3,}'}
+
+
+def test_python_literal_words_inside_strings_are_left_alone():
+    assert repair_json('{"a": "None of the True items", "b": None,}') == {"a": "None of the True items", "b": None}
+
+
+def test_unrepairable_output_returns_none():
+    assert repair_json('{"a": 1 "b": 2}') is None
@@ -0,0 +1,91 @@
+import pytest
+
+from app.core import metrics as metrics_module
+from app.core.metrics import CallbackMetric, MetricsRegistry, collect_timings, stage
+
+
+def test_counter_and_gauge_exposition():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls.", ("model",))
+    calls.inc(model="a")
+    calls.inc(2, model='q"uote\\d\nx')
+    registry.gauge("in_flight", "In flight.").set(1.5)
+    assert registry.render() == (
+        "# HELP calls_total Calls.\n"
+        "# TYPE calls_total counter\n"
+        'calls_total{model="a"} 1\n'
+        'calls_total{model="q\\"uote\\\\d\\nx"} 2\n'
+        "# HELP in_flight In flight.\n"
+        "# TYPE in_flight gauge\n"
+        "in_flight 1.5\n"
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, stage="ocr")
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{stage="ocr",le="0.1"} 1',
+        'latency_seconds_bucket{stage="ocr",le="1"} 3',
+        'latency_seconds_bucket{stage="ocr",le="+Inf"} 4',
+        'latency_seconds_sum{stage="ocr"} 4.05',
+        'latency_seconds_count{stage="ocr"} 4',
+    ]
+
+
+def test_callback_metric_skips_failures_and_non_numbers():
+    registry = MetricsRegistry()
+    registry.register(CallbackMetric("queued", "Queued.", ("queue",), lambda: {("a",): 3, ("b",): True, ("c",): None}))
+    registry.register(CallbackMetric("broken", "Broken.", (), lambda: 1 / 0))
+    assert registry.render().splitlines() == [
+        "# HELP queued Queued.", "# TYPE queued gauge", 'queued{queue="a"} 3',
+        "# HELP broken Broken.", "# TYPE broken gauge",
+    ]
+
+
+def test_stage_records_latency_errors_and_timings(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics_module, "stage_seconds", registry.histogram("seconds", "s", ("stage", "model")))
+    monkeypatch.setattr(metrics_module, "stage_errors", registry.counter("errors", "e", ("stage", "model")))
+    with collect_timings() as timings:
+        with stage("ocr", "vintern"):
+            pass
+        with pytest.raises(ValueError):
+            with stage("extract", "qwen"):
+                raise ValueError("bad output")
+    assert set(timings) == {"ocr", "extract"}
+    rendered = registry.render()
+    assert 'seconds_count{stage="ocr",model="vintern"} 1' in rendered
+    assert 'errors{stage="extract",model="qwen"} 1' in rendered
+    assert "errors{stage=\"ocr\"" not in rendered
+
+
+def test_nested_timings_add_up_into_the_enclosing_request():
+    with collect_timings() as request:
+        for _ in range(2):
+            with collect_timings() as page:
+                with stage("render"):
+                    pass
+            assert set(page) == {"render"}
+    assert request["render"] >= page["render"]
+
+
+def test_disabled_collector_yields_none():
+    with collect_timings(enabled=False) as timings:
+        with stage("ocr"):
+            pass
+    assert timings is None
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE field_note_stage_duration_seconds histogram" in response.text
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from app.api import pipeline
+from app.core.config import settings
+from app.services.concrete_note import ConcreteNoteService
+from app.services.note_types import NoteTypeRegistry, fold_text, load_keywords
+
+
+@pytest.fixture
+def registry(tmp_path):
+    for name, keywords in [
+        ("concrete_note", "bê tông: 3\nđộ sụt: 3\nm3: 0.5\n"),
+        ("materials_delivery", "# comment\nvật liệu: 2\nxi măng\nm3: 0.5\n"),
+        ("invoice", "hóa đơn: 3\n"),
+    ]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / f"{name}.txt").write_text("Extract {ocr_text}", encoding="utf-8")
+        (tmp_path / name / "keywords.txt").write_text(keywords, encoding="utf-8")
+    (tmp_path / "not_a_type").mkdir()
+    return NoteTypeRegistry(str(tmp_path))
+
+
+def test_fold_text_drops_case_and_accents():
+    assert fold_text("Bê Tông ĐỘ SỤT") == "be tong do sut"
+
+
+def test_keywords_file_weights_default_to_one(registry):
+    keywords = load_keywords(f"{registry.templates_dir}/materials_delivery/keywords.txt")
+    assert keywords == {"vat lieu": 2.0, "xi mang": 1.0, "m3": 0.5}
+
+
+def test_template_directories_become_note_types(registry):
+    assert [spec.name for spec in registry.all()] == ["concrete_note", "invoice", "materials_delivery"]
+    assert registry.get("concrete_note").service_cls is ConcreteNoteService
+    assert registry.get("invoice").service_cls.__name__ == "InvoiceService"
+    assert registry.get("not_a_type") is None
+
+
+def test_classifier_scores_whole_word_matches(registry):
+    scores = dict(registry.classify("PHIẾU GIAO BÊ TÔNG\nĐộ sụt 12±2, 7 m3\nbetong"))
+    assert scores == {"concrete_note": 6.5, "materials_delivery": 0.5, "invoice": 0.0}
+
+
+def test_clear_winner_is_the_only_candidate(registry):
+    assert registry.candidates(registry.classify("bê tông, độ sụt")) == ["concrete_note"]
+
+
+def test_close_scores_are_all_candidates(registry, monkeypatch):
+    monkeypatch.setattr(settings, "NOTE_TYPE_AMBIGUITY_RATIO", 0.6)
+    scores = registry.classify("bê tông, vật liệu, xi măng")
+    assert registry.candidates(scores) == ["concrete_note", "materials_delivery"]
+
+
+def test_no_keyword_match_tries_the_first_types(registry, monkeypatch):
+    monkeypatch.setattr(settings, "NOTE_TYPE_MAX_CANDIDATES", 2)
+    assert len(registry.candidates(registry.classify("nothing to see"))) == 2
+
+
+class FakeService:
+    def __init__(self, name, result):
+        self.name = name
+        self.result = result
+
+    async def ocr_document(self, files, bypass_cache=False, limits=None):
+        return files[0].decode(), None
+
+    async def process_ocr_text(self, ocr_text, bypass_cache=False, limits=None):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+    def validate(self, result):
+        return bool(result.get("valid"))
+
+
+@pytest.fixture
+def route(registry, monkeypatch):
+    results = {
+        "concrete_note": {"valid": False, "type": "concrete"},
+        "materials_delivery": {"valid": True, "type": "materials"},
+        "invoice": ValueError("model down"),
+    }
+    monkeypatch.setattr(pipeline, "note_types", registry)
+    monkeypatch.setattr(pipeline, "_service_for", lambda spec, model_name: FakeService(spec.name, results[spec.name]))
+
+    def route(text, note_type=None):
+        return asyncio.run(pipeline._extract_any([text.encode()], note_type, None, False, None))
+
+    return route
+
+
+def test_clear_note_is_routed_to_its_type(route):
+    result = route("bê tông, độ sụt 12")
+    assert (result["note_type"], result["route"], result["alternatives"]) == ("concrete_note", "routed", None)
+
+
+def test_ambiguous_note_prefers_the_valid_extraction(route, monkeypatch):
+    monkeypatch.setattr(settings, "NOTE_TYPE_AMBIGUITY_RATIO", 0.6)
+    result = route("bê tông, vật liệu, xi măng")
+    assert (result["note_type"], result["route"]) == ("materials_delivery", "ambiguous")
+    assert result["alternatives"] == {"concrete_note": {"valid": False, "type": "concrete"}}
+
+
+def test_forced_note_type_skips_the_classifier(route):
+    result = route("bê tông, độ sụt 12", note_type="materials_delivery")
+    assert (result["note_type"], result["route"], result["scores"]) == ("materials_delivery", "forced", {})
+
+
+def test_failure_of_every_candidate_is_raised(route):
+    with pytest.raises(ValueError, match="model down"):
+        route("hóa đơn", note_type="invoice")
@@ -0,0 +1,102 @@
+import asyncio
+from io import BytesIO
+
+import pytest
+from langchain_core.language_models import FakeListChatModel
+
+from app.core.config import settings
+from app.models.common import PageMode
+from app.services.concrete_note import ConcreteNoteService
+from app.utils.pages import UnsupportedDocumentError, is_pdf, load_page, split_pages
+
+JPEG = b"\xff\xd8\xff\xe0 not really a photo"
+
+
+def make_pdf(pages: int) -> bytes:
+    pdfium = pytest.importorskip("pypdfium2")
+    pdf = pdfium.PdfDocument.new()
+    for _ in range(pages):
+        pdf.new_page(200, 300)
+    buffer = BytesIO()
+    pdf.save(buffer)
+    pdf.close()
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def service():
+    return ConcreteNoteService("Qwen/Qwen3-8B", model_factory=lambda name: FakeListChatModel(responses=["{}"]))
+
+
+def test_is_pdf_allows_leading_junk():
+    assert is_pdf(b"%PDF-1.7\n...")
+    assert is_pdf(b"\r\n" * 10 + b"%PDF-1.4")
+    assert not is_pdf(JPEG)
+
+
+def test_images_are_one_page_each():
+    pages = split_pages([JPEG, JPEG + b"2"], max_pages=10)
+    assert [(page.number, page.pdf_index) for page in pages] == [(1, None), (2, None)]
+    assert load_page(pages[1]) == JPEG + b"2"
+
+
+def test_pdf_pages_are_numbered_across_files():
+    pages = split_pages([JPEG, make_pdf(2), JPEG], max_pages=10)
+    assert [(page.number, page.pdf_index) for page in pages] == [(1, None), (2, 0), (3, 1), (4, None)]
+
+
+def test_page_limit_is_enforced():
+    with pytest.raises(UnsupportedDocumentError):
+        split_pages([make_pdf(3), JPEG], max_pages=3)
+
+
+def test_pdf_page_renders_to_jpeg():
+    page = split_pages([make_pdf(1)], max_pages=10)[0]
+    assert load_page(page, dpi=36).startswith(b"\xff\xd8")
+
+
+def test_unreadable_pdf_is_unsupported():
+    pytest.importorskip("pypdfium2")
+    with pytest.raises(UnsupportedDocumentError):
+        split_pages([b"%PDF-1.7 truncated"], max_pages=10)
+
+
+def test_per_page_mode_reports_failed_pages_individually(service, monkeypatch):
+    async def run_ocr(image, bypass_cache=False, limits=None):
+        if image == JPEG:
+            raise ValueError("OCR failed")
+        return "text"
+
+    async def extract(ocr_text, bypass_cache=False, limits=None):
+        return {"note_number": "1"}
+
+    monkeypatch.setattr(service, "run_ocr", run_ocr)
+    monkeypatch.setattr(service, "extract", extract)
+    result = asyncio.run(service.process_document([JPEG, JPEG + b"2"], page_mode=PageMode.PER_PAGE))
+    assert [page.get("error_message") for page in result["pages"]] == ["OCR failed", None]
+    assert result["pages"][1]["data"] == {"note_number": "1"}
+
+
+def test_per_page_mode_fails_the_note_when_every_page_fails(service, monkeypatch):
+    async def run_ocr(image, bypass_cache=False, limits=None):
+        raise ValueError("OCR failed")
+
+    monkeypatch.setattr(service, "run_ocr", run_ocr)
+    with pytest.raises(RuntimeError, match="All 2 pages failed"):
+        asyncio.run(service.process_document([JPEG, JPEG + b"2"], page_mode=PageMode.PER_PAGE))
+
+
+def test_merged_mode_raises_the_page_error_past_a_cancelled_page(service, monkeypatch):
+    monkeypatch.setattr(settings, "DOCUMENT_PAGE_WINDOW", 1)
+
+    async def run_ocr(image, bypass_cache=False, limits=None):
+        if image.endswith(b"1"):
+            raise asyncio.CancelledError()
+        if image.endswith(b"2"):
+            raise ValueError("page 2 is unreadable")
+        return "text"
+
+    monkeypatch.setattr(service, "run_ocr", run_ocr)
+    files = [JPEG + b"1", JPEG + b"2", JPEG + b"3"]
+    with pytest.raises(ValueError, match="page 2 is unreadable"):
+        asyncio.run(service.ocr_document(files))
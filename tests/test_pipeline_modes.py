@@ -0,0 +1,117 @@
+import asyncio
+import json
+from io import BytesIO
+
+import pytest
+from langchain_core.language_models import FakeListChatModel
+
+from app.core.config import settings
+from app.models.common import PipelineMode
+from app.services import base as base_module
+from app.services.concrete_note import ConcreteNoteService
+
+VISION_MODEL = "Gemini/gemini-2.0-flash"
+
+COMPLETE = {
+    "note_number": "0042",
+    "delivery_date": "12/03/2024",
+    "delivery_items": [{"concrete_grade": "M300", "quantity": 7.5}],
+}
+
+
+def make_png() -> bytes:
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new("RGB", (64, 32), (255, 255, 255)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def make_service(extraction_answers, ocr_answers=("Phiếu xuất bê tông số 0042",)) -> ConcreteNoteService:
+    models = {
+        VISION_MODEL: FakeListChatModel(responses=[json.dumps(answer) for answer in extraction_answers]),
+        settings.VINTERN_MODEL: FakeListChatModel(responses=list(ocr_answers)),
+    }
+    return ConcreteNoteService(VISION_MODEL, model_factory=lambda name: models[name])
+
+
+@pytest.fixture(autouse=True)
+def no_caches(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "DEDUP_ENABLED", False)
+
+
+def test_required_fields_need_a_value():
+    service = make_service([])
+    assert service.validate(service.conform(COMPLETE))
+    assert not service.validate(service.conform({**COMPLETE, "note_number": None}))
+    assert not service.validate(service.conform({**COMPLETE, "delivery_items": []}))
+
+
+def count_ocr_calls(service, monkeypatch) -> list:
+    calls = []
+    run_ocr = service.run_ocr
+
+    async def counting_run_ocr(*args, **kwargs):
+        calls.append(args)
+        return await run_ocr(*args, **kwargs)
+
+    monkeypatch.setattr(service, "run_ocr", counting_run_ocr)
+    return calls
+
+
+def test_single_pass_result_missing_a_required_field_falls_back_to_two_stage(monkeypatch):
+    service = make_service([{"vehicle_number": "29C-123.45"}, COMPLETE])
+    ocr_calls = count_ocr_calls(service, monkeypatch)
+    result = asyncio.run(service.process_file(make_png(), pipeline_mode=PipelineMode.SINGLE_PASS))
+    assert result["note_number"] == "0042"
+    assert len(ocr_calls) == 1
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    stats = base_module.PipelineStats()
+    monkeypatch.setattr(base_module, "pipeline_stats", stats)
+    return stats
+
+
+def outcomes(stats) -> dict:
+    return {
+        mode: {key: value for key, value in counts.items() if not key.startswith("seconds") and key != "count"}
+        for mode, counts in stats.stats().items()
+    }
+
+
+def test_valid_single_pass_result_skips_ocr(stats, monkeypatch):
+    service = make_service([COMPLETE])
+    ocr_calls = count_ocr_calls(service, monkeypatch)
+    result = asyncio.run(service.process_file(make_png(), pipeline_mode=PipelineMode.SINGLE_PASS))
+    assert result["note_number"] == "0042"
+    assert ocr_calls == []
+    assert outcomes(stats) == {"single_pass": {"success": 1}}
+
+
+def test_unparseable_single_pass_answer_falls_back(stats, monkeypatch):
+    monkeypatch.setattr(settings, "EXTRACTION_REASK_ATTEMPTS", 0)
+    models = {
+        VISION_MODEL: FakeListChatModel(responses=["Sorry, I cannot read this image.", json.dumps(COMPLETE)]),
+        settings.VINTERN_MODEL: FakeListChatModel(responses=["Phiếu số 0042"]),
+    }
+    service = ConcreteNoteService(VISION_MODEL, model_factory=lambda name: models[name])
+    result = asyncio.run(service.process_file(make_png(), pipeline_mode=PipelineMode.SINGLE_PASS))
+    assert result["note_number"] == "0042"
+    assert outcomes(stats) == {"single_pass": {"fallback": 1}, "two_stage": {"success": 1}}
+
+
+def test_stats_are_kept_per_mode(stats):
+    service = make_service([{"vehicle_number": "29C"}, {"vehicle_number": "29C"}, COMPLETE])
+    asyncio.run(service.process_file(make_png(), pipeline_mode=PipelineMode.SINGLE_PASS))
+    asyncio.run(service.process_file(make_png(), pipeline_mode=PipelineMode.TWO_STAGE))
+    assert outcomes(stats) == {"single_pass": {"fallback": 1}, "two_stage": {"invalid": 1, "success": 1}}
+    assert stats.stats()["two_stage"]["seconds_avg"] >= 0
+
+
+def test_models_without_vision_run_two_stage():
+    service = ConcreteNoteService("Qwen/Qwen3-8B", model_factory=lambda name: FakeListChatModel(responses=["{}"]))
+    assert service.resolve_mode(PipelineMode.SINGLE_PASS) == PipelineMode.TWO_STAGE
+    assert make_service([]).resolve_mode(PipelineMode.SINGLE_PASS) == PipelineMode.SINGLE_PASS
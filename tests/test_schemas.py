@@ -0,0 +1,104 @@
+import pytest
+
+from app.models.common import parse_flag, parse_number
+from app.models.concrete_note import ConcreteNoteData
+from app.models.materials_delivery import MaterialsDeliveryData
+
+
+@pytest.mark.parametrize("value, expected", [
+    (7, 7.0),
+    (7.5, 7.5),
+    ("7.5", 7.5),
+    ("7,5", 7.5),
+    ("7,5 m3", 7.5),
+    ("7.5m³", 7.5),
+    ("KL: 12 khối", 12.0),
+    ("-3", -3.0),
+    ("1.250.000", 1250000.0),
+    ("1.250.000 đ", 1250000.0),
+    ("9,375,000", 9375000.0),
+    ("1.234,5", 1234.5),
+    ("1,234.5", 1234.5),
+    ("1 250 000", 1250000.0),
+    ("", None),
+    ("không có", None),
+    (None, None),
+    (True, None),
+    ([7], None),
+])
+def test_parse_number(value, expected):
+    assert parse_number(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    (True, True),
+    (False, False),
+    ("có", True),
+    ("Có", True),
+    ("yes", True),
+    ("đã ký", True),
+    ("không", False),
+    ("no", False),
+    ("maybe", None),
+    (1, None),
+    (None, None),
+])
+def test_parse_flag(value, expected):
+    assert parse_flag(value) is expected
+
+
+def test_null_lists_and_loose_scalars_are_coerced():
+    data = ConcreteNoteData.model_validate({
+        "note_number": 1234,
+        "delivery_items": None,
+        "total_quantity_delivered": "7,5",
+        "seller_info": {"company_name": "Công ty A", "signature": "có"},
+        "buyer_info": "Công ty B",
+    }).model_dump()
+    assert data["note_number"] == "1234"
+    assert data["delivery_items"] == []
+    assert data["total_quantity_delivered"] == 7.5
+    assert data["seller_info"] == {"company_name": "Công ty A", "representative": None, "signature": True}
+    assert data["buyer_info"] is None
+
+
+def test_missing_fields_default_and_unknown_fields_are_dropped():
+    data = MaterialsDeliveryData.model_validate({"note_number": "PX-01", "comment": "extra"}).model_dump()
+    assert data["note_number"] == "PX-01"
+    assert data["delivery_items"] == []
+    assert "comment" not in data
+
+
+def test_items_are_coerced_and_non_objects_dropped():
+    data = MaterialsDeliveryData.model_validate({
+        "delivery_items": [
+            {"item_name": "Xi măng", "quantity": "7.5 tấn", "price": "1.250.000", "totalPrice": None},
+            "junk",
+            None,
+        ],
+    }).model_dump()
+    assert data["delivery_items"] == [{
+        "item_name": "Xi măng", "description": None, "quantity": 7.5, "unit": None, "price": 1250000.0, "totalPrice": None,
+    }]
+
+
+def test_lone_item_object_becomes_a_list():
+    data = ConcreteNoteData.model_validate({"delivery_items": {"concrete_grade": "M300", "quantity": "7,5"}}).model_dump()
+    assert [item["quantity"] for item in data["delivery_items"]] == [7.5]
+
+
+def test_unreadable_values_become_none_instead_of_failing():
+    data = ConcreteNoteData.model_validate({
+        "total_quantity_delivered": "n/a",
+        "delivery_date": ["01/02/2024"],
+        "seller_info": {"signature": "?"},
+    }).model_dump()
+    assert data["total_quantity_delivered"] is None
+    assert data["delivery_date"] is None
+    assert data["seller_info"]["signature"] is None
+
+
+def test_json_schema_sent_to_the_model_is_unchanged_by_coercion():
+    schema = ConcreteNoteData.model_json_schema()
+    assert schema["properties"]["total_quantity_delivered"]["anyOf"] == [{"type": "number"}, {"type": "null"}]
+    assert schema["properties"]["delivery_items"]["type"] == "array"
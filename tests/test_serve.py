@@ -0,0 +1,48 @@
+import argparse
+import builtins
+import io
+
+from fastapi.responses import JSONResponse
+
+from app import serve
+from app.core.config import settings
+
+
+def test_explicit_worker_count_is_used_as_is(monkeypatch):
+    monkeypatch.setattr(serve, "available_cpus", lambda: 64)
+    assert serve.worker_count(3) == 3
+
+
+def test_automatic_worker_count_is_capped(monkeypatch):
+    monkeypatch.setattr(settings, "SERVER_MAX_WORKERS", 8)
+    monkeypatch.setattr(serve, "available_cpus", lambda: 64)
+    assert serve.worker_count(0) == 8
+    monkeypatch.setattr(serve, "available_cpus", lambda: 2)
+    assert serve.worker_count(0) == 2
+
+
+def test_cgroup_quota_limits_the_cpus(monkeypatch):
+    monkeypatch.setattr(serve.os, "sched_getaffinity", lambda pid: set(range(16)), raising=False)
+    real_open = builtins.open
+
+    def fake_open(path, *args, **kwargs):
+        if path == "/sys/fs/cgroup/cpu.max":
+            return io.StringIO("250000 100000\n")
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", fake_open)
+    assert serve.available_cpus() == 2
+
+
+def test_config_falls_back_when_uvloop_and_httptools_are_missing(monkeypatch):
+    monkeypatch.setattr(serve, "_installed", lambda module: False)
+    args = argparse.Namespace(host="127.0.0.1", port=8000, log_level="info", access_log=False)
+    config = serve.build_config(object(), args)
+    assert (config.loop, config.http) == ("asyncio", "h11")
+
+
+def test_json_responses_fall_back_without_orjson(monkeypatch):
+    from app import main
+
+    monkeypatch.setattr(settings, "ORJSON_RESPONSES", False)
+    assert main.default_response_class() is JSONResponse
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    assert run(scenario()) == [1] * 5
+    assert calls == 1
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "followers": 4}
+
+
+def test_nothing_is_kept_after_completion():
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    async def scenario():
+        return await flight.do("k", work), await flight.do("k", work)
+
+    assert run(scenario()) == (1, 2)
+
+
+def test_exception_reaches_every_caller():
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def scenario():
+        return await asyncio.gather(flight.do("k", work), flight.do("k", work), return_exceptions=True)
+
+    results = run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_follower_does_not_cancel_the_shared_call():
+    flight = SingleFlight("test")
+    release = None
+
+    async def work():
+        await release.wait()
+        return "done"
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        leader = asyncio.create_task(flight.do("k", work))
+        follower = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader
+
+    assert run(scenario()) == "done"
+
+
+def test_cancelled_leader_hands_the_call_to_the_remaining_waiters():
+    flight = SingleFlight("test")
+    release = None
+
+    async def work():
+        await release.wait()
+        return "done"
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        leader = asyncio.create_task(flight.do("k", work))
+        follower = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await follower
+
+    assert run(scenario()) == "done"
+
+
+def test_last_waiter_cancelling_cancels_the_call_and_forgets_it():
+    flight = SingleFlight("test")
+    started = cancelled = None
+
+    async def work():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def scenario():
+        nonlocal started, cancelled
+        started, cancelled = asyncio.Event(), asyncio.Event()
+        waiter = asyncio.create_task(flight.do("k", work))
+        await started.wait()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.wait_for(cancelled.wait(), 1)
+        # A new call with the same key starts fresh instead of joining the cancelled one.
+        return await flight.do("k", lambda: asyncio.sleep(0, result="again"))
+
+    assert run(scenario()) == "again"
+    assert flight.stats()["in_flight"] == 0
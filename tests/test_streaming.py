@@ -0,0 +1,73 @@
+import asyncio
+import json
+from io import BytesIO
+
+import pytest
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models import FakeListChatModel
+
+from app.core.config import settings
+from app.core.metrics import collect_timings
+from app.services.concrete_note import ConcreteNoteService
+
+NOTE = {"note_number": "0042", "delivery_date": "12/03/2024", "total_quantity_delivered": "7,5"}
+
+
+def make_png() -> bytes:
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new("RGB", (64, 32), (255, 255, 255)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def make_service(*answers: str) -> ConcreteNoteService:
+    models = {
+        "Qwen/Qwen3-8B": FakeListChatModel(responses=list(answers)),
+        settings.VINTERN_MODEL: FakeListChatModel(responses=["Phiếu số 0042"]),
+    }
+    return ConcreteNoteService("Qwen/Qwen3-8B", model_factory=lambda name: models[name])
+
+
+def stream(service: ConcreteNoteService) -> list:
+    async def collect():
+        return [event async for event in service.stream_file(make_png())]
+
+    return asyncio.run(collect())
+
+
+@pytest.fixture(autouse=True)
+def no_ocr_cache(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_CACHE_ENABLED", False)
+
+
+def test_stream_ends_with_the_validated_result():
+    service = make_service(json.dumps(NOTE))
+    with collect_timings() as timings:
+        events = stream(service)
+    names = [event["event"] for event in events]
+    assert names[0] == "ocr_token" and names[-1] == "result"
+    assert "ocr_done" in names and "partial" in names
+    assert events[-1]["data"]["total_quantity_delivered"] == 7.5
+    assert events[-1]["data"]["delivery_items"] == []
+    assert {"ocr", "extract"} <= set(timings)
+
+
+def test_unparseable_stream_is_asked_again(monkeypatch):
+    monkeypatch.setattr(settings, "EXTRACTION_REASK_ATTEMPTS", 1)
+    events = stream(make_service("I could not read this note.", json.dumps(NOTE)))
+    assert events[-1]["event"] == "result"
+    assert events[-1]["data"]["note_number"] == "0042"
+
+
+def test_unparseable_stream_never_yields_a_result(monkeypatch):
+    monkeypatch.setattr(settings, "EXTRACTION_REASK_ATTEMPTS", 0)
+    events = []
+
+    async def collect():
+        async for event in make_service("I could not read this note.").stream_file(make_png()):
+            events.append(event)
+
+    with pytest.raises(OutputParserException):
+        asyncio.run(collect())
+    assert "result" not in [event["event"] for event in events]
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.api.upload import read_uploads
+from app.core.config import settings
+
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 4096
+
+
+def raw_request(body: bytes, content_type: str = "image/jpeg", chunk_size: int = 1000) -> Request:
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    messages = [{"type": "http.request", "body": chunk, "more_body": i + 1 < len(chunks)} for i, chunk in enumerate(chunks)]
+
+    async def receive():
+        return messages.pop(0)
+
+    headers = [(b"content-type", content_type.encode())]
+    return Request({"type": "http", "method": "POST", "headers": headers}, receive)
+
+
+def test_raw_body_larger_than_the_spool_is_read_back_whole(monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_SPOOL_MAX_BYTES", 1024)
+    files = asyncio.run(read_uploads(raw_request(JPEG)))
+    assert files == [(JPEG, "uploaded_image")]
+
+
+def test_raw_body_over_the_cap_is_rejected_while_streaming(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE_MB", 0)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(read_uploads(raw_request(JPEG)))
+    assert error.value.status_code == 413
+
+
+def test_body_that_is_not_an_image_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(read_uploads(raw_request(b"<html>", content_type="text/html")))
+    assert error.value.status_code == 415
+
+
+def test_upload_endpoints_share_one_handler(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app.api import upload
+    from app.main import app
+
+    async def fake_extract(service, files, **kwargs):
+        return {"data": {"note_number": str(len(files[0]))}, "pages": None}
+
+    monkeypatch.setattr(upload, "extract_document_from_bytes", fake_extract)
+    monkeypatch.setattr(upload.service_registry, "get_service", lambda service_cls, model_name=None: None)
+    with TestClient(app) as client:
+        for path in ("concrete_note", "materials_delivery"):
+            response = client.post(f"{settings.API_V1_STR}/{path}/upload", content=JPEG, headers={"Content-Type": "image/jpeg"})
+            assert response.status_code == 200
+            assert (response.json()["status"], response.json()["data"]["note_number"]) == ("success", str(len(JPEG)))